@@ -4,15 +4,27 @@ from langchain.llms import OpenAI
 from langchain.llms import PromptLayerOpenAI
 
 from langchain.agents import ZeroShotAgent, Tool, AgentExecutor
-from langchain.memory import ConversationBufferMemory
 from langchain import LLMChain
 
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores import Qdrant, Chroma
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.document_loaders import TextLoader
-
-from tools import text_agent, subtitle_agent, video_agent, image_agent, timeline_config_agent, output_config_agent, render_video
+from tools import get_subagent, render_video
+from fast_path import FastPath
+from planner import PlanExecutor, PlanError, FALLBACK_PROGRESS
+import llm_cache
+import render_cache
+import preview
+import segments
+from tool_index import load_tool_index
+from tool_selection import ToolSelector, current_tools
+from budget_memory import EditStateMemory
+from journal import Journal
+from session import current_session
+from render_manager import get_render_manager
+from callback_receiver import CallbackReceiver
+from asset_probe import get_prober
+import tracing
+
+import argparse
+import contextlib
 
 # https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/footage/skater.hd.mp4
 # https://shotstack-assets.s3.ap-southeast-2.amazonaws.com/examples/picture-in-picture/code.mp4
@@ -23,42 +35,58 @@ from tools import text_agent, subtitle_agent, video_agent, image_agent, timeline
 # https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/examples/images/pexels/pexels-photo-752036.jpeg
 
 
-if __name__ == "__main__":
+def run_subagent(name, query):
+    with tracing.span("agent", agent=name):
+        return get_subagent(name, current_tools(name)).run(query)
+
+
+def subagent_func(name):
+    # a plain function, not functools.partial: langchain 0.0.150 rejects partials as Tool funcs
+    def run(query):
+        return run_subagent(name, query)
+    return run
+
+
+def build_agent_chain(llm=None, memory=None, verbose=True):
+    """the top ReAct agent delegating to the subagents, as the REPL runs it.
+
+    llm defaults to PromptLayerOpenAI; bench.py passes a scripted one.
+    """
 
     subagent_tools = [
         Tool(
             name = "text_agent",
-            func=text_agent.run,
+            func=subagent_func("text_agent"),
             description="Use when doing video editing that requires manipulation of text elements, such as changing text color, etc."
         ),
         Tool(
             name = "subtitle_agent",
-            func=subtitle_agent.run,
+            func=subagent_func("subtitle_agent"),
             description="Use when doing video editing that requires manipulation of subtitle element, such as changing subtitle time, etc."
         ),
         Tool(
             name = "video_agent",
-            func=video_agent.run,
+            func=subagent_func("video_agent"),
             description="Use when doing video editing that requires manipulation of videos, such as trimming video, etc."
         ),
         Tool(
             name = "image_agent",
-            func=image_agent.run,
+            func=subagent_func("image_agent"),
             description="Use when doing video editing that requires manipulation of images, such as adding image transition, etc."
         ),
         Tool(
             name = "timeline_config_agent",
-            func=timeline_config_agent.run,
+            func=subagent_func("timeline_config_agent"),
             description="Use when doing video editing that requires manipulation of timeline configuration, such as adding timeline soundtrack, etc."
         ),
         Tool(
             name = "output_config_agent",
-            func=output_config_agent.run,
+            func=subagent_func("output_config_agent"),
             description="Use when doing video editing that requires manipulation of output configuration, such as changing output quality, etc."
         ),
     ]
 
-    tools = subagent_tools + [render_video]
+    tools = subagent_tools + [render_video.as_langchain()]
 
     prefix = """You are an agent operating a video editing online site, and you need to use the tools in sequence according to the objective as best you can.
     If the objective cannot be achieved by using the tools, or the objective is not related to the video editing task, directly return the final answer 'I don't know.'
@@ -78,14 +106,84 @@ if __name__ == "__main__":
         input_variables=["input", "chat_history", "agent_scratchpad"]
     )
 
-    memory = ConversationBufferMemory(memory_key="chat_history")
-
-    llm = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_agent"])
+    if llm is None:
+        llm = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_agent"])
     llm_chain = LLMChain(llm=llm, prompt=prompt)
 
     # agent = initialize_agent(tools, llm, agent="conversational-react-description", verbose=True)
-    agent = ZeroShotAgent(llm_chain=llm_chain, tools=tools, verbose=True)
-    agent_chain = AgentExecutor.from_agent_and_tools(agent=agent, tools=tools, verbose=True, memory=memory)
+    agent = ZeroShotAgent(llm_chain=llm_chain, tools=tools, verbose=verbose)
+    return AgentExecutor.from_agent_and_tools(agent=agent, tools=tools, verbose=verbose, memory=memory)
+
+
+def run_objective(query, agent_chain, fast_path, tool_selector=None, planner=None):
+    """one user request through the fast path, else the planner (if given) or the agents; returns the final answer.
+
+    Without a tool_selector the subagents see all their tools.
+    """
+
+    with tracing.span("request", mode="plan" if planner is not None else "react"):
+        # structured requests are parsed and run directly, with no LLM round trip
+        with tracing.span("agent", agent="fast_path"):
+            observations = fast_path.run(query + " then render the video using render_video.")
+        if observations is not None:
+            return "\n".join(observations)
+
+        # the subagents only see the tools retrieved for this query
+        with tool_selector.activate(query) if tool_selector is not None else contextlib.nullcontext():
+            print("------------------------------")
+
+            query += " then render the video using render_video."
+
+            if planner is not None:
+                try:
+                    with tracing.span("agent", agent="planner"):
+                        observations = planner.run(query)
+                    return "\n".join(f"{name}({tool_input}): {observation if observation is not None else 'done'}"
+                                     for name, tool_input, observation in observations)
+                except PlanError as e:
+                    print(f"Plan failed, falling back to the agents: {e}")
+                    # steps that already ran must not run again (moves and transitions would apply twice)
+                    if e.done:
+                        query += FALLBACK_PROGRESS.format(done="\n".join(f"{name}: {tool_input}" for name, tool_input in e.done))
+
+            with tracing.span("agent", agent="top"):
+                return agent_chain.run(input=query)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["react", "plan"], default="react",
+                        help="react: top agent delegating to the subagents; plan: one LLM call plans every tool call, executed locally")
+    parser.add_argument("--no-llm-cache", action="store_true", help="send every LLM call to the network")
+    parser.add_argument("--no-render-cache", action="store_true", help="render every request even if the edit did not change")
+    parser.add_argument("--render-cache-items", type=int, default=64, help="finished renders kept on disk")
+    parser.add_argument("--render-cache-ttl", type=float, default=23 * 3600, help="seconds a finished render is reused for")
+    parser.add_argument("--preview", action="store_true", help="return a low-quality preview first and finish the requested render in the background")
+    parser.add_argument("--keep-final", action="store_true", help="with --preview, let a background render finish even if the edit changes")
+    parser.add_argument("--segments", type=int, metavar="N", help="render long timelines as up to N segments in parallel, then stitch them")
+    parser.add_argument("--resume", action="store_true", help="continue the edit journaled by the previous run")
+    parser.add_argument("--trace", metavar="FILE", help="trace every request and write the spans to FILE on quit")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port (implies tracing)")
+    parser.add_argument("--callback-port", type=int, help="receive Shotstack render callbacks on this port instead of polling")
+    parser.add_argument("--callback-url", help="public URL Shotstack should call, when the port is reached through a tunnel or proxy")
+    parser.add_argument("--memory-tokens", type=int, default=800, help="token budget of the chat history in the agent prompt")
+    args = parser.parse_args()
+
+    cache = None if args.no_llm_cache else llm_cache.install()
+    tracer = tracing.install() if args.trace or args.metrics_port else None
+    if args.metrics_port:
+        tracer.serve(args.metrics_port)
+    if args.callback_port:
+        CallbackReceiver(get_render_manager(), port=args.callback_port, public_url=args.callback_url).start()
+    edit_journal = Journal.open(current_session(), resume=args.resume)
+    renders = None if args.no_render_cache else render_cache.install(max_items=args.render_cache_items, ttl=args.render_cache_ttl)
+    segmenter = segments.install(max_segments=args.segments) if args.segments else None
+    previews = preview.install(manager=segmenter, cancel_on_edit=not args.keep_final) if args.preview else None
+
+    # older turns are folded into a summary of the edit state so the prompt stays bounded
+    memory = EditStateMemory(memory_key="chat_history", max_tokens=args.memory_tokens)
+    agent_chain = build_agent_chain(memory=memory)
 
 
     # query = """first add a video from url 'https://shotstack-assets.s3.ap-southeast-2.amazonaws.com/examples/picture-in-picture/code.mp4', make it start from 3 sec and end at 7 sec, and name it 'code'. Then add a text with content 'Coding Forever', and let it begin at 0 and end at 7 sec, and change this text's background color to light purple. Also, add a 'zoom' transition in the beginning of that video 'code', and finally render it."""
@@ -97,22 +195,36 @@ if __name__ == "__main__":
     # base_prompt = f"""Now, the objective is: {query}"""
     # agent.run(base_prompt)
 
-    embeddings = OpenAIEmbeddings()
-    loader = TextLoader('./tools.txt')
-    docs = loader.load()
-    text_splitter = CharacterTextSplitter(chunk_size=200, chunk_overlap=20)
-    tools_texts = text_splitter.split_documents(docs)
-    tool_db = Chroma.from_documents(tools_texts, embeddings, collection_name="tool_test")
+    tool_db = load_tool_index('./tools.txt')
+    tool_selector = ToolSelector(tool_db)
+
+    fast_path = FastPath()
+    planner = None
+    if args.mode == "plan":
+        planner = PlanExecutor(PromptLayerOpenAI(temperature=0, max_tokens=1024, pl_tags=["shotstack_planner"]))
 
     while True:
         query = input("QUERY: ")
         if query == 'quit':
+            print(fast_path.report())
+            print(memory.report())
+            if renders is not None:
+                print(renders.report())
+            if cache is not None:
+                print(cache.report())
+            print(get_prober().report())
+            if previews is not None:
+                print(previews.report())
+            if segmenter is not None:
+                print(segmenter.report())
+            edit_journal.close()
+            if args.trace:
+                tracer.dump(args.trace)
+                print(f"trace written to {args.trace}")
             break
+        elif query in ('undo', 'redo'):
+            step = edit_journal.undo() if query == 'undo' else edit_journal.redo()
+            print(f"{query}: {step[0]} {step[1]}" if step else f"nothing to {query}.")
         else:
-            docs = tool_db.similarity_search(query)
-            print("------------------------------")
-            # print("the tool recommend from tools.py: " + "\n" + docs[0].page_content)
-            
-            query += " then render the video using render_video."
-            
-            agent_chain.run(input=query)
+            answer = run_objective(query, agent_chain, fast_path, tool_selector, planner)
+            print(answer)
@@ -0,0 +1,293 @@
+import concurrent.futures
+import struct
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+PREFIX_BYTES = 64 << 10
+
+# JPEG start-of-frame markers, the ones that carry the image size
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class AssetInfo:
+    """what a probe learned about a source file; fields it could not read are None."""
+
+    __slots__ = ("url", "ok", "status", "size", "content_type", "kind", "duration", "width", "height", "error")
+
+    def __init__(self, url, ok=False, status=None, size=None, content_type=None, kind=None,
+                 duration=None, width=None, height=None, error=None):
+        self.url = url
+        self.ok = ok
+        self.status = status
+        self.size = size
+        self.content_type = content_type
+        self.kind = kind
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.error = error
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__[1:] if getattr(self, k) is not None)
+        return f"AssetInfo({self.url!r}, {fields})"
+
+
+def _boxes(data, start=0, end=None):
+    """(type, payload start, box end) for the ISO-BMFF boxes in data[start:end], stopping at a truncated header."""
+
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def parse_moov(data, into):
+    """read duration from mvhd and the first video track's size from tkhd in a moov payload."""
+
+    for kind, start, end in _boxes(data):
+        if kind == b"mvhd" and end <= len(data):
+            version = data[start]
+            if version == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, start + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, start + 12)
+            if timescale:
+                into.duration = duration / timescale
+        elif kind == b"trak" and into.width is None:
+            for inner, inner_start, inner_end in _boxes(data, start, min(end, len(data))):
+                if inner == b"tkhd" and inner_end <= len(data):
+                    width, height = struct.unpack_from(">II", data, inner_end - 8)
+                    if width and height:
+                        into.width, into.height = width >> 16, height >> 16
+
+
+def parse_image(data, into):
+    """width and height from a PNG, GIF or JPEG header."""
+
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        into.width, into.height = struct.unpack_from(">II", data, 16)
+    elif data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        into.width, into.height = struct.unpack_from("<HH", data, 6)
+    elif data[:2] == b"\xff\xd8":
+        offset = 2
+        while offset + 9 <= len(data):
+            if data[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = data[offset + 1]
+            if marker in _SOF:
+                into.height, into.width = struct.unpack_from(">HH", data, offset + 5)
+                return
+            if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                offset += 1 if marker == 0xFF else 2
+                continue
+            offset += 2 + struct.unpack_from(">H", data, offset + 2)[0]
+
+
+class AssetProber:
+    """fetch source metadata (size, type, duration, dimensions) in the background, cached by URL.
+
+    A probe is one Range request for the first prefix_bytes, parsed as an mp4
+    (following the box sizes with more small Range requests when the moov
+    atom sits after the media data), or as a PNG/GIF/JPEG header; the whole
+    file is never downloaded. Results are kept for ttl seconds (errors for
+    error_ttl) in an LRU of max_items URLs, and concurrent probes of the same
+    URL share one request.
+    """
+
+    def __init__(self, session=None, max_workers=8, ttl=3600, error_ttl=60, max_items=1024,
+                 prefix_bytes=PREFIX_BYTES, timeout=10):
+        self._session = session
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_items = max_items
+        self.prefix_bytes = prefix_bytes
+        self.timeout = timeout
+        self.stats = Counter()
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="probe")
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            from downloader import get_http_session
+            self._session = get_http_session()
+        return self._session
+
+    def peek(self, url):
+        """the cached result for url, or None without waiting."""
+
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._cache.move_to_end(url)
+            return entry[1]
+
+    def probe_async(self, url):
+        """a future of the AssetInfo for url; starts a probe unless one is cached or running."""
+
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._cache.move_to_end(url)
+                self.stats["hits"] += 1
+                future = concurrent.futures.Future()
+                future.set_result(entry[1])
+                return future
+            if url in self._inflight:
+                self.stats["joined"] += 1
+                return self._inflight[url]
+            self.stats["probes"] += 1
+            future = self._executor.submit(self._probe, url)
+            self._inflight[url] = future
+        future.add_done_callback(lambda f: self._store(url, f))
+        return future
+
+    def probe(self, url, timeout=None):
+        return self.probe_async(url).result(timeout)
+
+    def _store(self, url, future):
+        info = future.result() if not future.cancelled() and future.exception() is None else AssetInfo(url, error="probe failed")
+        with self._lock:
+            self._inflight.pop(url, None)
+            ttl = self.ttl if info.ok else self.error_ttl
+            self._cache[url] = (time.monotonic() + ttl, info)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+
+    def _read(self, url, start, length):
+        """(response, up to length bytes from start) with a Range request."""
+
+        headers = {"Range": f"bytes={start}-{start + length - 1}"}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            data = b""
+            if r.ok:
+                for chunk in r.iter_content(16 << 10):
+                    data += chunk
+                    if len(data) >= length:
+                        break
+            return r, data[:length]
+
+    def _probe(self, url):
+        import requests
+
+        info = AssetInfo(url)
+        try:
+            r, data = self._read(url, 0, self.prefix_bytes)
+        except requests.RequestException as e:
+            info.error = f"{type(e).__name__}: {e}"
+            return info
+
+        info.status = r.status_code
+        if not r.ok:
+            info.error = f"HTTP {r.status_code}"
+            return info
+
+        info.ok = True
+        info.content_type = r.headers.get("Content-Type", "").split(";")[0] or None
+        content_range = r.headers.get("Content-Range", "")
+        if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+            info.size = int(content_range.rsplit("/", 1)[1])
+        elif r.status_code == 200 and r.headers.get("Content-Length", "").isdigit():
+            info.size = int(r.headers["Content-Length"])
+
+        try:
+            if data[4:8] == b"ftyp":
+                info.kind = "video"
+                self._probe_mp4(url, data, info)
+            else:
+                parse_image(data, info)
+                if info.width is not None:
+                    info.kind = "image"
+                elif info.content_type:
+                    info.kind = info.content_type.split("/")[0]
+        except (struct.error, requests.RequestException) as e:
+            info.error = f"unreadable header: {e}"
+        return info
+
+    def _probe_mp4(self, url, data, info, max_hops=8):
+        offset = 0
+        for _ in range(max_hops):
+            last_end = None
+            for kind, start, end in _boxes(data):
+                if kind == b"moov":
+                    if end > len(data):
+                        _, data = self._read(url, offset + start, end - start)
+                        start = 0
+                    else:
+                        data = data[start:end]
+                    parse_moov(data, info)
+                    return
+                last_end = end
+            else:
+                # the moov box starts past what we have: jump over the boxes before it
+                if last_end is None or info.size is not None and offset + last_end >= info.size:
+                    return
+                offset += last_end
+                _, data = self._read(url, offset, self.prefix_bytes)
+                if len(data) < 8:
+                    return
+
+    def report(self):
+        return (f"asset probe: {self.stats['probes']} probes, {self.stats['hits']} cache hits, "
+                f"{self.stats['joined']} joined in flight, {len(self._cache)} cached")
+
+
+class OfflineProber:
+    """a prober that never touches the network: nothing is known, so 'auto' lengths are refused at once."""
+
+    timeout = 0
+
+    def peek(self, url):
+        return None
+
+    def probe_async(self, url):
+        future = concurrent.futures.Future()
+        future.set_result(AssetInfo(url, error="probing is off"))
+        return future
+
+    def probe(self, url, timeout=None):
+        return self.probe_async(url).result()
+
+    def report(self):
+        return "asset probe: off"
+
+
+_prober = None
+_prober_lock = threading.Lock()
+
+
+def get_prober():
+    global _prober
+    with _prober_lock:
+        if _prober is None:
+            _prober = AssetProber()
+    return _prober
+
+
+def set_prober(prober):
+    """make the tools probe sources with this prober; None turns probing off, for offline runs against fake backends."""
+
+    global _prober
+    with _prober_lock:
+        _prober = prober if prober is not None else OfflineProber()
+    return _prober
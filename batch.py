@@ -0,0 +1,113 @@
+"""Render a file of prepared edits concurrently. Run `python batch.py edits.json --help`.
+
+The file is a JSON list, or JSON lines, of Shotstack edits ({"timeline": ...,
+"output": ...}), optionally wrapped as {"id": ..., "edit": {...}} to name
+them in the results manifest.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from edit_model import edit_from_dict
+from render_manager import RenderManager, RenderError
+from callback_receiver import CallbackReceiver
+
+
+def load_edits(path):
+    """[(id, edit dict)] from a JSON list or JSON lines file."""
+
+    with open(path) as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        items = json.loads(stripped)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    edits = []
+    for i, item in enumerate(items):
+        if "edit" in item:
+            edits.append((str(item.get("id", i)), item["edit"]))
+        else:
+            edits.append((str(i), item))
+    return edits
+
+
+async def _render_one(manager, edit_id, edit, results):
+    result = {"id": edit_id, "render_id": None, "status": "failed", "url": None, "error": None}
+    started = time.time()
+    try:
+        response = await (await manager.submit(edit))
+        result.update(render_id=response["id"], status=response["status"], url=response["url"])
+    except RenderError as e:
+        result.update(render_id=e.render_id, error=str(e))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.time() - started, 3)
+    results.append(result)
+    print(f"[{len(results)}] {edit_id}: {result['status']}" + (f" ({result['error']})" if result["error"] else ""))
+
+
+async def run_batch(edits, manager):
+    """render every (id, Edit) pair with the manager's concurrency cap; returns results in input order."""
+
+    results = []
+    await asyncio.gather(*(_render_one(manager, edit_id, edit, results) for edit_id, edit in edits))
+    order = {edit_id: i for i, (edit_id, _) in enumerate(edits)}
+    return sorted(results, key=lambda r: order[r["id"]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("edits", help="JSON or JSON lines file of edits")
+    parser.add_argument("--concurrency", type=int, default=8, help="renders submitted and unfinished at once")
+    parser.add_argument("--manifest", default="./render/batch.json", help="where to write the results")
+    parser.add_argument("--download", metavar="DIR", help="also download every finished render into DIR")
+    parser.add_argument("--callback-port", type=int, help="learn of finished renders from Shotstack callbacks on this port")
+    parser.add_argument("--callback-url", help="public URL for the callbacks, if not reachable at this host and port")
+    args = parser.parse_args(argv)
+
+    manager = RenderManager(max_in_flight=args.concurrency, max_workers=min(args.concurrency, 32))
+    if args.callback_port:
+        CallbackReceiver(manager, port=args.callback_port, public_url=args.callback_url).start()
+    configuration = manager.api.api_client.configuration
+    edits = [(edit_id, edit_from_dict(data, configuration)) for edit_id, data in load_edits(args.edits)]
+
+    started = time.time()
+    results = asyncio.run(run_batch(edits, manager))
+    elapsed = time.time() - started
+
+    if args.download:
+        from downloader import download_many, DownloadError
+
+        os.makedirs(args.download, exist_ok=True)
+        done = [r for r in results if r["url"]]
+        try:
+            paths = download_many([(r["url"], os.path.join(args.download, f"{r['id']}{os.path.splitext(r['url'])[1]}"))
+                                   for r in done])
+        except DownloadError as e:
+            print(f"{e}")
+        else:
+            for r, path in zip(done, paths):
+                r["path"] = path
+
+    succeeded = sum(r["status"] == "done" for r in results)
+    manifest = {"renders": len(results), "succeeded": succeeded, "seconds": round(elapsed, 3),
+                "concurrency": args.concurrency, "rate_limited": manager.rate_limited, "callbacks": manager.notified,
+                "results": results}
+    directory = os.path.dirname(args.manifest)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"{succeeded}/{len(results)} rendered in {elapsed:.1f}s "
+          f"({len(results) / elapsed if elapsed else 0:.2f} renders/s, {manager.rate_limited} rate-limited calls); "
+          f"manifest: {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
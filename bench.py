@@ -0,0 +1,447 @@
+"""Benchmarks for the editing backend. Run `python bench.py <name> --help`."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def bench_timeline(args):
+    from edit_model import Clip, TitleAsset, Track
+    from session import EditSession
+
+    rng = random.Random(0)
+    session = EditSession("bench")
+    t = 0.0
+    for i in range(args.subtitles):
+        length = rng.uniform(1.0, 3.0)
+        # a share of subtitles overlap the previous one, e.g. two speakers
+        start = t - length / 2 if rng.random() < args.overlap else t
+        asset = TitleAsset(style="subtitle", text=f"line {i}", size="medium", position="bottom")
+        session.subtitle_clip_dict[f"line {i}"] = Clip(asset=asset, start=max(start, 0.0), length=length)
+        t = start + length
+    for i in range(args.texts):
+        asset = TitleAsset(style="minimal", text=f"title {i}", size="x-large")
+        session.text_clip_dict[f"title {i}"] = Clip(asset=asset, start=i * 10.0, length=5.0)
+
+    def one_track_per_clip():
+        clips = list(session.text_clip_dict.values()) + list(session.subtitle_clip_dict.values())
+        return [Track(clips=[clip]) for clip in clips]
+
+    naive, naive_ms = _timed(one_track_per_clip)
+    cold, cold_ms = _timed(session.compile_tracks)
+    cold = len(cold)
+    _, warm_ms = _timed(session.compile_tracks)
+
+    clip = session.text_clip_dict["title 0"]
+    clip.length = 6.0
+    session.touch("text")
+    _, text_ms = _timed(session.compile_tracks)
+
+    clip = session.subtitle_clip_dict["line 0"]
+    clip.length += 0.1
+    session.touch("subtitle")
+    _, subtitle_ms = _timed(session.compile_tracks)
+
+    print(f"{args.subtitles} subtitles ({args.overlap:.0%} overlapping), {args.texts} texts")
+    print(f"one track per clip    {len(naive):>7} tracks  {naive_ms:9.1f} ms")
+    print(f"packed, cold          {cold:>7} tracks  {cold_ms:9.1f} ms")
+    print(f"packed, nothing dirty {'':>14}  {warm_ms:9.1f} ms")
+    print(f"packed, text dirty    {'':>14}  {text_ms:9.1f} ms")
+    print(f"packed, subtitle dirty{'':>14}  {subtitle_ms:9.1f} ms")
+
+
+IMPORT_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import tools
+t1 = time.perf_counter()
+tools.{tool}.run("'{query}'")
+t2 = time.perf_counter()
+heavy = [m for m in ("langchain", "openai", "shotstack_sdk", "requests") if m in sys.modules]
+print((t1 - t0) * 1000, (t2 - t0) * 1000, ",".join(heavy) or "-")
+"""
+
+
+def bench_imports(args):
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "PROMPTLAYER_API_KEY", "SHOTSTACK_KEY")}
+    probe = IMPORT_PROBE.format(tool=args.tool, query=args.query)
+
+    imports, calls = [], []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        import_ms, call_ms, heavy = out.stdout.split()
+        imports.append(float(import_ms))
+        calls.append(float(call_ms))
+
+    print(f"import tools                   median {statistics.median(imports):7.1f} ms  max {max(imports):7.1f} ms")
+    print(f"import tools + {args.tool}({args.query}) median {statistics.median(calls):7.1f} ms  max {max(calls):7.1f} ms")
+    print(f"heavy modules loaded: {heavy}")
+
+
+def bench_render(args):
+    import asyncio
+
+    from shotstack_sdk.model.clip        import Clip
+    from shotstack_sdk.model.edit        import Edit
+    from shotstack_sdk.model.output      import Output
+    from shotstack_sdk.model.timeline    import Timeline
+    from shotstack_sdk.model.title_asset import TitleAsset
+    from shotstack_sdk.model.track       import Track
+
+    from fake_shotstack import FakeShotstack
+    from render_manager import RenderManager
+    from batch import run_batch
+
+    fake = FakeShotstack(port=0, render_seconds=args.render_seconds, failure_rate=args.failure_rate,
+                         asset_bytes=args.asset_bytes).start()
+    os.environ["SHOTSTACK_HOST"] = fake.url
+    os.environ.setdefault("SHOTSTACK_KEY", "fake")
+
+    edits = []
+    for i in range(args.jobs):
+        clip = Clip(asset=TitleAsset(style="minimal", text=f"job {i}"), start=0.0, length=5.0)
+        edits.append((str(i), Edit(timeline=Timeline(tracks=[Track(clips=[clip])]), output=Output(format="mp4", resolution="sd"))))
+
+    manager = RenderManager(min_interval=args.min_interval, max_in_flight=args.concurrency,
+                            max_workers=min(args.concurrency, 32))
+    if args.callbacks:
+        from callback_receiver import CallbackReceiver
+        CallbackReceiver(manager, host="127.0.0.1", port=0).start()
+    t0 = time.perf_counter()
+    results = asyncio.run(run_batch(edits, manager))
+    elapsed = time.perf_counter() - t0
+
+    done = sum(r["status"] == "done" for r in results)
+    latencies = sorted(r["seconds"] for r in results)
+    print(f"{args.jobs} renders of {args.render_seconds}s, concurrency {args.concurrency}: {done} done in {elapsed:.1f}s "
+          f"({args.jobs / elapsed:.1f} renders/s)")
+    print(f"latency p50 {latencies[len(latencies) // 2]:.2f}s  p99 {latencies[int(len(latencies) * 0.99)]:.2f}s")
+    print(f"fake server: {fake.report()}" + (f"; {manager.notified} callbacks" if args.callbacks else ""))
+    fake.stop()
+
+
+def bench_pool(args):
+    import requests
+
+    from shotstack_sdk.model.clip        import Clip
+    from shotstack_sdk.model.edit        import Edit
+    from shotstack_sdk.model.output      import Output
+    from shotstack_sdk.model.timeline    import Timeline
+    from shotstack_sdk.model.title_asset import TitleAsset
+    from shotstack_sdk.model.track       import Track
+
+    from fake_shotstack import FakeShotstack
+    from render_manager import make_edit_api, get_edit_api
+    from downloader import download, get_http_session
+
+    fake = FakeShotstack(port=0, render_seconds=0.0, asset_bytes=args.asset_bytes).start()
+    os.environ["SHOTSTACK_HOST"] = fake.url
+    os.environ.setdefault("SHOTSTACK_KEY", "fake")
+
+    clip = Clip(asset=TitleAsset(style="minimal", text="pool"), start=0.0, length=5.0)
+    edit = Edit(timeline=Timeline(tracks=[Track(clips=[clip])]), output=Output(format="mp4", resolution="sd"))
+
+    def one_render(api, session, path):
+        render_id = api.post_render(edit)['response']['id']
+        # the fake renders instantly, so with --polls 0 its asset URL can be fetched straight away
+        response = {'url': f"{fake.url}/assets/{render_id}.mp4"}
+        for _ in range(args.polls):
+            response = api.get_render(render_id, data=False, merged=True)['response']
+        download(response['url'], path, session=session)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "video.mp4")
+        for label, fresh in (("new client per render", True), ("pooled", False)):
+            fake.stats.clear()
+            latencies = []
+            for _ in range(args.renders):
+                t0 = time.perf_counter()
+                if fresh:
+                    # what render_video used to do: a new ApiClient and a bare requests.get every time
+                    one_render(make_edit_api(), requests, path)
+                else:
+                    one_render(get_edit_api(), get_http_session(), path)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            print(f"{label:<22} median {statistics.median(latencies):7.2f} ms/render  "
+                  f"{fake.stats['connections'] / args.renders:5.2f} connections/render "
+                  f"({args.polls} polls + post + download each)")
+    fake.stop()
+
+
+def bench_segments(args):
+    import asyncio
+
+    from shotstack_sdk.model.clip        import Clip
+    from shotstack_sdk.model.edit        import Edit
+    from shotstack_sdk.model.output      import Output
+    from shotstack_sdk.model.timeline    import Timeline
+    from shotstack_sdk.model.title_asset import TitleAsset
+    from shotstack_sdk.model.track       import Track
+
+    from fake_shotstack import FakeShotstack
+    from render_manager import RenderManager
+    from segments import SegmentRenderer, SegmentPlanner
+
+    fake = FakeShotstack(port=0, render_seconds=args.overhead, jitter=0.0, asset_bytes=1 << 16,
+                         seconds_per_second=args.seconds_per_second).start()
+    os.environ["SHOTSTACK_HOST"] = fake.url
+    os.environ.setdefault("SHOTSTACK_KEY", "fake")
+
+    # scenes of a background, a title and back to back captions, with every third caption running into the
+    # next scene, so only some scene boundaries are clip-safe cuts
+    scenes = int(args.duration // args.scene_seconds)
+    layers = {"background": [], "title": [], "caption": []}
+    for i in range(scenes):
+        start = i * args.scene_seconds
+        layers["background"].append(Clip(asset=TitleAsset(style="minimal", text=f"scene {i}"), start=start,
+                                         length=args.scene_seconds))
+        layers["title"].append(Clip(asset=TitleAsset(style="future", text=f"title {i}"), start=start,
+                                    length=args.scene_seconds / 2))
+        overrun = args.scene_seconds / 4 if i % 3 == 2 and i < scenes - 1 else 0.0
+        layers["caption"].append(Clip(asset=TitleAsset(style="subtitle", text=f"caption {i}"), start=start,
+                                      length=args.scene_seconds + overrun))
+    edit = Edit(timeline=Timeline(tracks=[Track(clips=layers[k]) for k in ("caption", "title", "background")]),
+                output=Output(format="mp4", resolution="sd"))
+
+    planner = SegmentPlanner(overhead=args.overhead, seconds_per_second=args.seconds_per_second,
+                             stitch_overhead=args.overhead, stitch_seconds_per_second=args.seconds_per_second)
+    manager = RenderManager(min_interval=0.1, max_interval=0.5, max_in_flight=args.concurrency)
+    renderer = SegmentRenderer(manager, planner, max_segments=args.concurrency)
+    plan = renderer.plan(edit)
+
+    async def monolithic():
+        return await (await manager.submit(edit))
+
+    t0 = time.perf_counter()
+    asyncio.run(monolithic())
+    mono = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    asyncio.run(renderer.render_async(edit))
+    segmented = time.perf_counter() - t0
+
+    print(f"{args.duration:.0f}s timeline, {3 * scenes} clips in 3 layers, fake render "
+          f"{args.overhead}s + {args.seconds_per_second}s per clip-second, concurrency {args.concurrency}")
+    print(f"monolithic     {mono:6.2f}s (planner estimate {plan.monolithic_seconds:.2f}s)")
+    print(f"{len(plan.bounds):2d} segments    {segmented:6.2f}s (planner estimate {plan.seconds:.2f}s, "
+          f"speed-up {mono / segmented:.2f}x)")
+    print(f"fake server: {fake.report()}")
+    fake.stop()
+
+
+CODE = "https://shotstack-assets.s3.ap-southeast-2.amazonaws.com/examples/picture-in-picture/code.mp4"
+COMMENTARY = "https://shotstack-assets.s3.ap-southeast-2.amazonaws.com/examples/picture-in-picture/commentary.mp4"
+SKATER = "https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/footage/skater.hd.mp4"
+
+# the example objectives in agent.py, with the tool calls a well-behaved LLM makes for them
+SCENARIOS = {
+    "code": {
+        "query": f"first add a video from url '{CODE}', make it start from 3 sec and end at 7 sec, and name it 'code'. "
+                 "Then add a text with content 'Coding Forever', and let it begin at 0 and end at 7 sec, and change this "
+                 "text's background color to light purple. Also, add a 'zoom' transition in the beginning of that video "
+                 "'code', and finally render it.",
+        "steps": [("video_agent", f"add video {CODE} named code from 3.0 for 4.0"),
+                  ("text_agent", "add text Coding Forever from 0.0 for 7.0 with background #CBC3E3"),
+                  ("video_agent", "add zoom transition in to video code"),
+                  ("render_video", "render")],
+        "subagents": {
+            f"add video {CODE} named code from 3.0 for 4.0": [("add_video", f"'{CODE}, code, 3.0, 4.0'")],
+            "add text Coding Forever from 0.0 for 7.0 with background #CBC3E3": [
+                ("add_text", "'Coding Forever, 0.0, 7.0'"),
+                ("change_text_background_color", "'Coding Forever, #CBC3E3'")],
+            "add zoom transition in to video code": [("add_video_transition", "'code, zoom, in'")],
+        },
+    },
+    "commentary": {
+        "query": f"can you upload a video from '{COMMENTARY}', trim it starting from 12 sec. For subtitle, first change "
+                 "its word to 'buffalo buffalo buffalo', then its color to dark purple, and adjust its start time to 1 sec "
+                 "and last for 1 sec there. For the text in video, write as 'Handsome Man'. And about the image please crop "
+                 "half of its left and a quarter of its bottom, and give a reveal transition to it. Finally, render the video.",
+        "steps": [("video_agent", f"add video {COMMENTARY} named commentary and trim it from 12.0"),
+                  ("subtitle_agent", "add subtitle buffalo buffalo buffalo from 1.0 for 1.0 colored #301934"),
+                  ("text_agent", "add text Handsome Man"),
+                  ("image_agent", "crop the image left 0.5 bottom 0.25 and add reveal transition"),
+                  ("render_video", "render")],
+        "subagents": {
+            f"add video {COMMENTARY} named commentary and trim it from 12.0": [
+                ("add_video", f"'{COMMENTARY}, commentary, 0.0, 10.0'"),
+                ("trim_video", "'commentary, 12.0'")],
+            "add subtitle buffalo buffalo buffalo from 1.0 for 1.0 colored #301934": [
+                ("add_subtitle", "'buffalo buffalo buffalo, 1.0, 1.0'"),
+                ("change_subtitle_color", "'buffalo buffalo buffalo, #301934'")],
+            "add text Handsome Man": [("add_text", "'Handsome Man, 0.0, 10.0'")],
+            # there is no image yet, so the tools answer "not exist" and the subagent moves on
+            "crop the image left 0.5 bottom 0.25 and add reveal transition": [
+                ("crop_image", "'image, 0.0, 0.25, 0.5, 0.0'"),
+                ("add_image_transition", "'image, reveal, in'")],
+        },
+    },
+    "skater": {
+        "query": f"add a video from url {SKATER}, make it start from 0 sec and last for 5 sec, and name it 'skator'. "
+                 "Then add a text with content 'Sport Time', and let it begin at 0 and end at 7 sec.",
+        "steps": [("video_agent", f"add video {SKATER} named skator from 0.0 for 5.0"),
+                  ("text_agent", "add text Sport Time from 0.0 for 7.0"),
+                  ("render_video", "render")],
+        "subagents": {
+            f"add video {SKATER} named skator from 0.0 for 5.0": [("add_video", f"'{SKATER}, skator, 0.0, 5.0'")],
+            "add text Sport Time from 0.0 for 7.0": [("add_text", "'Sport Time, 0.0, 7.0'")],
+        },
+    },
+}
+
+# metrics a code change may not raise at all; the rest are timings, compared with --threshold
+EXACT_METRICS = ("llm_calls", "prompt_tokens", "completion_tokens", "tool_calls")
+
+
+def run_scenario(scenario):
+    import tools
+    from agent import build_agent_chain
+    from budget_memory import EditStateMemory
+    from fake_llm import Script, ScriptedLLM
+    from session import EditSession
+
+    script = Script(scenario["steps"], scenario["subagents"])
+    tools.set_llm_factory(lambda name: ScriptedLLM(script=script, role=name))
+    agent_chain = build_agent_chain(llm=ScriptedLLM(script=script), memory=EditStateMemory())
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with EditSession().activate(), contextlib.redirect_stdout(io.StringIO()):
+        agent_chain.run(input=scenario["query"] + " then render the video using render_video.")
+    wall_ms = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tools.set_llm_factory(None)
+
+    return {"wall_ms": round(wall_ms, 1), "peak_kib": round(peak / 1024, 1), **script.stats,
+            "tool_calls": sum(script.tool_calls.values()), "tool_calls_by_agent": dict(script.tool_calls)}
+
+
+def bench_e2e(args):
+    import asset_probe
+    from fake_shotstack import FakeShotstack
+
+    fake = FakeShotstack(port=0, render_seconds=args.render_seconds, asset_bytes=1 << 16).start()
+    # the scenarios' sources are real URLs the fake does not serve; the bench stays offline
+    asset_probe.set_prober(None)
+    os.environ["SHOTSTACK_HOST"] = fake.url
+    os.environ.setdefault("SHOTSTACK_KEY", "fake")
+    # no PromptLayer or OpenAI request is made, but the clients insist on keys
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.setdefault("PROMPTLAYER_API_KEY", "fake")
+
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as workdir:
+        # render_video writes ./render/video.mp4
+        os.chdir(workdir)
+        try:
+            for name in names:
+                runs = [run_scenario(SCENARIOS[name]) for _ in range(args.runs)]
+                results[name] = dict(runs[-1], wall_ms=statistics.median(r["wall_ms"] for r in runs))
+        finally:
+            os.chdir(cwd)
+    fake.stop()
+
+    print(f"{'scenario':<12}{'wall ms':>10}{'llm calls':>11}{'prompt tok':>12}{'compl tok':>11}{'peak KiB':>10}  tool calls")
+    for name, r in results.items():
+        by_agent = " ".join(f"{agent}={n}" for agent, n in sorted(r["tool_calls_by_agent"].items()))
+        print(f"{name:<12}{r['wall_ms']:>10.1f}{r['llm_calls']:>11}{r['prompt_tokens']:>12}{r['completion_tokens']:>11}"
+              f"{r['peak_kib']:>10.1f}  {by_agent}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for name, r in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            for metric in EXACT_METRICS:
+                if r[metric] > base[metric]:
+                    regressions.append(f"{name}: {metric} {base[metric]} -> {r[metric]}")
+            for metric in ("wall_ms", "peak_kib"):
+                if r[metric] > base[metric] * (1 + args.threshold):
+                    regressions.append(f"{name}: {metric} {base[metric]} -> {r[metric]} (> +{args.threshold:.0%})")
+        if regressions:
+            print("regressions against " + args.baseline + ":\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    timeline = commands.add_parser("timeline", help="lane packing and incremental track compilation")
+    timeline.add_argument("--subtitles", type=int, default=10000)
+    timeline.add_argument("--texts", type=int, default=100)
+    timeline.add_argument("--overlap", type=float, default=0.1)
+    timeline.set_defaults(func=bench_timeline)
+
+    imports = commands.add_parser("imports", help="cold `import tools` plus one direct tool call, no API keys set")
+    imports.add_argument("--runs", type=int, default=10)
+    imports.add_argument("--tool", default="change_output_resolution")
+    imports.add_argument("--query", default="hd")
+    imports.set_defaults(func=bench_imports)
+
+    render = commands.add_parser("render", help="many renders through RenderManager against the local fake Shotstack")
+    render.add_argument("--jobs", type=int, default=1000)
+    render.add_argument("--concurrency", type=int, default=64)
+    render.add_argument("--render-seconds", type=float, default=2.0)
+    render.add_argument("--failure-rate", type=float, default=0.0)
+    render.add_argument("--asset-bytes", type=int, default=1 << 16)
+    render.add_argument("--min-interval", type=float, default=0.5)
+    render.add_argument("--callbacks", action="store_true", help="complete renders from callbacks, polling only as a fallback")
+    render.set_defaults(func=bench_render)
+
+    pool = commands.add_parser("pool", help="per-render latency and connections, new clients vs the shared pools")
+    pool.add_argument("--renders", type=int, default=200)
+    pool.add_argument("--polls", type=int, default=3)
+    pool.add_argument("--asset-bytes", type=int, default=1 << 16)
+    pool.set_defaults(func=bench_pool)
+
+    segments = commands.add_parser("segments", help="monolithic vs segment-parallel render of a long timeline on the fake")
+    segments.add_argument("--duration", type=float, default=600.0, help="timeline length in seconds")
+    segments.add_argument("--scene-seconds", type=float, default=20.0)
+    segments.add_argument("--concurrency", type=int, default=8)
+    segments.add_argument("--overhead", type=float, default=0.5, help="fake render time of any edit")
+    segments.add_argument("--seconds-per-second", type=float, default=0.005, help="fake render time per clip-second")
+    segments.set_defaults(func=bench_segments)
+
+    e2e = commands.add_parser("e2e", help="the example objectives through the agents, scripted LLM and fake renders")
+    e2e.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="run only these (repeatable)")
+    e2e.add_argument("--runs", type=int, default=3, help="wall time is the median over runs")
+    e2e.add_argument("--render-seconds", type=float, default=0.5)
+    e2e.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    e2e.add_argument("--baseline", metavar="FILE", help="exit 1 if any scenario regressed against this baseline")
+    e2e.add_argument("--threshold", type=float, default=0.25, help="allowed relative increase in wall time and peak memory")
+    e2e.set_defaults(func=bench_e2e)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
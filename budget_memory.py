@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Tuple
+
+from langchain.schema import BaseMemory
+
+from session import current_session
+from tokens import count_tokens
+
+
+def _fmt(t):
+    return f"{t:g}"
+
+
+def describe_edit_state(session, max_tokens):
+    """a compact one-line-per-kind account of the clips, times and output settings, within max_tokens."""
+
+    parts = []
+    for label, clips in (("text", session.text_clip_dict), ("subtitle", session.subtitle_clip_dict),
+                         ("video/image", session.video_and_image_clip_dict)):
+        if clips:
+            items = [f"'{name}' {_fmt(clip.start)}-{_fmt(clip.start + clip.length)}s" for name, clip in clips.items()]
+            parts.append((label, items))
+
+    output = session.output
+    settings = [f"{attr} {getattr(output, attr, None)}" for attr in ("format", "resolution", "quality", "aspectRatio", "fps")
+                if getattr(output, attr, None) is not None]
+    settings.append(f"background {getattr(session.timeline, 'background', None)}")
+
+    lines = [f"output: {', '.join(settings)}"]
+    budget = max_tokens - count_tokens(lines[0])
+    for label, items in parts:
+        line = f"{label}: " + "; ".join(items)
+        # keep dropping the latest-added clips of this kind until the line fits its share
+        share = budget // len(parts)
+        kept = len(items)
+        while kept and count_tokens(line) > share:
+            kept = kept * 3 // 4
+            line = f"{label}: " + "; ".join(items[:kept]) + f"; ... and {len(items) - kept} more"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class EditStateMemory(BaseMemory):
+    """conversation memory under a hard token budget.
+
+    Recent turns are kept verbatim. When they exceed the budget the oldest
+    turns are dropped; what they did is not lost, because the prompt always
+    starts with a summary of the current edit state (clips with their times,
+    output settings) taken from the active EditSession, which is exactly
+    what those turns produced. The summary gets at most summary_share of the
+    budget, the turns the rest.
+    """
+
+    memory_key: str = "chat_history"
+    max_tokens: int = 800
+    summary_share: float = 0.5
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    turns: List[Tuple[str, str]] = []
+    folded_turns: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _turn_text(self, turn):
+        human, ai = turn
+        return f"{self.human_prefix}: {human}\n{self.ai_prefix}: {ai}"
+
+    def _summary(self):
+        session = current_session()
+        summary = describe_edit_state(session, int(self.max_tokens * self.summary_share))
+        if self.folded_turns:
+            summary = f"(edit state after {self.folded_turns} earlier requests)\n" + summary
+        return summary
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        return {self.memory_key: "\n".join([self._summary()] + [self._turn_text(t) for t in self.turns])}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        human = inputs.get("input") or next(v for k, v in inputs.items() if k != self.memory_key)
+        ai = outputs.get("output") or next(iter(outputs.values()))
+        self.turns.append((human, ai))
+
+        # each turn is counted with the newline joining it to the history, as load_memory_variables lays them out
+        budget = self.max_tokens - count_tokens(self._summary())
+        used = sum(count_tokens("\n" + self._turn_text(t)) for t in self.turns)
+        while self.turns and used > budget:
+            used -= count_tokens("\n" + self._turn_text(self.turns.pop(0)))
+            self.folded_turns += 1
+            # the summary grows by its "(edit state after N earlier requests)" line
+            budget = self.max_tokens - count_tokens(self._summary())
+
+    def clear(self) -> None:
+        self.turns = []
+        self.folded_turns = 0
+
+    def token_count(self):
+        return count_tokens(self.load_memory_variables({})[self.memory_key])
+
+    def report(self):
+        return (f"memory: {self.token_count()}/{self.max_tokens} tokens, {len(self.turns)} turns verbatim, "
+                f"{self.folded_turns} folded into the edit state")
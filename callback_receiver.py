@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CallbackReceiver:
+    """receive Shotstack's render callbacks and wake the RenderManager waiting on those renders.
+
+    The callback body is only used for its render id: the manager then polls
+    that render, so the result is the same get_render response as without
+    callbacks and a forged callback costs one extra poll, nothing more.
+    public_url is the address Shotstack can reach this receiver at (for
+    example through a tunnel); it defaults to the local address.
+    """
+
+    def __init__(self, manager, host="0.0.0.0", port=8780, public_url=None, path="/callback"):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.path = path
+        self.public_url = public_url
+        self.received = 0
+        self._server = None
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.split("?")[0] != receiver.path:
+                    return self._reply(404)
+                try:
+                    render_id = json.loads(body)["id"]
+                except (ValueError, KeyError, TypeError):
+                    return self._reply(400)
+                receiver.received += 1
+                receiver.manager.notify_threadsafe(render_id)
+                self._reply(200)
+
+            def _reply(self, code):
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        if self.public_url is None:
+            host = "127.0.0.1" if self.host == "0.0.0.0" else self.host
+            self.public_url = f"http://{host}:{self.port}{self.path}"
+        threading.Thread(target=self._server.serve_forever, name="render-callbacks", daemon=True).start()
+
+        self.manager.webhook_url = self.public_url
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.manager.webhook_url = None
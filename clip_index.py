@@ -0,0 +1,119 @@
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "priority", "max_end", "left", "right")
+
+    def __init__(self, start, end, key, priority):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = priority
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+    def update(self):
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left, left.right = left.right, node
+    node.update()
+    left.update()
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right, right.left = right.left, node
+    node.update()
+    right.update()
+    return right
+
+
+class ClipIndex:
+    """the session's clip spans keyed by (kind, name), kept so the timeline's end is O(1).
+
+    A treap ordered by start time where every node also carries the largest end
+    time in its subtree, so the root holds the end of the last clip. Clips are
+    half-open intervals [start, start + length). Inserts, moves and removals
+    are O(log n) expected.
+    """
+
+    def __init__(self, seed=0):
+        self._root = None
+        self._spans = {}
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def span(self, kind, name):
+        return self._spans.get((kind, name))
+
+    def end(self):
+        """end of the last clip on the timeline, 0 when empty."""
+
+        return self._root.max_end if self._root is not None else 0.0
+
+    def add(self, kind, name, start, end):
+        """insert a clip, or move it if it is already indexed."""
+
+        key = (kind, name)
+        if key in self._spans:
+            if self._spans[key] == (start, end):
+                return
+            self._root = self._delete(self._root, self._spans[key][0], key)
+        self._spans[key] = (start, end)
+        self._root = self._insert(self._root, _Node(start, end, key, self._random.random()))
+
+    def remove(self, kind, name):
+        key = (kind, name)
+        if key in self._spans:
+            start, _ = self._spans.pop(key)
+            self._root = self._delete(self._root, start, key)
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if (new.start, new.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        node.update()
+        return node
+
+    def _delete(self, node, start, key):
+        if node is None:
+            return None
+        if node.key == key:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right = self._delete(node.right, start, key)
+            else:
+                node = _rotate_left(node)
+                node.left = self._delete(node.left, start, key)
+        elif (start, key) < (node.start, node.key):
+            node.left = self._delete(node.left, start, key)
+        else:
+            node.right = self._delete(node.right, start, key)
+        node.update()
+        return node
@@ -0,0 +1,188 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+
+CHUNK_SIZE = 1 << 20
+# client errors worth another attempt; any other 4xx will not change on retry
+RETRY_STATUSES = {408, 416, 429}
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _file_digest(path, algorithm, chunk_size=CHUNK_SIZE):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _total_size(r, offset):
+    content_range = r.headers.get('Content-Range')
+    if content_range:
+        match = re.match(r'bytes \d+-\d+/(\d+)', content_range)
+        if match:
+            return int(match.group(1))
+    if r.headers.get('Content-Length') is not None:
+        return offset + int(r.headers['Content-Length'])
+    return None
+
+
+def _unsatisfiable_size(r):
+    # a 416 names the object's current length as 'bytes */<size>'
+    match = re.fullmatch(r'bytes \*/(\d+)', r.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+def _read_origin(part):
+    try:
+        with open(part + '.origin') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_origin(part, url, etag):
+    with open(part + '.origin', 'w') as f:
+        json.dump({'url': url, 'etag': etag}, f)
+
+
+def _discard(part):
+    for stale in (part, part + '.origin'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def _etag_md5(etag):
+    # a single-part S3 object's ETag is the hex md5 of its body
+    if etag and re.fullmatch(r'"?[0-9a-f]{32}"?', etag):
+        return etag.strip('"')
+    return None
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """the process-wide requests.Session for asset downloads, keeping connections to each host alive."""
+
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32)
+            _http_session.mount('https://', adapter)
+            _http_session.mount('http://', adapter)
+    return _http_session
+
+
+def download(url, path, sha256=None, session=None, chunk_size=CHUNK_SIZE, retries=3, timeout=30):
+    """stream url to path, holding at most one chunk in memory.
+
+    Bytes go to 'path.part', with the url and ETag they came from in
+    'path.part.origin'; after a dropped connection the next attempt asks for
+    the remainder with an HTTP Range request (If-Range on the ETag, so a changed
+    object restarts from zero). A part left by a download of another url, or
+    of unknown origin, is discarded rather than resumed. Once complete the file
+    is checked against sha256 if given, otherwise against the ETag when it is a
+    plain md5, and only then renamed over path, so path never holds a partial
+    download. Connection errors, 5xx, 408 and 429 are retried; other 4xx fail
+    at once."""
+
+    session = session or get_http_session()
+    part = path + '.part'
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    origin = _read_origin(part)
+    if origin is None or origin.get('url') != url:
+        _discard(part)
+    etag = origin.get('etag') if origin else None
+
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if etag:
+                headers['If-Range'] = etag
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if offset and r.status_code == 416:
+                    # the part is complete only if it is exactly as long as the object
+                    if _unsatisfiable_size(r) == offset:
+                        break
+                    _discard(part)
+                    raise DownloadError(f"resume of {url} at {offset} bytes refused")
+                r.raise_for_status()
+                if r.status_code != 206:
+                    offset = 0
+
+                etag = r.headers.get('ETag', etag)
+                total = _total_size(r, offset)
+                _write_origin(part, url, etag)
+
+                with open(part, 'ab' if offset else 'wb') as f:
+                    for chunk in r.iter_content(chunk_size):
+                        f.write(chunk)
+
+            size = os.path.getsize(part)
+            if total is not None and size != total:
+                raise DownloadError(f"incomplete download of {url}: {size} of {total} bytes")
+            break
+
+        except (requests.RequestException, DownloadError) as e:
+            status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+            if status is not None and 400 <= status < 500 and status not in RETRY_STATUSES:
+                raise DownloadError(f"unable to download {url}: {e}") from e
+            if attempt == retries:
+                raise DownloadError(f"unable to download {url}: {e}") from e
+            time.sleep(min(2 ** attempt, 10))
+
+    if sha256 is not None:
+        expected, actual = sha256.lower(), _file_digest(part, 'sha256', chunk_size)
+    elif _etag_md5(etag) is not None:
+        expected, actual = _etag_md5(etag), _file_digest(part, 'md5', chunk_size)
+    else:
+        expected = actual = None
+
+    if expected != actual:
+        _discard(part)
+        raise DownloadError(f"checksum mismatch for {url}: expected {expected}, got {actual}")
+
+    os.replace(part, path)
+    _discard(part)
+    return path
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def download_async(url, path, **kwargs):
+    """queue a download on a shared pool so downloads for concurrent renders run in parallel."""
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(4, thread_name_prefix="download")
+    return _executor.submit(download, url, path, **kwargs)
+
+
+def download_many(jobs, **kwargs):
+    """download a list of (url, path) pairs in parallel and return their paths in order."""
+
+    futures = [download_async(url, path, **kwargs) for url, path in jobs]
+    return [future.result() for future in futures]
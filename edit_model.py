@@ -0,0 +1,134 @@
+"""The edit state the tools build: plain dicts shaped like the Shotstack API's JSON.
+
+The tools, sessions and the timeline compiler work on these instead of
+shotstack_sdk models, whose package costs more to import than the rest of the
+agent together. Each model reads and writes its fields as attributes, like the
+SDK's (including Transition's _in for "in"), so the code using them reads the
+same. The SDK is only imported by to_sdk, when RenderManager posts the edit.
+"""
+
+
+# attribute names the SDK uses for JSON keys that are not Python identifiers
+_KEYS = {"_in": "in"}
+
+
+class Model(dict):
+    """a JSON object whose fields are also attributes; unset ones raise AttributeError, as the SDK's do."""
+
+    __slots__ = ()
+    # the asset type Shotstack tells assets apart by
+    TYPE = None
+
+    def __init__(self, **fields):
+        super().__init__()
+        if self.TYPE is not None:
+            self["type"] = self.TYPE
+        for name, value in fields.items():
+            self[_KEYS.get(name, name)] = value
+
+    def __getattr__(self, name):
+        try:
+            return self[_KEYS.get(name, name)]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[_KEYS.get(name, name)] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[_KEYS.get(name, name)]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+    def to_dict(self):
+        return to_json(self)
+
+
+class Edit(Model):
+    __slots__ = ()
+
+
+class Timeline(Model):
+    __slots__ = ()
+
+
+class Soundtrack(Model):
+    __slots__ = ()
+
+
+class Track(Model):
+    __slots__ = ()
+
+
+class Clip(Model):
+    __slots__ = ()
+
+
+class TitleAsset(Model):
+    __slots__ = ()
+    TYPE = "title"
+
+
+class VideoAsset(Model):
+    __slots__ = ()
+    TYPE = "video"
+
+
+class ImageAsset(Model):
+    __slots__ = ()
+    TYPE = "image"
+
+
+class Crop(Model):
+    __slots__ = ()
+
+
+class Transition(Model):
+    __slots__ = ()
+
+
+class Output(Model):
+    __slots__ = ()
+
+
+class Poster(Model):
+    __slots__ = ()
+
+
+class Thumbnail(Model):
+    __slots__ = ()
+
+
+def to_json(value):
+    """value as plain JSON types, unset (None) fields dropped; SDK models are accepted too."""
+
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if hasattr(value, "to_dict"):
+        return to_json(value.to_dict())
+    return value
+
+
+def edit_from_dict(data, configuration=None):
+    """build an Edit (with all its nested models) from its JSON form, as the API documents it."""
+
+    import shotstack_sdk as shotstack
+    from shotstack_sdk.model.edit import Edit
+    from shotstack_sdk.model_utils import validate_and_convert_types
+
+    return validate_and_convert_types(data, (Edit,), ["edit"], True, True,
+                                      configuration=configuration or shotstack.Configuration())
+
+
+def to_sdk(edit, configuration=None):
+    """the shotstack_sdk Edit for an edit built from these models; an SDK Edit is returned as is."""
+
+    if isinstance(edit, dict):
+        return edit_from_dict(to_json(edit), configuration)
+    return edit
@@ -0,0 +1,28 @@
+import contextvars
+from contextlib import contextmanager
+
+
+_sink = contextvars.ContextVar("event_sink", default=None)
+
+
+def current_sink():
+    return _sink.get()
+
+
+@contextmanager
+def listen(sink):
+    """send the progress events (tool calls, render status) emitted in this context to sink(event dict)."""
+
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+def emit(kind, sink=None, **data):
+    """report progress to the context's sink, or to sink when the event happens outside that context."""
+
+    sink = sink if sink is not None else _sink.get()
+    if sink is not None:
+        sink(dict(type=kind, **data))
@@ -0,0 +1,70 @@
+import time
+from collections import Counter
+from typing import Any, List, Optional
+
+from langchain.llms.base import LLM
+
+from tokens import count_tokens
+
+
+FINAL_ANSWER = " I now know the final answer\nFinal Answer: done"
+
+
+class Script:
+    """the replies of every agent for one scenario, and what asking for them cost.
+
+    steps is the top agent's [(tool, input)] in order; subagents maps each
+    input the top agent gives a subagent to that subagent's [(tool, input)].
+    An agent's next reply is picked by how many observations its prompt
+    already holds, so the same prompt always gets the same reply and a
+    ReAct loop replays exactly.
+    """
+
+    def __init__(self, steps, subagents):
+        self.steps = steps
+        self.subagents = subagents
+        self.stats = Counter()
+        self.tool_calls = Counter()
+
+    def reply(self, role, prompt):
+        self.stats["llm_calls"] += 1
+        self.stats["prompt_tokens"] += count_tokens(prompt)
+
+        if role == "agent":
+            scratchpad = prompt[prompt.rfind("Objective:"):]
+            steps = self.steps
+        else:
+            scratchpad = prompt[prompt.rfind("Question:"):]
+            question = scratchpad.split("\n", 1)[0][len("Question:"):].strip()
+            steps = self.subagents.get(question, [])
+
+        done = scratchpad.count("Observation:")
+        if done < len(steps):
+            tool, tool_input = steps[done]
+            self.tool_calls[role] += 1
+            text = f" I should use {tool}.\nAction: {tool}\nAction Input: {tool_input}"
+        else:
+            text = FINAL_ANSWER
+
+        self.stats["completion_tokens"] += count_tokens(text)
+        return text
+
+
+class ScriptedLLM(LLM):
+    """an LLM whose completions come from a Script, for benchmarking the agents offline.
+
+    latency seconds are slept per call, to stand in for a real model's response time.
+    """
+
+    script: Any
+    role: str = "agent"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.script.reply(self.role, prompt)
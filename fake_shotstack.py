@@ -0,0 +1,328 @@
+"""A local stand-in for the Shotstack render API, for offline and load testing.
+
+    python fake_shotstack.py --port 8765 --render-seconds 5 --failure-rate 0.01
+    export SHOTSTACK_HOST=http://127.0.0.1:8765 SHOTSTACK_KEY=fake
+
+It implements POST /render and GET /render/{id} as the SDK calls them. A
+render moves through queued, fetching, rendering and saving to done (or
+failed) on a clock started when it was posted, optionally longer for edits
+with more clip-seconds, so polling costs nothing but the request. Finished renders point at /assets/{id}.mp4, a small but valid
+mp4 (ftyp + moov with mvhd/tkhd + padding) with the edit's duration and
+resolution, served with HEAD, Range and an md5 ETag like S3. An edit with a
+callback URL gets it POSTed when its render finishes, as Shotstack does.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import random
+import re
+import struct
+import threading
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+RESOLUTIONS = {"preview": (512, 288), "mobile": (640, 360), "sd": (1024, 576), "hd": (1280, 720), "1080": (1920, 1080)}
+
+# share of the render time spent in each status before done
+PHASES = (("queued", 0.1), ("fetching", 0.2), ("rendering", 0.6), ("saving", 0.1))
+
+
+def _box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+_MATRIX = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def make_mp4(duration, width, height, size, faststart=True):
+    """a minimal mp4 of about size bytes whose headers report duration (s) and width x height.
+
+    With faststart=False the moov box comes after the media data, as many encoders write it.
+    """
+
+    ms = int(duration * 1000)
+    mvhd = _box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, 1000, ms) + struct.pack(">IH10x", 0x10000, 0x100)
+                + _MATRIX + bytes(24) + struct.pack(">I", 2))
+    tkhd = _box(b"tkhd", struct.pack(">IIII4xI8xHHH2x", 3, 0, 0, 1, ms, 0, 0, 0)
+                + _MATRIX + struct.pack(">II", width << 16, height << 16))
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 0x200) + b"isomiso2mp41")
+    moov = _box(b"moov", mvhd + _box(b"trak", tkhd))
+    mdat = _box(b"mdat", bytes(max(size - len(ftyp) - len(moov) - 8, 0)))
+    return ftyp + moov + mdat if faststart else ftyp + mdat + moov
+
+
+def _edit_shape(edit):
+    """(duration, width, height) of a posted edit in its JSON form, and its clip-seconds."""
+
+    end = work = 0.0
+    for track in edit.get("timeline", {}).get("tracks", []):
+        for clip in track.get("clips", []):
+            end = max(end, float(clip.get("start", 0)) + float(clip.get("length", 0)))
+            work += float(clip.get("length", 0))
+    width, height = RESOLUTIONS.get(edit.get("output", {}).get("resolution"), RESOLUTIONS["sd"])
+    return (end, width, height), work
+
+
+class FakeShotstack:
+    """the fake API's state and knobs; start() serves it from a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=8765, render_seconds=5.0, jitter=0.5, failure_rate=0.0,
+                 asset_bytes=1 << 20, rate_limit=None, seed=0, faststart=True, seconds_per_second=0.0):
+        self.host = host
+        self.port = port
+        self.render_seconds = render_seconds
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.asset_bytes = asset_bytes
+        self.rate_limit = rate_limit
+        self.faststart = faststart
+        self.seconds_per_second = seconds_per_second
+        self.stats = Counter()
+
+        self._random = random.Random(seed)
+        self._renders = {}
+        self._assets = {}
+        self._lock = threading.Lock()
+        self._tokens = rate_limit or 0
+        self._refilled = time.monotonic()
+        self._server = None
+        self._callbacks = []
+        self._callbacks_ready = threading.Condition(self._lock)
+        self._callback_thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _allow(self):
+        # token bucket of rate_limit requests per second
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+        return False
+
+    def count(self, name):
+        # the handlers run on one thread per connection
+        with self._lock:
+            self.stats[name] += 1
+
+    def post(self, edit):
+        render_id = str(uuid.uuid4())
+        with self._lock:
+            shape, work = _edit_shape(edit)
+            seconds = self.render_seconds + self.seconds_per_second * work
+            seconds = max(seconds * (1 + self._random.uniform(-self.jitter, self.jitter)), 0.0)
+            failed = self._random.random() < self.failure_rate
+            self._renders[render_id] = (time.monotonic(), seconds, failed, shape, _now())
+            if edit.get("callback"):
+                heapq.heappush(self._callbacks, (time.monotonic() + seconds, render_id, edit["callback"]))
+                self._callbacks_ready.notify()
+                if self._callback_thread is None:
+                    self._callback_thread = threading.Thread(target=self._send_callbacks, name="fake-callbacks", daemon=True)
+                    self._callback_thread.start()
+        return render_id
+
+    def _send_callbacks(self):
+        # one thread delivers every callback, in the order the renders finish
+        while True:
+            with self._lock:
+                while not self._callbacks or self._callbacks[0][0] > time.monotonic():
+                    self._callbacks_ready.wait(self._callbacks[0][0] - time.monotonic() if self._callbacks else None)
+                _, render_id, url = heapq.heappop(self._callbacks)
+
+            response = self.status(render_id)
+            body = {"type": "edit", "action": "render", "id": render_id, "owner": "fake", "status": response["status"],
+                    "url": response.get("url"), "error": response.get("error"), "completed": _now()}
+            request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+                outcome = "callbacks"
+            except OSError:
+                outcome = "callback_errors"
+            self.count(outcome)
+
+    def status(self, render_id):
+        posted, seconds, failed, shape, created = self._renders[render_id]
+        elapsed = time.monotonic() - posted
+        response = {"id": render_id, "owner": "fake", "plan": "sandbox", "created": created, "updated": _now()}
+
+        done_at = 0.0
+        for status, share in PHASES:
+            done_at += share * seconds
+            if elapsed < min(done_at, seconds):
+                response["status"] = status
+                return response
+
+        if failed:
+            response.update(status="failed", error="render failed (fake failure)")
+            return response
+        response.update(status="done", url=f"{self.url}/assets/{render_id}.mp4", duration=shape[0],
+                        renderTime=round(seconds * 1000, 1))
+        return response
+
+    def asset(self, render_id):
+        with self._lock:
+            if render_id not in self._assets:
+                _, _, _, (duration, width, height), _ = self._renders[render_id]
+                body = make_mp4(duration, width, height, self.asset_bytes, self.faststart)
+                self._assets[render_id] = (body, hashlib.md5(body).hexdigest())
+            return self._assets[render_id]
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-shotstack", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def report(self):
+        return ", ".join(f"{k} {v}" for k, v in sorted(self.stats.items()))
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, so clients that pool connections can reuse them
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; with Nagle on, a reused connection would wait on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            api.count("connections")
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, code, body, headers=()):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _limited(self):
+            if api._allow():
+                return False
+            api.count("429")
+            self._json(429, {"success": False, "message": "Too Many Requests"}, [("Retry-After", "1")])
+            return True
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not re.search(r"/render/?$", self.path):
+                return self._json(404, {"success": False, "message": "Not Found"})
+            if self._limited():
+                return
+            api.count("post_render")
+            render_id = api.post(json.loads(body or b"{}"))
+            self._json(201, {"success": True, "message": "Created",
+                             "response": {"message": "Render Successfully Queued", "id": render_id}})
+
+        def do_GET(self):
+            match = re.search(r"/render/([\w-]+)", self.path)
+            if match:
+                if self._limited():
+                    return
+                api.count("get_render")
+                if match.group(1) not in api._renders:
+                    return self._json(404, {"success": False, "message": "Not Found"})
+                return self._json(200, {"success": True, "message": "OK", "response": api.status(match.group(1))})
+
+            match = re.search(r"/assets/([\w-]+)\.mp4", self.path)
+            if match and match.group(1) in api._renders:
+                api.count("asset")
+                return self._send_asset(*api.asset(match.group(1)))
+            self._json(404, {"success": False, "message": "Not Found"})
+
+        def do_HEAD(self):
+            match = re.search(r"/assets/([\w-]+)\.mp4", self.path)
+            if not (match and match.group(1) in api._renders):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            api.count("asset_head")
+            self._send_asset(*api.asset(match.group(1)), head=True)
+
+        def _send_asset(self, body, md5, head=False):
+            start, end = 0, len(body) - 1
+            code = 200
+            ranged = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if ranged and self.headers.get("If-Range", f'"{md5}"') == f'"{md5}"':
+                start = int(ranged.group(1))
+                end = min(int(ranged.group(2) or end), end)
+                if start >= len(body):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(body)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                code = 206
+
+            self.send_response(code)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("ETag", f'"{md5}"')
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start + 1))
+            if code == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            self.end_headers()
+            if not head:
+                self.wfile.write(body[start:end + 1])
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--render-seconds", type=float, default=5.0, help="mean time from post to done")
+    parser.add_argument("--seconds-per-second", type=float, default=0.0, help="extra render time per second of each clip")
+    parser.add_argument("--jitter", type=float, default=0.5, help="render time varies by up to this share")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of renders that end failed")
+    parser.add_argument("--asset-bytes", type=int, default=1 << 20, help="size of each rendered file")
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering 429")
+    parser.add_argument("--moov-last", action="store_true", help="write the mp4 moov box after the media data")
+    args = parser.parse_args(argv)
+
+    api = FakeShotstack(args.host, args.port, args.render_seconds, args.jitter, args.failure_rate,
+                        args.asset_bytes, args.rate_limit, faststart=not args.moov_last,
+                        seconds_per_second=args.seconds_per_second).start()
+    print(f"fake Shotstack at {api.url}\nexport SHOTSTACK_HOST={api.url} SHOTSTACK_KEY=fake")
+    try:
+        while True:
+            time.sleep(10)
+            print(api.report())
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
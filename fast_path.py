@@ -0,0 +1,182 @@
+import re
+import threading
+import time
+from collections import Counter
+
+
+NUM = r"(-?\d+(?:\.\d+)?)"
+SEC = r"(?:\s?(?:s|sec|secs|second|seconds)\b)?"
+QUOTED = r"['\"](.+?)['\"]"
+HEX = r"'?(#[0-9a-fA-F]{6})'?"
+THE = r"(?:the )?"
+
+POSITIONS = "top|topRight|right|bottomRight|bottom|bottomLeft|left|topLeft|center"
+COLORS = {
+    "white": "#FFFFFF", "black": "#000000", "red": "#FF0000", "green": "#008000", "blue": "#0000FF",
+    "yellow": "#FFFF00", "orange": "#FFA500", "purple": "#800080", "pink": "#FFC0CB", "grey": "#808080",
+    "gray": "#808080", "silver": "#C0C0C0", "cyan": "#00FFFF", "magenta": "#FF00FF", "maroon": "#800000",
+}
+COLOR = r"(?:" + HEX + "|(" + "|".join(COLORS) + r"))"
+
+# "from 3 sec and end at 7 sec", "at 2.5s lasting for 4.5s", "starting from 0 to 7 sec"
+TIME = (r"(?:start(?:ing|s)? |begin(?:ning|s)? )?(?:from|at) " + NUM + SEC + r",? (?:and )?"
+        r"(?:(?:last(?:ing|s)? )?for " + NUM + SEC + r"|(?:end(?:ing|s)? at|to|until) " + NUM + SEC + ")")
+
+
+def _color(hex_value, name):
+    return hex_value or COLORS[name]
+
+
+def _span(st, lt, et):
+    st = float(st)
+    return str(st), str(float(lt) if lt is not None else round(float(et) - st, 3))
+
+
+def _kind(word):
+    return {"video": "video", "clip": "video", "image": "image", "picture": "image",
+            "text": "text", "title": "text", "subtitle": "subtitle", "caption": "subtitle"}[word.lower()]
+
+
+KIND = r"(video|clip|image|picture|text|title|subtitle|caption)"
+
+# (pattern, builder) where builder maps the match groups to (tool name, [tool arguments])
+GRAMMAR = [
+    (r"render(?: it| " + THE + r"video)?(?: using render_video)?",
+     lambda: ("render_video", [""])),
+
+    (r"(?:change|set) " + THE + r"output resolution to '?(preview|mobile|sd|hd|1080)'?",
+     lambda reso: ("change_output_resolution", [reso])),
+    (r"(?:change|set) " + THE + r"output format to '?(mp4|gif|jpg|png|bmp|mp3)'?",
+     lambda fmt: ("change_output_format", [fmt])),
+    (r"(?:change|set) " + THE + r"output quality to '?(low|medium|high)'?",
+     lambda qua: ("change_output_quality", [qua])),
+    (r"(?:change|set) " + THE + r"output (?:aspect ?ratio|shape) to '?(\d+:\d+)'?",
+     lambda ratio: ("change_output_aspectRatio", [ratio])),
+    (r"(?:change|set) " + THE + r"output fps to " + NUM,
+     lambda fps: ("change_output_fps", [fps])),
+    (r"(mute|un-?mute) " + THE + r"(?:output|video|audio)",
+     lambda verb: ("set_output_mute", ["True" if verb.lower() == "mute" else "False"])),
+
+    (r"(?:change|set) " + THE + r"(?:timeline )?background colou?r to " + COLOR,
+     lambda hex_value, name: ("change_timeline_background_color", [_color(hex_value, name)])),
+    (r"(?:change|set) " + THE + r"soundtrack volume to " + NUM,
+     lambda vol: ("change_timeline_soundtrack_volume", [vol])),
+    (r"(?:choose|set|capture) " + THE + r"(poster|thumbnail)(?: image)? (?:at|from) " + NUM + SEC,
+     lambda what, t: (f"choose_{what.lower()}_from_timeline", [str(float(t))])),
+
+    (r"(?:add|upload) (?:a |an )?(video|image) from (?:url )?" + QUOTED + r",? (?:and )?(?:named|name it|call it|called) "
+     + QUOTED + r",?(?: and)?(?: make it)? " + TIME,
+     lambda kind, url, name, st, lt, et: (f"add_{_kind(kind)}", [url, name, *_span(st, lt, et)])),
+    (r"add (?:a |an )?(text|subtitle)(?: with content)? " + QUOTED + r",?(?: and)?(?: let it| make it)? " + TIME,
+     lambda kind, content, st, lt, et: (f"add_{_kind(kind)}", [content, *_span(st, lt, et)])),
+
+    (r"(?:change|set|move) " + THE + KIND + r" " + QUOTED + r"(?:'s)? (?:time )?to " + TIME,
+     lambda kind, name, st, lt, et: (f"change_{_kind(kind)}_time", [name, *_span(st, lt, et)])),
+    (r"trim " + THE + r"(?:video )?" + QUOTED + r" (?:starting )?(?:from|at) " + NUM + SEC,
+     lambda name, st: ("trim_video", [name, str(float(st))])),
+    (r"scale " + THE + r"(video|clip|image|picture) " + QUOTED + r" to " + NUM,
+     lambda kind, name, scale: (f"scale_{_kind(kind)}", [name, scale])),
+    (r"(?:set|change) " + THE + r"(video|clip|image|picture) " + QUOTED + r"(?:'s)? opacity to " + NUM,
+     lambda kind, name, opa: (f"set_{_kind(kind)}_opacity", [name, opa])),
+    (r"(?:set|change|move|place) " + THE + KIND + r" " + QUOTED + r"(?:'s)? (?:position )?(?:to|at) " + THE
+     + "(" + POSITIONS + ")",
+     lambda kind, name, pos: (
+         f"set_{_kind(kind)}_position" if _kind(kind) in ("video", "image") else f"change_{_kind(kind)}_position",
+         [name, pos])),
+    (r"(?:change|set) " + THE + r"(text|subtitle|title|caption) " + QUOTED + r"(?:'s)? (background )?colou?r to " + COLOR,
+     lambda kind, name, background, hex_value, color: (
+         f"change_{_kind(kind)}_{'background_color' if background else 'color'}", [name, _color(hex_value, color)])),
+    (r"add (?:a |an )?" + QUOTED + r" transition (?:in|at|to) " + THE + r"(beginning|start|end) of " + THE + KIND + " " + QUOTED,
+     lambda trans, where, kind, name: (
+         f"add_{_kind(kind)}_transition", [name, trans, "out" if where.lower() == "end" else "in"])),
+]
+
+SEPARATOR = r"(?:,?\s+(?:and then|then|and also|also|and|finally)\s+|[.,;]\s+)"
+FILLER = r"(?:(?:first|then|finally|also|please|now|can you|could you),?\s+)*"
+END = r"\W*$"
+
+
+class FastPath:
+    """run common imperative edit requests directly against the tools, without an LLM.
+
+    The request is consumed left to right, one grammar clause at a time, with
+    'then' / 'and' / punctuation between clauses. It is handled only if the
+    whole text is consumed; otherwise nothing is executed and the caller falls
+    back to the agents.
+    Hit, miss and per-tool counters are kept for report(); one FastPath may
+    serve many threads, so they are updated under a lock.
+    """
+
+    def __init__(self, tools=None):
+        if tools is None:
+            from tools import ALL_TOOLS
+            tools = {tool.name: tool for tool in ALL_TOOLS}
+        self.tools = tools
+        self.grammar = [(re.compile(FILLER + pattern + "(?=" + SEPARATOR + "|" + END + ")", re.IGNORECASE), builder)
+                        for pattern, builder in GRAMMAR]
+        self.separator = re.compile(SEPARATOR, re.IGNORECASE)
+        self.end = re.compile(END)
+        self.stats = Counter()
+        self.tool_calls = Counter()
+        self.time_ms = 0.0
+        self._lock = threading.Lock()
+
+    def parse(self, query):
+        """[(tool name, query string)] for the whole request, or None if any part is not understood."""
+
+        calls = []
+        pos = 0
+        query = query.strip()
+        while not self.end.match(query, pos):
+            best = None
+            for pattern, builder in self.grammar:
+                match = pattern.match(query, pos)
+                if match and (best is None or match.end() > best[0].end()):
+                    best = (match, builder)
+            if best is None:
+                return None
+
+            match, builder = best
+            name, args = builder(*match.groups())
+            # the tools split their input on commas, so names containing one cannot be passed through
+            if name not in self.tools or any("," in arg for arg in args):
+                return None
+            if not (calls and name == calls[-1][0] == "render_video"):
+                calls.append((name, "'" + ", ".join(args) + "'"))
+
+            pos = match.end()
+            separator = self.separator.match(query, pos)
+            if separator:
+                pos = separator.end()
+        return calls or None
+
+    def run(self, query):
+        """execute the request and return the tool observations, or None to fall back to the LLM."""
+
+        t0 = time.perf_counter()
+        calls = self.parse(query)
+        if calls is None:
+            with self._lock:
+                self.stats["miss"] += 1
+            return None
+
+        observations = []
+        for name, tool_input in calls:
+            with self._lock:
+                self.tool_calls[name] += 1
+            observation = self.tools[name].run(tool_input)
+            observations.append(f"{name}({tool_input}): {observation if observation is not None else 'done'}")
+
+        with self._lock:
+            self.stats["hit"] += 1
+            self.time_ms += (time.perf_counter() - t0) * 1000
+        return observations
+
+    def report(self):
+        with self._lock:
+            hits, total, time_ms = self.stats["hit"], self.stats["hit"] + self.stats["miss"], self.time_ms
+            tool_calls = self.tool_calls.most_common()
+        rate = hits / total if total else 0.0
+        lines = [f"fast path: {hits}/{total} requests handled ({rate:.0%}), {time_ms / max(hits, 1):.1f} ms per hit"]
+        lines += [f"  {name}: {count}" for name, count in tool_calls]
+        return "\n".join(lines)
@@ -0,0 +1,295 @@
+import os
+import pickle
+from collections import deque
+
+from session import EditSession
+from timeline_compiler import KINDS
+
+
+def _parse_args(query):
+    # the same split every @tool applies to its query
+    return query[1:-1].replace(", ", ",").split(",")
+
+
+def _timeline_settings(session):
+    # everything on the timeline except its tracks, which are compiled from the clip dicts
+    if session._timeline is None:
+        return None
+    return {k: v for k, v in session._timeline.items() if k != "tracks"}
+
+
+class Journal:
+    """append-only log of one session's edits, with snapshots, undo and redo.
+
+    Every tool call that changes the session appends one record holding the
+    before and after image (a pickle) of just what it changed: the clips
+    named in its query, the timeline settings, the output, or the layer order
+    for the move tools. Undo applies the before images of the last record and
+    redo the after images, so both cost the size of one edit, not of the
+    session. Every snapshot_every records the whole state is pickled to
+    <id>.snapshot and a new journal segment <id>.<seq>.journal is started, so
+    restoring is one pickle load plus a short replay.
+
+    Files are only ever appended to or atomically replaced, so read_session
+    can load a session while another process keeps editing it.
+    """
+
+    def __init__(self, session, directory="./.cache/sessions", snapshot_every=1000, max_undo=1000):
+        self.session = session
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.undo_stack = deque(maxlen=max_undo)
+        self.redo_stack = deque(maxlen=max_undo)
+        self.seq = 0
+        self._segment_seq = 0
+        self._since_snapshot = 0
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, suffix):
+        return os.path.join(self.directory, f"{self.session.id}.{suffix}")
+
+    @classmethod
+    def open(cls, session, directory="./.cache/sessions", resume=True, **kwargs):
+        """attach a journal to the session, first restoring what was journaled under its id if resume."""
+
+        journal = cls(session, directory, **kwargs)
+        offset = 0
+        if resume:
+            offset = journal._load()
+        else:
+            for name in os.listdir(directory):
+                if name.startswith(session.id + "."):
+                    os.remove(os.path.join(directory, name))
+
+        journal._file = open(journal._path(f"{journal._segment_seq}.journal"), "ab")
+        # drop a record torn by a crash mid-write before appending after it
+        journal._file.truncate(offset)
+        session.journal = journal
+        return journal
+
+    # applying images
+
+    def _capture(self, scope):
+        session = self.session
+        if scope[0] == "clip":
+            clip = getattr(session, scope[1] + "_clip_dict").get(scope[2])
+            return None if clip is None else pickle.dumps(clip, pickle.HIGHEST_PROTOCOL)
+        if scope[0] == "order":
+            return list(getattr(session, scope[1] + "_clip_dict"))
+        if scope[0] == "timeline":
+            return pickle.dumps(_timeline_settings(session), pickle.HIGHEST_PROTOCOL)
+        return pickle.dumps(session._output, pickle.HIGHEST_PROTOCOL)
+
+    def _apply(self, scope, image):
+        session = self.session
+        if scope[0] == "clip":
+            _, kind, name = scope
+            clips = getattr(session, kind + "_clip_dict")
+            if image is None:
+                clips.pop(name, None)
+                session.index.remove(kind, name)
+                session.touch(kind)
+            else:
+                clips[name] = pickle.loads(image)
+                session.touch(kind, name)
+        elif scope[0] == "order":
+            clips = getattr(session, scope[1] + "_clip_dict")
+            for name in image:
+                if name in clips:
+                    clips.move_to_end(name)
+            session.touch(scope[1])
+        elif scope[0] == "timeline":
+            settings = pickle.loads(image)
+            if settings is None:
+                session._timeline = None
+            else:
+                timeline = session.timeline
+                tracks = timeline.get("tracks")
+                timeline.clear()
+                timeline.update(settings)
+                timeline["tracks"] = tracks
+        else:
+            session._output = pickle.loads(image)
+
+    def _scopes(self, tool_name, args):
+        session = self.session
+        scopes = [("clip", kind, arg) for kind in KINDS for arg in args
+                  if arg in getattr(session, kind + "_clip_dict")]
+        if "_move_" in tool_name:
+            scopes.append(("order", "video_and_image"))
+        if "timeline" in tool_name:
+            scopes.append(("timeline",))
+        if "output" in tool_name or "poster" in tool_name or "thumbnail" in tool_name:
+            scopes.append(("output",))
+        return scopes
+
+    # recording
+
+    def record(self, tool, query):
+        """run the tool on the session, journaling what it changed; returns the tool's observation."""
+
+        args = _parse_args(query)
+        before = {scope: self._capture(scope) for scope in self._scopes(tool.name, args)}
+        observation = tool.func(query)
+
+        changes = []
+        for scope in dict.fromkeys(list(before) + self._scopes(tool.name, args)):
+            after = self._capture(scope)
+            if before.get(scope) != after:
+                changes.append((scope, before.get(scope), after))
+        if changes:
+            self.redo_stack.clear()
+            self.undo_stack.append((tool.name, query, changes))
+            self._append(("do", tool.name, query, changes))
+        return observation
+
+    def undo(self):
+        """revert the last recorded edit; returns its (tool name, query), or None if there is nothing to undo."""
+
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        for scope, before, _ in reversed(entry[2]):
+            self._apply(scope, before)
+        self.session.bump()
+        self.redo_stack.append(entry)
+        self._append(("undo",))
+        return entry[:2]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        for scope, _, after in entry[2]:
+            self._apply(scope, after)
+        self.session.bump()
+        self.undo_stack.append(entry)
+        self._append(("redo",))
+        return entry[:2]
+
+    def _replay(self, record):
+        if record[0] == "do":
+            for scope, _, after in record[3]:
+                self._apply(scope, after)
+            self.redo_stack.clear()
+            self.undo_stack.append(record[1:])
+        elif record[0] == "undo":
+            entry = self.undo_stack.pop()
+            for scope, before, _ in reversed(entry[2]):
+                self._apply(scope, before)
+            self.redo_stack.append(entry)
+        else:
+            entry = self.redo_stack.pop()
+            for scope, _, after in entry[2]:
+                self._apply(scope, after)
+            self.undo_stack.append(entry)
+
+    def _append(self, record):
+        self._file.write(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+        self._file.flush()
+        self.seq += 1
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    # snapshots
+
+    def snapshot(self):
+        """pickle the whole session and start a new journal segment after it."""
+
+        session = self.session
+        state = {
+            "seq": self.seq,
+            "clips": {kind: getattr(session, kind + "_clip_dict") for kind in KINDS},
+            "timeline": _timeline_settings(session),
+            "output": session._output,
+            "undo": list(self.undo_stack),
+            "redo": list(self.redo_stack),
+        }
+        path = self._path("snapshot")
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_segment = self._path(f"{self._segment_seq}.journal")
+        new_segment = self._path(f"{self.seq}.journal")
+        open(new_segment, "ab").close()
+        os.replace(path + ".tmp", path)
+
+        if self._file is not None:
+            self._file.close()
+        self._file = open(new_segment, "ab")
+        if old_segment != new_segment:
+            os.remove(old_segment)
+        self._segment_seq = self.seq
+        self._since_snapshot = 0
+
+    def _load(self):
+        """restore the session from its snapshot and journal segment; returns the end of the last whole record."""
+
+        for _ in range(10):
+            try:
+                return self._load_once()
+            except FileNotFoundError:
+                # a snapshot replaced the segment we were about to read; start over from the new one
+                continue
+        raise RuntimeError(f"session {self.session.id} keeps changing under the reader")
+
+    def _load_once(self):
+        session = self.session
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.seq = 0
+
+        path = self._path("snapshot")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            self.seq = state["seq"]
+            for kind in KINDS:
+                setattr(session, kind + "_clip_dict", state["clips"][kind])
+            session._index = None
+            session._compiler = None
+            session._timeline = None
+            if state["timeline"] is not None:
+                self._apply(("timeline",), pickle.dumps(state["timeline"]))
+            session._output = state["output"]
+            self.undo_stack.extend(state["undo"])
+            self.redo_stack.extend(state["redo"])
+        self._segment_seq = self.seq
+
+        segment = self._path(f"{self._segment_seq}.journal")
+        if not os.path.exists(segment):
+            if self.seq:
+                raise FileNotFoundError(segment)
+            return 0
+
+        offset = 0
+        with open(segment, "rb") as f:
+            while True:
+                try:
+                    record = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError, IndexError):
+                    break
+                self._replay(record)
+                self.seq += 1
+                offset = f.tell()
+        return offset
+
+    def close(self):
+        if self._file is not None:
+            self.snapshot()
+            self._file.close()
+            self._file = None
+        self.session.journal = None
+
+
+def read_session(session_id, directory="./.cache/sessions"):
+    """a copy of the journaled session, safe to call while its writer keeps editing it."""
+
+    session = EditSession(session_id)
+    journal = Journal(session, directory)
+    journal._load()
+    return session
@@ -0,0 +1,68 @@
+from inspect import signature
+
+import events
+import tracing
+from session import current_session
+
+
+class Failure(str):
+    """an observation saying the tool refused its input and changed nothing; it reads as the plain message.
+
+    Tools return one instead of a str so the planner can tell a failed step
+    from a no-op ("already added") without matching the wording.
+    """
+
+    __slots__ = ()
+
+
+class LazyTool:
+    """what langchain's @tool would return, minus langchain until an agent actually needs it.
+
+    name, description and func match the langchain Tool exactly, and run() calls
+    the function directly, so the fast path, the planner and scripts can use the
+    tools without importing langchain. as_langchain() builds (once) the real
+    Tool for initialize_agent / ZeroShotAgent. Calling a tool that edits
+    (mutates) bumps the session's version. arity is the number of comma
+    separated parameters the tool parses out of its query, None if it
+    ignores it.
+    """
+
+    __slots__ = ("name", "func", "mutates", "arity", "_tool")
+
+    def __init__(self, name, func, mutates=True, arity=1):
+        assert func.__doc__, "Function must have a docstring"
+        self.name = name
+        self.func = func
+        self.mutates = mutates
+        self.arity = arity
+        self._tool = None
+
+    @property
+    def description(self):
+        return f"{self.name}{signature(self.func)} - {self.func.__doc__.strip()}"
+
+    def run(self, tool_input):
+        with tracing.span("tool", tool=self.name):
+            session = current_session()
+            if self.mutates:
+                session.bump()
+            if session.journal is not None:
+                observation = session.journal.record(self, tool_input)
+            else:
+                observation = self.func(tool_input)
+            events.emit("tool", tool=self.name, input=tool_input, observation=observation)
+            return observation
+
+    __call__ = run
+
+    def as_langchain(self):
+        if self._tool is None:
+            from langchain.agents import Tool
+            self._tool = Tool(name=self.name, func=self.run, description=self.description)
+        return self._tool
+
+
+def tool(name, mutates=True, arity=1):
+    def _make_tool(func):
+        return LazyTool(name, func, mutates, arity)
+    return _make_tool
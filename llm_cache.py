@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import langchain
+from langchain.cache import BaseCache
+from langchain.schema import Generation
+
+
+def cache_key(prompt, llm_string):
+    """exact-match key: the llm_string carries the model name and every sampling parameter."""
+
+    return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+
+
+class TieredLLMCache(BaseCache):
+    """exact-match LLM response cache: an in-memory LRU in front of a sqlite file.
+
+    Installed as langchain.llm_cache it serves every LLM in the process, both the
+    top agent and the subagents in tools.py. The sqlite tier survives restarts
+    and is kept under max_disk_bytes by dropping the least recently used rows.
+    """
+
+    def __init__(self, path="./.cache/llm.sqlite", memory_items=1024, max_disk_bytes=256 << 20):
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = Counter()
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS llm_cache "
+                         "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def _dumps(generations):
+        return json.dumps([{"text": g.text, "generation_info": g.generation_info} for g in generations])
+
+    @staticmethod
+    def _loads(value):
+        return [Generation(**g) for g in json.loads(value)]
+
+    def _remember(self, key, generations):
+        self._memory[key] = generations
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt, llm_string):
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+            row = self._db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            generations = self._loads(row[0])
+            self._remember(key, generations)
+            self.stats["disk_hits"] += 1
+            return generations
+
+    def update(self, prompt, llm_string, return_val):
+        key = cache_key(prompt, llm_string)
+        value = self._dumps(return_val)
+        with self._lock:
+            self._remember(key, return_val)
+
+            old = self._db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, len(value), time.time()))
+            self._disk_bytes += len(value) - (old[0] if old else 0)
+
+            if self._disk_bytes > self.max_disk_bytes:
+                evicted = []
+                for old_key, size in self._db.execute("SELECT key, size FROM llm_cache ORDER BY last_used"):
+                    if self._disk_bytes <= self.max_disk_bytes:
+                        break
+                    evicted.append((old_key,))
+                    self._disk_bytes -= size
+                self._db.executemany("DELETE FROM llm_cache WHERE key = ?", evicted)
+                self.stats["evictions"] += len(evicted)
+            self._db.commit()
+            self.stats["writes"] += 1
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+            self._disk_bytes = 0
+
+    def report(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return (f"llm cache: {hits}/{total} hits ({hits / total if total else 0:.0%}; "
+                f"{self.stats['memory_hits']} memory, {self.stats['disk_hits']} disk), "
+                f"{len(self._memory)} in memory, {self._disk_bytes / 1024:.0f} KiB on disk, "
+                f"{self.stats['evictions']} evicted")
+
+
+def install(**kwargs):
+    """route every langchain LLM call in this process through a TieredLLMCache."""
+
+    langchain.llm_cache = TieredLLMCache(**kwargs)
+    return langchain.llm_cache
@@ -0,0 +1,171 @@
+"""Load-test server.py and report objective latency percentiles. Run `python loadtest.py --help`.
+
+By default everything runs in this process against fake backends: the fake
+Shotstack API (fake_shotstack.py) renders, and a scripted LLM (fake_llm.py)
+replays one of bench.py's scenarios, sleeping --llm-latency per call. --url
+load-tests a server that is already running instead.
+
+Each of --users clients opens its own session and sends --objectives
+objectives one after another over HTTP or a WebSocket. Refused objectives
+(503 / "busy") are counted, not retried, so the output shows where
+backpressure starts.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from server import ws_frame, ws_read
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else float("nan")
+
+
+async def _read_response(reader):
+    status = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length") or 0))
+    return int(status.split()[1]), json.loads(body or b"null")
+
+
+async def _request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: loadtest\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n\r\n").encode() + data)
+    await writer.drain()
+    return await _read_response(reader)
+
+
+async def http_user(host, port, objectives, objective, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, created = await _request(reader, writer, "POST", "/sessions")
+        path = f"/sessions/{created['session']}/objectives"
+        for _ in range(objectives):
+            started = time.perf_counter()
+            code, body = await _request(reader, writer, "POST", path, {"objective": objective})
+            outcome = {200: "ok", 503: "busy"}.get(code, "error")
+            results.append((outcome, time.perf_counter() - started, None))
+    finally:
+        writer.close()
+
+
+async def ws_user(host, port, objectives, objective, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    _, created = await _request(reader, writer, "POST", "/sessions")
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET /sessions/{created['session']}/ws HTTP/1.1\r\nHost: loadtest\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    try:
+        for _ in range(objectives):
+            started = time.perf_counter()
+            first_event = None
+            writer.write(ws_frame(0x1, json.dumps({"objective": objective}).encode(), mask=True))
+            await writer.drain()
+            while True:
+                _, data = await ws_read(reader)
+                event = json.loads(data)
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+                if event["type"] in ("answer", "busy", "error"):
+                    outcome = {"answer": "ok"}.get(event["type"], event["type"])
+                    results.append((outcome, time.perf_counter() - started, first_event))
+                    break
+        writer.write(ws_frame(0x8, b"\x03\xe8", mask=True))
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run_load(args, host, port, objective):
+    results = []
+    user = ws_user if args.protocol == "ws" else http_user
+    started = time.perf_counter()
+    await asyncio.gather(*(user(host, port, args.objectives, objective, results) for _ in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter(outcome for outcome, _, _ in results)
+    latencies = [seconds for outcome, seconds, _ in results if outcome == "ok"]
+    print(f"{args.users} users x {args.objectives} objectives over {args.protocol}: {len(results)} in {elapsed:.1f}s "
+          f"({outcomes['ok'] / elapsed:.2f} objectives/s)  ok {outcomes['ok']}  busy {outcomes['busy']}  "
+          f"error {outcomes['error']}")
+    print(f"latency p50 {percentile(latencies, 0.5):.3f}s  p90 {percentile(latencies, 0.9):.3f}s  "
+          f"p99 {percentile(latencies, 0.99):.3f}s  max {max(latencies, default=float('nan')):.3f}s")
+    firsts = [first for outcome, _, first in results if outcome == "ok" and first is not None]
+    if firsts:
+        print(f"first event p50 {percentile(firsts, 0.5):.3f}s  p99 {percentile(firsts, 0.99):.3f}s")
+
+
+async def run_in_process(args):
+    import asset_probe
+    import tools
+    from bench import SCENARIOS
+    from fake_llm import Script, ScriptedLLM
+    from fake_shotstack import FakeShotstack
+    from server import AgentService, Server
+
+    fake = FakeShotstack(port=0, render_seconds=args.render_seconds, asset_bytes=1 << 16).start()
+    # the scenarios' sources are real URLs the fake does not serve; the load test stays offline
+    asset_probe.set_prober(None)
+    os.environ["SHOTSTACK_HOST"] = fake.url
+    os.environ.setdefault("SHOTSTACK_KEY", "fake")
+
+    scenario = SCENARIOS[args.scenario]
+    script = Script(scenario["steps"], scenario["subagents"])
+    tools.set_llm_factory(lambda name: ScriptedLLM(script=script, role=name, latency=args.llm_latency))
+    service = AgentService(llm=ScriptedLLM(script=script, latency=args.llm_latency), max_agents=args.max_agents,
+                           max_waiting=args.max_waiting, render_backlog=args.render_backlog)
+    server = await Server(service, port=0).start()
+
+    await run_load(args, "127.0.0.1", server.port, scenario["query"] + " then render the video using render_video.")
+    await server.stop()
+    print(f"server: {service.health()}")
+    print(f"fake LLM: {dict(script.stats)}")
+    print(f"fake Shotstack: {fake.report()}")
+    fake.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load-test this running server instead of an in-process one")
+    parser.add_argument("--protocol", choices=["http", "ws"], default="http")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--objectives", type=int, default=3, help="objectives per user, sent one after another")
+    parser.add_argument("--objective", help="with --url, the objective to send")
+    parser.add_argument("--scenario", default="code", help="bench.py scenario the fake LLM replays")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--render-seconds", type=float, default=1.0, help="fake render time")
+    parser.add_argument("--max-agents", type=int, default=8)
+    parser.add_argument("--max-waiting", type=int, default=32)
+    parser.add_argument("--render-backlog", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        asyncio.run(run_load(args, url.hostname, url.port or 80, args.objective or "add a text 'hello' from 0.0 for 5.0"))
+        return
+
+    # render_video downloads into ./render, which should not be the checkout's
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(run_in_process(args))
+
+
+if __name__ == "__main__":
+    main()
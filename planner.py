@@ -0,0 +1,134 @@
+import json
+
+from lazy_tools import Failure
+
+
+PLAN_PROMPT = """You are an agent operating a video editing online site. Plan every tool call needed to achieve the objective, in order.
+If the objective is not related to video editing, return [].
+You have access to the following tools:
+
+{tools}
+
+Answer with a JSON list only, one object per step: {{"tool": "tool name", "input": "parameter 1, parameter 2, ..."}}.
+Follow each tool's description for the input format and units, and give every time in seconds as a float.
+{progress}
+Objective: {objective}
+Plan:"""
+
+PROGRESS = """
+These steps have already been executed successfully, do not repeat them:
+{done}
+This step failed: {failed}
+Plan only the remaining steps, fixing the failed one.
+"""
+
+# appended to the objective when the agents take over a plan that gave up part way
+FALLBACK_PROGRESS = """
+These steps have already been executed successfully, do not repeat them:
+{done}
+Do only what remains of the objective."""
+
+
+class PlanError(Exception):
+    """the objective could not be planned; done holds the (tool, input) steps that had already run."""
+
+    def __init__(self, message, done=()):
+        super().__init__(message)
+        self.done = list(done)
+
+
+def is_failure(observation):
+    return isinstance(observation, Failure)
+
+
+class PlanExecutor:
+    """one LLM call plans the whole objective as JSON tool calls, which then run locally.
+
+    Every step is checked against the tool set (known tool, right number of
+    parameters) before anything runs. The LLM is only called again when a step
+    raises or returns a lazy_tools.Failure (a missing clip, a bad value), with
+    the completed steps and the failure in the prompt, up to max_replans times.
+    """
+
+    def __init__(self, llm, tools=None, max_replans=2, verbose=True):
+        if tools is None:
+            from tools import ALL_TOOLS
+            tools = ALL_TOOLS
+        self.llm = llm
+        self.tools = {tool.name: tool for tool in tools}
+        self.arity = {tool.name: tool.arity for tool in tools}
+        self.max_replans = max_replans
+        self.verbose = verbose
+        self.llm_calls = 0
+
+    def describe_tools(self):
+        return "\n".join(f"{tool.name}: {tool.description}" for tool in self.tools.values())
+
+    def plan(self, objective, done=(), failed=None):
+        progress = ""
+        if failed is not None:
+            progress = PROGRESS.format(done="\n".join(f"{name}: {tool_input}" for name, tool_input in done) or "none",
+                                       failed=failed)
+        prompt = PLAN_PROMPT.format(tools=self.describe_tools(), progress=progress, objective=objective)
+
+        self.llm_calls += 1
+        text = self.llm(prompt)
+        return self.validate(self.parse(text))
+
+    @staticmethod
+    def parse(text):
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end < start:
+            raise PlanError(f"no JSON list in plan: {text!r}")
+        try:
+            steps = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise PlanError(f"plan is not valid JSON: {e}")
+
+        plan = []
+        for step in steps:
+            if not isinstance(step, dict) or "tool" not in step:
+                raise PlanError(f"malformed step {step!r}")
+            plan.append((step["tool"], str(step.get("input", "")).strip().strip("'\"")))
+        return plan
+
+    def validate(self, plan):
+        for name, tool_input in plan:
+            if name not in self.tools:
+                raise PlanError(f"unknown tool {name!r}")
+            arity = self.arity[name]
+            if arity is not None and arity > 1 and len(tool_input.split(",")) != arity:
+                raise PlanError(f"{name} takes {arity} parameters, got {tool_input!r}")
+        return plan
+
+    def run(self, objective):
+        done = []
+        observations = []
+        plan = self.plan(objective)
+
+        replans = 0
+        while plan:
+            name, tool_input = plan.pop(0)
+            try:
+                observation = self.tools[name].run(f"'{tool_input}'")
+                failed = f"{name}: {tool_input} -> {observation}" if is_failure(observation) else None
+            except Exception as e:
+                observation = f"error: {e}"
+                failed = f"{name}: {tool_input} -> {observation}"
+
+            if self.verbose:
+                print(f"{name}({tool_input}): {observation if observation is not None else 'done'}")
+            observations.append((name, tool_input, observation))
+
+            if failed is None:
+                done.append((name, tool_input))
+            elif replans < self.max_replans:
+                replans += 1
+                try:
+                    plan = self.plan(objective, done, failed)
+                except PlanError as e:
+                    raise PlanError(str(e), done) from e
+            else:
+                raise PlanError(f"giving up after {replans} re-plans, last failure: {failed}", done)
+
+        return observations
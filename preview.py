@@ -0,0 +1,134 @@
+import concurrent.futures
+import contextvars
+import copy
+import threading
+
+import tracing
+from edit_model import Edit, Output
+
+
+# output settings carried over to the preview; poster and thumbnail would only slow it down, and a custom
+# size would override the preview resolution
+PREVIEW_SETTINGS = ("format", "aspectRatio", "fps", "mute", "repeat", "range")
+
+
+class PreviewPipeline:
+    """render a low-quality preview first and the requested output behind it.
+
+    start() posts both renders at once but waits only for the preview
+    (resolution and quality below), whose URL render_video returns to the
+    user straight away. The final render finishes in the background and is
+    downloaded as before. With cancel_on_edit the final is dropped as
+    soon as the session is edited again (EditSession.bump): Shotstack has no
+    cancel call, so the render still completes remotely, but it is no longer
+    polled, holds no render slot and is never downloaded over a newer edit.
+    The final video goes to path, or to the session's render_path.
+    """
+
+    def __init__(self, manager=None, resolution="preview", quality="low", cancel_on_edit=True,
+                 path=None, max_workers=4):
+        self._manager = manager
+        self.resolution = resolution
+        self.quality = quality
+        self.cancel_on_edit = cancel_on_edit
+        self.path = path
+        self.stats = {"previews": 0, "finals": 0, "cancelled": 0, "superseded": 0}
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="final-render")
+        self._finals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from render_manager import get_render_manager
+            self._manager = get_render_manager()
+        return self._manager
+
+    def preview_output(self, output):
+        settings = {attr: getattr(output, attr, None) for attr in PREVIEW_SETTINGS}
+        return Output(resolution=self.resolution, quality=self.quality,
+                      **{attr: value for attr, value in settings.items() if value is not None})
+
+    def start(self, session, edit, digest=None):
+        """post the final render in the background and return the preview's render response."""
+
+        # later edits mutate the session's timeline in place, so the background render gets its own copy
+        final_edit = copy.deepcopy(edit)
+        version = session.version
+        # run in this context, so the final render reports to the same trace and event sink as the request
+        final = self._executor.submit(contextvars.copy_context().run, self._final, session, version, final_edit, digest)
+        with self._lock:
+            self._finals[session.id] = final
+
+        if getattr(edit.output, "resolution", None) == self.resolution:
+            return final.result()
+
+        with tracing.span("render", phase="preview"):
+            preview_edit = Edit(timeline=copy.deepcopy(edit.timeline), output=self.preview_output(edit.output))
+            response = self.manager.render(preview_edit)
+        self.stats["previews"] += 1
+        return response
+
+    def _final(self, session, version, edit, digest):
+        from downloader import download, DownloadError
+        from render_cache import get_render_cache
+
+        future = self.manager.submit_threadsafe(edit)
+        if self.cancel_on_edit:
+            if session.version != version:
+                future.cancel()
+            else:
+                session.final_render = future
+        try:
+            response = future.result()
+        except concurrent.futures.CancelledError:
+            self.stats["cancelled"] += 1
+            print("Final render cancelled, the edit changed.")
+            raise
+        finally:
+            if session.final_render is future:
+                session.final_render = None
+
+        if session.version != version:
+            self.stats["superseded"] += 1
+            print(f"Final render {response['id']} finished for an older version of the edit, not downloading it.")
+            return response
+
+        print(f"Final asset URL: {response['url']}")
+        path = self.path or session.render_path
+        try:
+            with tracing.span("render", phase="download"):
+                download(response['url'], path)
+        except DownloadError as e:
+            print(f"{e}")
+            return response
+        cache = get_render_cache()
+        if cache is not None and digest is not None:
+            cache.put(digest, response['url'], path)
+        self.stats["finals"] += 1
+        return response
+
+    def final(self, session_id):
+        """the Future of the latest final render started for this session, or None."""
+
+        with self._lock:
+            return self._finals.get(session_id)
+
+    def report(self):
+        return "preview renders: " + ", ".join(f"{v} {k}" for k, v in self.stats.items())
+
+
+_pipeline = None
+
+
+def install(**kwargs):
+    """make render_video return a preview first and finish the final render in the background."""
+
+    global _pipeline
+    _pipeline = PreviewPipeline(**kwargs)
+    return _pipeline
+
+
+def get_preview_pipeline():
+    return _pipeline
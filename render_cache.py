@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+def _normalize(value):
+    # 3 and 3.0 describe the same clip start; make them serialize the same
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def canonical_edit(edit):
+    """the edit (timeline plus output) as canonical JSON: sorted keys, no whitespace, unset fields dropped."""
+
+    data = edit.to_dict() if hasattr(edit, "to_dict") else edit
+    return json.dumps(_normalize(data), sort_keys=True, separators=(",", ":"), default=str)
+
+
+def edit_digest(edit):
+    return hashlib.sha256(canonical_edit(edit).encode()).hexdigest()
+
+
+class RenderCache:
+    """finished renders keyed by the sha256 of the canonical edit.
+
+    An entry keeps the asset URL and a copy of the downloaded file under
+    directory, so a hit is served from disk without calling post_render. The
+    index is an LRU of at most max_items entries, each valid for ttl seconds
+    (Shotstack's stage assets are only hosted for 24 hours), and is saved
+    next to the files so it survives restarts.
+    """
+
+    def __init__(self, directory="./.cache/renders", max_items=64, ttl=23 * 3600):
+        self.directory = directory
+        self.max_items = max_items
+        self.ttl = ttl
+        self.stats = Counter()
+
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+
+        self._entries = OrderedDict()
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._entries.update(json.load(f))
+
+    def _save(self):
+        with open(self._index_path + ".tmp", "w") as f:
+            json.dump(self._entries, f)
+        os.replace(self._index_path + ".tmp", self._index_path)
+
+    def _drop(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry and entry.get("file") and os.path.exists(entry["file"]):
+            os.remove(entry["file"])
+
+    def get(self, digest):
+        """the entry {url, file, created} for a finished render of this edit, or None."""
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if time.time() - entry["created"] > self.ttl:
+                self._drop(digest)
+                self._save()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, digest, url, path=None):
+        """record a finished render, keeping a copy of its downloaded file if path is given."""
+
+        cached = None
+        if path is not None and os.path.exists(path):
+            cached = os.path.join(self.directory, digest + os.path.splitext(path)[1])
+            shutil.copyfile(path, cached + ".tmp")
+            os.replace(cached + ".tmp", cached)
+
+        with self._lock:
+            self._entries[digest] = {"url": url, "file": cached, "created": time.time()}
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            self._save()
+
+    def restore(self, entry, path):
+        """put the cached render at path; False if its file is gone and it has to be fetched again."""
+
+        if not entry.get("file") or not os.path.exists(entry["file"]):
+            return False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(entry["file"], path)
+        return True
+
+    def clear(self):
+        with self._lock:
+            for digest in list(self._entries):
+                self._drop(digest)
+            self._save()
+
+    def report(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return (f"render cache: {self.stats['hits']}/{total} hits, {len(self._entries)} renders cached, "
+                f"{self.stats['expired']} expired, {self.stats['evictions']} evicted")
+
+
+_render_cache = None
+
+
+def install(**kwargs):
+    """let render_video reuse finished renders of identical edits in this process."""
+
+    global _render_cache
+    _render_cache = RenderCache(**kwargs)
+    return _render_cache
+
+
+def get_render_cache():
+    """the installed RenderCache, or None when renders are not cached."""
+
+    return _render_cache
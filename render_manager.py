@@ -0,0 +1,390 @@
+import asyncio
+import concurrent.futures
+import email.utils
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import events
+import tracing
+from edit_model import to_sdk
+
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class RenderError(Exception):
+    """raised through a render future when the render failed or could not be polled."""
+
+    def __init__(self, render_id, message, response=None):
+        super().__init__(f"render {render_id}: {message}")
+        self.render_id = render_id
+        self.response = response
+
+
+def make_edit_api(pool_size=None):
+    """build an EditApi from SHOTSTACK_HOST / SHOTSTACK_KEY, the same way render_video always did.
+
+    pool_size caps the keep-alive connections its urllib3 pool holds to the host.
+    """
+
+    import shotstack_sdk as shotstack
+    from shotstack_sdk.api import edit_api
+
+    host = "https://api.shotstack.io/stage"
+
+    if os.getenv("SHOTSTACK_HOST") is not None:
+        host = os.getenv("SHOTSTACK_HOST")
+    if os.getenv("SHOTSTACK_KEY") is None:
+        # not sys.exit: this runs on the manager's loop thread, where SystemExit would only kill the thread
+        raise RuntimeError("API Key is required. Set using: export SHOTSTACK_KEY=your_key_here")
+
+    configuration = shotstack.Configuration(host=host)
+    configuration.api_key['DeveloperKey'] = os.getenv("SHOTSTACK_KEY")
+    if pool_size is not None:
+        configuration.connection_pool_maxsize = pool_size
+
+    return edit_api.EditApi(shotstack.ApiClient(configuration))
+
+
+_edit_api = None
+_edit_api_lock = threading.Lock()
+
+
+def get_edit_api():
+    """the process-wide EditApi. One ApiClient means one connection pool, so posts and polls reuse
+    keep-alive connections instead of a new TCP/TLS handshake each."""
+
+    global _edit_api
+    with _edit_api_lock:
+        if _edit_api is None:
+            _edit_api = make_edit_api(pool_size=32)
+    return _edit_api
+
+
+def retry_after(exc, default=1.0):
+    """seconds to wait when exc is an HTTP 429 from the API, else None.
+
+    Honours Retry-After given either as seconds or as an HTTP date.
+    """
+
+    if getattr(exc, "status", None) != 429:
+        return None
+    value = (getattr(exc, "headers", None) or {}).get("Retry-After")
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class RenderJob:
+    __slots__ = ("id", "future", "interval", "due", "status", "polls", "errors", "span", "phase_start", "sink")
+
+    def __init__(self, render_id, future, interval, due):
+        self.id = render_id
+        self.future = future
+        self.interval = interval
+        self.due = due
+        self.status = "queued"
+        self.polls = 0
+        self.errors = 0
+        # the span the render was submitted under, and when its current status was first seen
+        self.span = tracing.current_span()
+        self.phase_start = time.perf_counter()
+        # where status changes are reported (events.py), e.g. the server connection that asked for the render
+        self.sink = events.current_sink()
+
+
+class RenderManager:
+    """Submit renders with post_render and track them all from one asyncio poller.
+
+    Every in-flight render is an entry in a heap ordered by its next poll time; a
+    single task wakes up for whichever render is due next, so hundreds of renders
+    cost one task rather than one thread each. The blocking SDK calls run on a
+    small shared executor. Each render is polled quickly at first and then
+    backs off geometrically up to max_interval; the interval drops back to
+    min_interval once Shotstack reports the render is saving.
+
+    At most max_in_flight renders (all if None) are submitted and unfinished at
+    once; further submits wait for a slot. A 429 from either endpoint pauses
+    every request to the API for its Retry-After instead of counting as an
+    error.
+
+    With a webhook_url, every Edit is posted with it as its callback and
+    Shotstack notifies a CallbackReceiver (callback_receiver.py) when a
+    render finishes; notify() then polls that render at once. Renders are
+    otherwise only polled every fallback_interval, in case a callback is lost.
+    """
+
+    def __init__(self, api=None, min_interval=1.0, max_interval=15.0, backoff=1.5,
+                 max_workers=8, max_poll_errors=5, max_in_flight=None, webhook_url=None, fallback_interval=60.0):
+        self._api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_poll_errors = max_poll_errors
+        self.max_in_flight = max_in_flight
+        self.webhook_url = webhook_url
+        self.fallback_interval = fallback_interval
+        self.rate_limited = 0
+        self.notified = 0
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="render")
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._poller = None
+        self._slots = None
+        self._blocked_until = 0.0
+        self._poll_loop = None
+        # callbacks that arrived before their render was tracked
+        self._early = set()
+
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = get_edit_api()
+        return self._api
+
+    def pending(self):
+        return len(self._jobs)
+
+    async def _call(self, func, *args):
+        """run a blocking API call on the executor, waiting out any 429 back-off first."""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._blocked_until - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await loop.run_in_executor(self._executor, func, *args)
+            except Exception as e:
+                wait = retry_after(e, self.min_interval)
+                if wait is None:
+                    raise
+                self.rate_limited += 1
+                self._blocked_until = max(self._blocked_until, loop.time() + wait)
+
+    async def submit(self, edit, callback=None):
+        """post the edit and return an asyncio future resolving to the final render response."""
+
+        if self.max_in_flight is not None:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_in_flight)
+            await self._slots.acquire()
+
+        try:
+            # the tools' plain-dict edit becomes SDK models only here, right before it is posted
+            edit = to_sdk(edit, self.api.api_client.configuration)
+            if self.webhook_url is not None:
+                edit.callback = self.webhook_url
+
+            with tracing.span("render", phase="post_render"):
+                api_response = await self._call(self.api.post_render, edit)
+            message = api_response['response']['message']
+            render_id = api_response['response']['id']
+
+            print('\n' + f"{message}" + '\n')
+
+            if render_id is None:
+                raise RenderError(None, "no render id returned by post_render")
+
+            future = self.track(render_id, callback)
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+
+        if self._slots is not None:
+            future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def track(self, render_id, callback=None):
+        """start polling an already submitted render id. Must be called on the manager's loop."""
+
+        loop = asyncio.get_running_loop()
+        self._poll_loop = loop
+
+        if render_id in self._jobs:
+            future = self._jobs[render_id].future
+        else:
+            future = loop.create_future()
+            interval = self.fallback_interval if self.webhook_url is not None else self.min_interval
+            job = RenderJob(render_id, future, interval, loop.time() + interval)
+            self._jobs[render_id] = job
+            # a cancelled render (e.g. a final render superseded by an edit) is simply no longer polled
+            future.add_done_callback(lambda f: f.cancelled() and self._jobs.pop(render_id, None))
+            if render_id in self._early:
+                self._early.discard(render_id)
+                job.due = loop.time()
+            self._schedule(job)
+
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        if self._poller is None or self._poller.done():
+            self._wakeup = asyncio.Event()
+            self._poller = loop.create_task(self._poll_forever())
+
+        return future
+
+    def notify(self, render_id):
+        """a callback said this render finished: poll it now. Must be called on the manager's loop."""
+
+        self.notified += 1
+        job = self._jobs.get(render_id)
+        if job is None:
+            if len(self._early) > 10000:
+                self._early.clear()
+            self._early.add(render_id)
+            return
+        job.due = self._poll_loop.time()
+        self._schedule(job)
+
+    def notify_threadsafe(self, render_id):
+        loop = self._poll_loop or self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.notify, render_id)
+
+    def _schedule(self, job):
+        heapq.heappush(self._heap, (job.due, next(self._seq), job.id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll_forever(self):
+        loop = asyncio.get_running_loop()
+
+        while self._jobs:
+            now = loop.time()
+            due = {}
+            while self._heap and self._heap[0][0] <= now:
+                _, _, render_id = heapq.heappop(self._heap)
+                job = self._jobs.get(render_id)
+                if job is not None and job.due <= now:
+                    due[render_id] = job
+
+            if due:
+                await asyncio.gather(*(self._poll(job) for job in due.values()))
+                continue
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job):
+        loop = asyncio.get_running_loop()
+        job.polls += 1
+        tracing.count("shotstack_render_polls_total")
+
+        try:
+            api_response = await self._call(lambda: self.api.get_render(job.id, data=False, merged=True))
+        except Exception as e:
+            job.errors += 1
+            if job.errors >= self.max_poll_errors:
+                self._finish(job, exception=RenderError(job.id, f"unable to resolve API call: {e}"))
+                return
+        else:
+            job.errors = 0
+            response = api_response['response']
+            status = response['status']
+
+            if status != job.status:
+                print('Status: ' + status.upper() + '\n')
+                events.emit("render", job.sink, render_id=job.id, status=status, url=response['url'] if status == "done" else None)
+                if status not in TERMINAL_STATUSES:
+                    self._end_phase(job)
+
+            if status == "done":
+                self._finish(job, result=response)
+                return
+            if status == "failed":
+                self._finish(job, exception=RenderError(job.id, "render failed", response))
+                return
+
+            if self.webhook_url is not None:
+                job.interval = self.fallback_interval
+            elif status == "saving" and job.status != "saving":
+                job.interval = self.min_interval
+            else:
+                job.interval = min(job.interval * self.backoff, self.max_interval)
+            job.status = status
+
+        job.due = loop.time() + job.interval
+        self._schedule(job)
+
+    def _end_phase(self, job):
+        now = time.perf_counter()
+        tracing.record("render", job.phase_start, now, job.span, phase=job.status, render_id=job.id)
+        job.phase_start = now
+
+    def _finish(self, job, result=None, exception=None):
+        if job.id in self._jobs and job.status not in TERMINAL_STATUSES:
+            self._end_phase(job)
+        self._jobs.pop(job.id, None)
+        if job.future.done():
+            return
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.status = result['status']
+            job.future.set_result(result)
+
+    # thread-safe entry points for synchronous callers such as the @tool functions
+
+    def start(self):
+        """run the manager's event loop on a daemon thread, once per process."""
+
+        with self._lock:
+            if self._thread is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self.loop.run_forever, name="render-manager", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit_threadsafe(self, edit, callback=None):
+        """submit from any thread; returns a concurrent.futures.Future of the final render response."""
+
+        self.start()
+
+        parent = tracing.current_span()
+
+        async def _render():
+            tracing.attach(parent)
+            return await (await self.submit(edit, callback))
+
+        return asyncio.run_coroutine_threadsafe(_render(), self.loop)
+
+    def render(self, edit, timeout=None):
+        """submit and block the calling thread (only) until the render is done."""
+
+        return self.submit_threadsafe(edit).result(timeout)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_render_manager():
+    global _manager
+
+    with _manager_lock:
+        if _manager is None:
+            _manager = RenderManager()
+    return _manager
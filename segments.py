@@ -0,0 +1,224 @@
+import asyncio
+import copy
+from bisect import bisect_left
+from collections import namedtuple
+
+import tracing
+from edit_model import Clip, Edit, Output, Timeline, Track, VideoAsset
+
+
+# output settings the segment renders share with the final one; poster, thumbnail and mute only apply to the stitch
+SEGMENT_SETTINGS = ("resolution", "aspectRatio", "size", "fps", "scaleTo", "quality")
+
+Plan = namedtuple("Plan", ["bounds", "seconds", "monolithic_seconds"])
+
+
+def safe_cuts(spans):
+    """times no clip straddles, given (start, end) spans: cutting there splits no clip."""
+
+    cuts = []
+    reach = None
+    for start, end in sorted(spans):
+        if reach is not None and start >= reach and (not cuts or cuts[-1] != start):
+            cuts.append(start)
+        reach = end if reach is None else max(reach, end)
+    return cuts
+
+
+def _clips(edit):
+    for track in getattr(edit.timeline, "tracks", None) or []:
+        for clip in getattr(track, "clips", None) or []:
+            yield clip
+
+
+class SegmentPlanner:
+    """choose how many segments to render a timeline in, and where to cut it.
+
+    Render time is modelled as overhead plus seconds_per_second for every
+    second of every clip, so stacked layers cost more than one; a segmented
+    render costs its heaviest segment plus a stitch pass, which composites a
+    single layer (stitch_overhead + stitch_seconds_per_second per second of
+    the whole timeline). The planner tries every segment count up to the
+    concurrency quota, cuts at the clip-safe points nearest to equal shares,
+    and keeps the fastest estimate, which is a single monolithic render for
+    short timelines. The defaults are rough; the render phase histograms
+    from tracing.py are the place to tune them from.
+    """
+
+    def __init__(self, overhead=8.0, seconds_per_second=0.5, stitch_overhead=8.0, stitch_seconds_per_second=0.1,
+                 min_segment=10.0):
+        self.overhead = overhead
+        self.seconds_per_second = seconds_per_second
+        self.stitch_overhead = stitch_overhead
+        self.stitch_seconds_per_second = stitch_seconds_per_second
+        self.min_segment = min_segment
+
+    def estimate(self, work, duration):
+        """seconds to render segments holding work clip-seconds each, stitched if there is more than one."""
+
+        seconds = self.overhead + self.seconds_per_second * max(work)
+        if len(work) > 1:
+            seconds += self.stitch_overhead + self.stitch_seconds_per_second * duration
+        return seconds
+
+    def plan(self, spans, max_segments):
+        """a Plan of [(start, end)] segment bounds for clips spanning spans, at most max_segments of them."""
+
+        spans = sorted(spans)
+        duration = max((end for _, end in spans), default=0.0)
+        cuts = safe_cuts(spans)
+        starts = [start for start, _ in spans]
+        # clip-seconds of the clips starting before each index, to weigh any segment in two lookups
+        before = [0.0]
+        for start, end in spans:
+            before.append(before[-1] + end - start)
+
+        def work(lo, hi):
+            return before[bisect_left(starts, hi)] - before[bisect_left(starts, lo)]
+
+        best = [(0.0, duration)]
+        best_seconds = monolithic = self.estimate([before[-1]], duration)
+
+        limit = min(max_segments, len(cuts) + 1, int(duration // self.min_segment) or 1)
+        for count in range(2, limit + 1):
+            chosen = []
+            for i in range(1, count):
+                j = bisect_left(cuts, duration * i / count)
+                # the nearer of the cut points either side of the equal share, after the previous cut
+                candidates = [c for c in cuts[max(j - 1, 0):j + 1] if not chosen or c > chosen[-1]]
+                if candidates:
+                    chosen.append(min(candidates, key=lambda c: abs(c - duration * i / count)))
+            points = [0.0] + chosen + [duration]
+            bounds = list(zip(points, points[1:]))
+            seconds = self.estimate([work(lo, hi) for lo, hi in bounds], duration)
+            if seconds < best_seconds:
+                best, best_seconds = bounds, seconds
+        return Plan(best, best_seconds, monolithic)
+
+
+def split_edit(edit, bounds):
+    """one Edit per (start, end) segment holding the clips inside it shifted to start at 0, and each one's length."""
+
+    settings = {attr: getattr(edit.output, attr, None) for attr in SEGMENT_SETTINGS}
+    settings = {attr: value for attr, value in settings.items() if value is not None}
+    starts = [lo for lo, _ in bounds]
+
+    segments = [[[] for _ in edit.timeline.tracks] for _ in bounds]
+    lengths = [0.0] * len(bounds)
+    for t, track in enumerate(edit.timeline.tracks):
+        for clip in getattr(track, "clips", None) or []:
+            i = max(bisect_left(starts, clip.start + 1e-9) - 1, 0)
+            clip = copy.deepcopy(clip)
+            clip.start = clip.start - starts[i]
+            segments[i][t].append(clip)
+            lengths[i] = max(lengths[i], clip.start + clip.length)
+
+    edits = []
+    for tracks in segments:
+        timeline = Timeline(tracks=[Track(clips=clips) for clips in tracks if clips])
+        for attr in ("background", "fonts", "cache"):
+            value = getattr(edit.timeline, attr, None)
+            if value is not None:
+                setattr(timeline, attr, value)
+        edits.append(Edit(timeline=timeline, output=Output(format="mp4", **settings)))
+    return edits, lengths
+
+
+def stitch_edit(edit, bounds, lengths, urls):
+    """the Edit that plays the segment renders at their places on the timeline, with the original soundtrack and output."""
+
+    clips = [Clip(asset=VideoAsset(src=url), start=lo, length=length)
+             for (lo, _), length, url in zip(bounds, lengths, urls)]
+    timeline = Timeline(tracks=[Track(clips=clips)])
+    for attr in ("background", "soundtrack", "cache"):
+        value = getattr(edit.timeline, attr, None)
+        if value is not None:
+            setattr(timeline, attr, value)
+    return Edit(timeline=timeline, output=copy.deepcopy(edit.output))
+
+
+class SegmentRenderer:
+    """render long timelines as concurrent segments plus a stitch pass, through a RenderManager.
+
+    render(), submit() and submit_threadsafe() mirror RenderManager's, so it
+    can stand in for one (render_video, PreviewPipeline). Each edit is
+    planned by the planner against the manager's max_in_flight; a plan of one
+    segment is an ordinary render. Segments are cut only where no clip
+    crosses the cut and rendered without the soundtrack, which the stitch
+    edit lays over the whole timeline so it plays without restarting.
+    """
+
+    def __init__(self, manager=None, planner=None, max_segments=8):
+        self._manager = manager
+        self.planner = planner or SegmentPlanner()
+        self.max_segments = max_segments
+        self.stats = {"monolithic": 0, "segmented": 0, "segments": 0}
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from render_manager import get_render_manager
+            self._manager = get_render_manager()
+        return self._manager
+
+    def plan(self, edit):
+        quota = min(self.max_segments, self.manager.max_in_flight or self.max_segments)
+        return self.planner.plan(((c.start, c.start + c.length) for c in _clips(edit)), quota)
+
+    async def _render(self, edit):
+        return await (await self.manager.submit(edit))
+
+    async def render_async(self, edit):
+        plan = self.plan(edit)
+        if len(plan.bounds) == 1:
+            self.stats["monolithic"] += 1
+            return await self._render(edit)
+
+        self.stats["segmented"] += 1
+        self.stats["segments"] += len(plan.bounds)
+        print(f"Rendering {len(plan.bounds)} segments (about {plan.seconds:.0f}s instead of {plan.monolithic_seconds:.0f}s)")
+        segments, lengths = split_edit(edit, plan.bounds)
+        with tracing.span("render", phase="segments"):
+            responses = await asyncio.gather(*(self._render(segment) for segment in segments))
+        with tracing.span("render", phase="stitch"):
+            return await self._render(stitch_edit(edit, plan.bounds, lengths, [r['url'] for r in responses]))
+
+    async def submit(self, edit):
+        """like RenderManager.submit: an asyncio future of the final render response."""
+
+        return asyncio.ensure_future(self.render_async(edit))
+
+    def submit_threadsafe(self, edit, callback=None):
+        manager = self.manager.start()
+        parent = tracing.current_span()
+
+        async def _render():
+            tracing.attach(parent)
+            return await self.render_async(edit)
+
+        future = asyncio.run_coroutine_threadsafe(_render(), manager.loop)
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def render(self, edit, timeout=None):
+        return self.submit_threadsafe(edit).result(timeout)
+
+    def report(self):
+        return (f"segmented renders: {self.stats['segmented']} ({self.stats['segments']} segments), "
+                f"{self.stats['monolithic']} monolithic")
+
+
+_renderer = None
+
+
+def install(**kwargs):
+    """let render_video split long timelines into segments rendered concurrently."""
+
+    global _renderer
+    _renderer = SegmentRenderer(**kwargs)
+    return _renderer
+
+
+def get_segment_renderer():
+    return _renderer
@@ -0,0 +1,511 @@
+"""Serve the editing agents to many users over HTTP and WebSocket. Run `python server.py --help`.
+
+    POST   /sessions                     -> {"session": id}
+    POST   /sessions/{id}/objectives     {"objective": "..."} -> {"session", "answer", "events", "seconds"}
+    GET    /sessions/{id}/ws             WebSocket: send objectives as text, receive JSON events
+    DELETE /sessions/{id}
+    GET    /health, GET /metrics (with --metrics)
+
+Every session is an EditSession in a SessionPool, created by POST /sessions
+(other ids get 404) and edited by its own objectives one at a time and in
+order. Objectives run the same way as in the agent.py REPL (fast path,
+planner or agents) on worker threads, at most max_agents at once since each
+holds an LLM conversation. Up to max_waiting more queue for a worker.
+Beyond that, or while the render manager has render_backlog renders
+unfinished, new objectives are refused with 503 and Retry-After (a "busy"
+event on a WebSocket) instead of piling up.
+
+WebSocket clients get every tool call ({"type": "tool", ...}), every render
+status change ({"type": "render", ...}) and then {"type": "answer", ...} for
+each objective they send.
+"""
+
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import contextvars
+import hashlib
+import json
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import events
+import tracing
+from session import SessionPool, UnknownSession
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Busy(Exception):
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AgentService:
+    """runs objectives against pooled sessions with bounded concurrency; the part of the server that is not HTTP.
+
+    llm is the top agent's LLM (PromptLayerOpenAI by default); subagents use
+    tools.set_llm_factory's. Each session gets its own agent chain and chat
+    memory, kept for the max_chains most recently used sessions.
+    """
+
+    def __init__(self, pool=None, llm=None, planner=None, tool_selector=None, max_agents=8, max_waiting=32,
+                 render_backlog=None, memory_tokens=800, max_chains=1000):
+        from fast_path import FastPath
+
+        self.pool = pool or SessionPool()
+        self.llm = llm
+        self.planner = planner
+        self.tool_selector = tool_selector
+        self.fast_path = FastPath()
+        self.max_agents = max_agents
+        self.max_waiting = max_waiting
+        self.render_backlog = render_backlog
+        self.memory_tokens = memory_tokens
+        self.max_chains = max_chains
+        self.stats = {"objectives": 0, "failed": 0, "busy": 0}
+        self._stats_lock = threading.Lock()
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_agents, thread_name_prefix="agent")
+        self._chains = OrderedDict()
+        self._chains_lock = threading.Lock()
+        self._session_locks = {}
+        self._slots = None
+        self._admitted = 0
+        self._running = 0
+
+    def _chain(self, session_id):
+        from agent import build_agent_chain
+        from budget_memory import EditStateMemory
+
+        with self._chains_lock:
+            chain = self._chains.get(session_id)
+            if chain is None:
+                chain = build_agent_chain(llm=self.llm, memory=EditStateMemory(max_tokens=self.memory_tokens),
+                                          verbose=False)
+                self._chains[session_id] = chain
+                while len(self._chains) > self.max_chains:
+                    self._chains.popitem(last=False)
+            else:
+                self._chains.move_to_end(session_id)
+            return chain
+
+    def _run(self, session_id, objective, sink):
+        from agent import run_objective
+
+        with self.pool.activate(session_id, create=False) as session, events.listen(sink):
+            return run_objective(objective, self._chain(session.id), self.fast_path, self.tool_selector, self.planner)
+
+    def check_capacity(self):
+        """raise Busy if a new objective should be refused now."""
+
+        if self._admitted >= self.max_agents + self.max_waiting:
+            raise Busy("all agents busy")
+        if self.render_backlog is not None:
+            from render_manager import get_render_manager
+            if get_render_manager().pending() >= self.render_backlog:
+                raise Busy("render queue full", retry_after=5)
+
+    async def run(self, session_id, objective, sink):
+        """run one objective for the session on a worker thread; returns the agent's answer. Must run on the server loop.
+
+        Raises UnknownSession unless the session was created by POST /sessions and is still open.
+        """
+
+        if session_id not in self.pool:
+            raise UnknownSession(session_id)
+        try:
+            self.check_capacity()
+        except Busy:
+            self._count("busy")
+            raise
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_agents)
+        self._admitted += 1
+        try:
+            # a session's objectives wait their turn without holding an agent slot
+            async with self._session_locks.setdefault(session_id, asyncio.Lock()), self._slots:
+                self._running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    context = contextvars.copy_context()
+                    answer = await loop.run_in_executor(self._executor, context.run, self._run, session_id, objective, sink)
+                finally:
+                    self._running -= 1
+            self._count("objectives")
+            return answer
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            self._admitted -= 1
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def close_session(self, session_id):
+        self.pool.close(session_id)
+        self._session_locks.pop(session_id, None)
+        with self._chains_lock:
+            self._chains.pop(session_id, None)
+
+    def evict_idle(self):
+        closed = self.pool.evict_idle()
+        for session_id in [s for s in self._session_locks if s not in self.pool]:
+            self.close_session(session_id)
+        return closed
+
+    def health(self):
+        from render_manager import get_render_manager
+
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"sessions": len(self.pool), "running": self._running, "waiting": self._admitted - self._running,
+                "renders": get_render_manager().pending(), **stats}
+
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def ws_frame(opcode, data, mask=False):
+    """one final WebSocket frame; clients must mask theirs."""
+
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if len(data) < 126:
+        header += bytes([mask_bit | len(data)])
+    elif len(data) < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack(">H", len(data))
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack(">Q", len(data))
+    if not mask:
+        return header + data
+    key = uuid.uuid4().bytes[:4]
+    return header + key + _unmask(data, key)
+
+
+def _unmask(data, key):
+    # one big-integer xor over the whole payload instead of a Python loop per byte
+    repeated = (key * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(data), "big")
+
+
+async def ws_read(reader, max_size=MAX_BODY):
+    """(opcode, payload) of the next whole message, joining fragments."""
+
+    message, message_opcode = b"", None
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", await reader.readexactly(8))[0]
+        if len(message) + length > max_size:
+            raise ValueError("message too big")
+        key = await reader.readexactly(4) if second & 0x80 else None
+        data = await reader.readexactly(length)
+        if key is not None:
+            data = _unmask(data, key)
+        if opcode >= 0x8:
+            # control frames may arrive between the fragments of a message
+            return opcode, data
+        if opcode != 0:
+            message_opcode = opcode
+        message += data
+        if first & 0x80:
+            return message_opcode, message
+
+
+async def read_request(reader):
+    """(method, path, headers, body) of the next request on the connection, or None when it closed."""
+
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise ValueError("request body too big")
+    body = await reader.readexactly(length) if length else b""
+    return method, urlsplit(target).path, headers, body
+
+
+def response_bytes(code, body, headers=()):
+    """a whole HTTP response; body is bytes, or anything else to send as JSON."""
+
+    data = body if isinstance(body, bytes) else json.dumps(body, default=str).encode()
+    headers = dict(headers)
+    headers.setdefault("Content-Type", "application/json")
+    head = [f"HTTP/1.1 {code} {REASONS.get(code, '')}", f"Content-Length: {len(data)}"]
+    head += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + data
+
+
+class Server:
+    """the asyncio HTTP/WebSocket front end of an AgentService."""
+
+    def __init__(self, service, host="127.0.0.1", port=8000, idle_check=60.0):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.idle_check = idle_check
+        self._server = None
+        self._evictor = None
+        self._connections = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._evictor = asyncio.get_running_loop().create_task(self._evict_forever())
+        return self
+
+    async def stop(self, grace=5.0):
+        """stop accepting connections and wait up to grace seconds for open ones, cancelling the rest."""
+
+        self._server.close()
+        await self._server.wait_closed()
+        self._evictor.cancel()
+        # before 3.12 wait_closed does not wait for the connection handlers
+        connections = set(self._connections)
+        if connections:
+            _, pending = await asyncio.wait(connections, timeout=grace)
+            for task in pending:
+                task.cancel()
+        await asyncio.gather(self._evictor, *connections, return_exceptions=True)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _evict_forever(self):
+        while True:
+            await asyncio.sleep(self.idle_check)
+            self.service.evict_idle()
+
+    async def _connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    writer.write(response_bytes(413, {"error": str(e)}, [("Connection", "close")]))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, path, headers)
+                    break
+                code, payload, extra = await self._route(method, path, body)
+                writer.write(response_bytes(code, payload, extra))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # cancelled by stop(); returning normally, as asyncio 3.11 logs a cancelled handler as an error
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _route(self, method, path, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"]:
+            return 200, self.service.health(), ()
+        if parts == ["metrics"] and tracing.get_tracer() is not None:
+            return 200, tracing.get_tracer().metrics_text().encode(), (("Content-Type", "text/plain; version=0.0.4"),)
+        if parts == ["sessions"] and method == "POST":
+            return 200, {"session": self.service.pool.get().id}, ()
+        if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            self.service.close_session(parts[1])
+            return 200, {"session": parts[1], "closed": True}, ()
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "objectives":
+            if method != "POST":
+                return 405, {"error": "POST an objective"}, ()
+            try:
+                objective = json.loads(body)["objective"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": 'expected {"objective": "..."}'}, ()
+            collected = []
+            started = time.perf_counter()
+            try:
+                answer = await self.service.run(parts[1], objective, collected.append)
+            except Busy as e:
+                return 503, {"error": str(e)}, (("Retry-After", str(e.retry_after)),)
+            except UnknownSession:
+                return 404, {"error": f"no session {parts[1]}; POST /sessions for one"}, ()
+            except Exception as e:
+                return 500, {"error": f"{type(e).__name__}: {e}", "events": collected}, ()
+            return 200, {"session": parts[1], "answer": answer, "events": collected,
+                         "seconds": round(time.perf_counter() - started, 3)}, ()
+        return 404, {"error": "not found"}, ()
+
+    async def _websocket(self, reader, writer, path, headers):
+        parts = [p for p in path.split("/") if p]
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] != "ws" or "sec-websocket-key" not in headers:
+            writer.write(response_bytes(400, {"error": "expected /sessions/{id}/ws"}))
+            return
+        session_id = parts[1]
+        if session_id not in self.service.pool:
+            writer.write(response_bytes(404, {"error": f"no session {session_id}; POST /sessions for one"}))
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(headers['sec-websocket-key'])}\r\n\r\n").encode())
+
+        loop = asyncio.get_running_loop()
+        outbox = asyncio.Queue()
+
+        def sink(event):
+            # called from agent and render threads, which may outlive the connection and the loop
+            try:
+                loop.call_soon_threadsafe(outbox.put_nowait, event)
+            except RuntimeError:
+                pass
+
+        async def send_events():
+            while True:
+                event = await outbox.get()
+                if event is None:
+                    return
+                writer.write(ws_frame(0x1, json.dumps(event, default=str).encode()))
+                await writer.drain()
+
+        async def run_objective(objective):
+            started = time.perf_counter()
+            try:
+                answer = await self.service.run(session_id, objective, sink)
+                sink({"type": "answer", "objective": objective, "answer": answer,
+                      "seconds": round(time.perf_counter() - started, 3)})
+            except Busy as e:
+                sink({"type": "busy", "objective": objective, "error": str(e), "retry_after": e.retry_after})
+            except Exception as e:
+                sink({"type": "error", "objective": objective, "error": f"{type(e).__name__}: {e}"})
+
+        sender = loop.create_task(send_events())
+        running = set()
+        try:
+            try:
+                while True:
+                    try:
+                        opcode, data = await ws_read(reader)
+                    except ValueError:
+                        writer.write(ws_frame(0x8, struct.pack(">H", 1009)))
+                        break
+                    if opcode == 0x8:
+                        writer.write(ws_frame(0x8, data[:2]))
+                        break
+                    if opcode == 0x9:
+                        writer.write(ws_frame(0xA, data))
+                        continue
+                    if opcode != 0x1:
+                        continue
+                    text = data.decode()
+                    try:
+                        objective = json.loads(text)["objective"]
+                    except (ValueError, KeyError, TypeError):
+                        objective = text
+                    task = loop.create_task(run_objective(objective))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            # the client may have gone, but its objectives still finish and are answered if it is there
+            if running:
+                await asyncio.wait(running)
+            outbox.put_nowait(None)
+            await sender
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Server.stop gave up on this connection: drop its objectives and unsent events
+            for task in running:
+                task.cancel()
+            sender.cancel()
+            await asyncio.gather(sender, *running, return_exceptions=True)
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mode", choices=["react", "plan"], default="react")
+    parser.add_argument("--max-agents", type=int, default=8, help="objectives running at once (LLM capacity)")
+    parser.add_argument("--max-waiting", type=int, default=32, help="objectives queued for an agent before refusing more")
+    parser.add_argument("--render-backlog", type=int, default=64, help="refuse objectives while this many renders are unfinished")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--idle-timeout", type=float, default=3600.0, help="close sessions unused for this many seconds")
+    parser.add_argument("--memory-tokens", type=int, default=800)
+    parser.add_argument("--no-tool-selection", action="store_true", help="show subagents all their tools, without the tool index")
+    parser.add_argument("--no-llm-cache", action="store_true")
+    parser.add_argument("--preview", action="store_true", help="answer with a preview render, finishing the final one in the background")
+    parser.add_argument("--metrics", action="store_true", help="trace requests and serve /metrics")
+    parser.add_argument("--callback-port", type=int, help="receive Shotstack render callbacks on this port instead of polling")
+    parser.add_argument("--callback-url")
+    args = parser.parse_args(argv)
+
+    import llm_cache
+    import preview
+    from langchain.llms import PromptLayerOpenAI
+    from render_manager import get_render_manager
+
+    if not args.no_llm_cache:
+        llm_cache.install()
+    if args.metrics:
+        tracing.install()
+    if args.preview:
+        preview.install()
+    if args.callback_port:
+        from callback_receiver import CallbackReceiver
+        CallbackReceiver(get_render_manager(), port=args.callback_port, public_url=args.callback_url).start()
+
+    tool_selector = None
+    if not args.no_tool_selection:
+        from tool_index import load_tool_index
+        from tool_selection import ToolSelector
+        tool_selector = ToolSelector(load_tool_index("./tools.txt"))
+    planner = None
+    if args.mode == "plan":
+        from planner import PlanExecutor
+        planner = PlanExecutor(PromptLayerOpenAI(temperature=0, max_tokens=1024, pl_tags=["shotstack_planner"]))
+
+    service = AgentService(SessionPool(args.max_sessions, args.idle_timeout), planner=planner, tool_selector=tool_selector,
+                           max_agents=args.max_agents, max_waiting=args.max_waiting, render_backlog=args.render_backlog,
+                           memory_tokens=args.memory_tokens, max_chains=args.max_sessions)
+    server = Server(service, args.host, args.port)
+    print(f"serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
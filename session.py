@@ -0,0 +1,242 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from clip_index import ClipIndex
+from edit_model import Output, Timeline
+from timeline_compiler import TimelineCompiler, KINDS
+
+
+class EditSession:
+    """all the state of one video being edited: clips, tracks, timeline and output.
+
+    The @tool functions in tools.py operate on whichever session is active in the
+    calling context (see activate / current_session), so one process can host
+    many independent edits while the tools and subagents stay shared. The
+    state is plain edit_model dicts, not SDK models; Timeline and Output are
+    only built on first use, which keeps an idle session down to a few small
+    dicts.
+    """
+
+    __slots__ = ("id", "video_and_image_clip_dict", "subtitle_clip_dict", "text_clip_dict",
+                 "tracks", "_timeline", "_output", "_compiler", "_index", "last_used", "journal",
+                 "version", "final_render")
+
+    def __init__(self, session_id=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.video_and_image_clip_dict = OrderedDict()
+        self.subtitle_clip_dict = OrderedDict()
+        self.text_clip_dict = OrderedDict()
+        self.tracks = []
+        self._timeline = None
+        self._output = None
+        self._compiler = None
+        self._index = None
+        self.last_used = time.monotonic()
+        # a journal.Journal when the session's edits are persisted
+        self.journal = None
+        # bumped by every edit; a background final render (a Future) is cancelled by the next one
+        self.version = 0
+        self.final_render = None
+
+    @property
+    def timeline(self):
+        if self._timeline is None:
+            self._timeline = Timeline(background="#000000", tracks=self.tracks)
+        return self._timeline
+
+    @property
+    def output(self):
+        if self._output is None:
+            self._output = Output(format="mp4", resolution="sd")
+        return self._output
+
+    @property
+    def compiler(self):
+        if self._compiler is None:
+            self._compiler = TimelineCompiler()
+        return self._compiler
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = ClipIndex()
+            for kind in KINDS:
+                for name, clip in getattr(self, kind + "_clip_dict").items():
+                    self._index.add(kind, name, clip.start, clip.start + clip.length)
+        return self._index
+
+    def touch(self, kind, name=None):
+        """record that clips of this kind were added, retimed or reordered, re-indexing clip 'name'."""
+
+        self.compiler.mark_dirty(kind)
+        if name is not None:
+            clip = getattr(self, kind + "_clip_dict")[name]
+            self.index.add(kind, name, clip.start, clip.start + clip.length)
+
+    def bump(self):
+        """note that the edit changed, cancelling a final render of the previous version."""
+
+        self.version += 1
+        final, self.final_render = self.final_render, None
+        if final is not None:
+            final.cancel()
+
+    def duration(self):
+        return self.index.end()
+
+    @property
+    def render_path(self):
+        """where render_video downloads this session's video; the REPL's default session keeps ./render/video.mp4."""
+
+        return "./render/video.mp4" if self.id == "default" else f"./render/{self.id}.mp4"
+
+    def compile_tracks(self):
+        """rebuild the timeline's tracks from the clip dicts, reusing every kind that did not change."""
+
+        self.tracks[:] = self.compiler.compile(self)
+        self.timeline.tracks = self.tracks
+        return self.tracks
+
+    @contextmanager
+    def activate(self):
+        """make this the session the tools edit, for the current thread / asyncio task."""
+
+        self.last_used = time.monotonic()
+        token = _current_session.set(self)
+        try:
+            yield self
+        finally:
+            _current_session.reset(token)
+
+    def close(self):
+        if self.final_render is not None:
+            self.final_render.cancel()
+            self.final_render = None
+        if self.journal is not None:
+            self.journal.close()
+        self.video_and_image_clip_dict.clear()
+        self.subtitle_clip_dict.clear()
+        self.text_clip_dict.clear()
+        self.tracks.clear()
+        self._timeline = None
+        self._output = None
+        self._compiler = None
+        self._index = None
+
+
+default_session = EditSession("default")
+_current_session = contextvars.ContextVar("edit_session", default=default_session)
+
+
+def current_session():
+    return _current_session.get()
+
+
+class UnknownSession(KeyError):
+    """no session with this id is open in the pool."""
+
+
+class SessionPool:
+    """sessions by id, least recently used first, capped at max_sessions and optionally an idle timeout.
+
+    A session held by activate is never evicted; closing one defers its
+    close() until the last holder releases it, so an objective never sees its
+    clips cleared under it.
+    """
+
+    def __init__(self, max_sessions=10000, idle_timeout=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._held = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id=None, create=True):
+        """return the session with this id, creating it if needed; with create=False an unknown id raises UnknownSession."""
+
+        return self._get(session_id, create, hold=False)
+
+    @contextmanager
+    def activate(self, session_id=None, create=True):
+        """get the session and make it the active one, holding it open until the block exits."""
+
+        session = self._get(session_id, create, hold=True)
+        try:
+            with session.activate():
+                yield session
+        finally:
+            self._release(session)
+
+    def _get(self, session_id, create, hold):
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id is not None else None
+            if session is None:
+                if not create:
+                    raise UnknownSession(session_id)
+                session = EditSession(session_id)
+                self._sessions[session.id] = session
+                # the least recently used sessions nobody holds; while all are held the pool stays over its cap
+                for old in self._sessions.values():
+                    if len(self._sessions) - len(evicted) <= self.max_sessions:
+                        break
+                    if old is not session and old not in self._held:
+                        evicted.append(old)
+                for old in evicted:
+                    del self._sessions[old.id]
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            if hold:
+                self._held[session] = self._held.get(session, 0) + 1
+        for old in evicted:
+            old.close()
+        return session
+
+    def _release(self, session):
+        with self._lock:
+            self._held[session] -= 1
+            if self._held[session]:
+                return
+            del self._held[session]
+            # closed while held: close() left it to the last holder
+            closed = self._sessions.get(session.id) is not session
+        if closed:
+            session.close()
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            held = session in self._held
+        if session is not None and not held:
+            session.close()
+
+    def evict_idle(self):
+        """close sessions unused for longer than idle_timeout and not in use; returns how many were closed."""
+
+        if self.idle_timeout is None:
+            return 0
+
+        deadline = time.monotonic() - self.idle_timeout
+        closed = []
+        with self._lock:
+            for session in self._sessions.values():
+                if session.last_used > deadline:
+                    break
+                if session not in self._held:
+                    closed.append(session)
+            for session in closed:
+                del self._sessions[session.id]
+        for session in closed:
+            session.close()
+        return len(closed)
@@ -0,0 +1,142 @@
+"""AssetProber against fake_shotstack's assets. Run `python -m pytest test_asset_probe.py`."""
+
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import asset_probe
+from asset_probe import AssetProber
+from fake_shotstack import FakeShotstack
+
+
+ASSET_BYTES = 256 << 10
+
+
+def _asset_url(fake, duration=12.5, resolution="hd"):
+    # a render of one clip of this duration; the fake serves an mp4 whose headers report it
+    edit = {"timeline": {"tracks": [{"clips": [{"asset": {"type": "title", "text": "probe"},
+                                                "start": 0.0, "length": duration}]}]},
+            "output": {"format": "mp4", "resolution": resolution}}
+    request = urllib.request.Request(f"{fake.url}/render", data=json.dumps(edit).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        render_id = json.load(response)["response"]["id"]
+    return f"{fake.url}/assets/{render_id}.mp4"
+
+
+@pytest.fixture
+def fake():
+    fake = FakeShotstack(port=0, render_seconds=0.0, jitter=0.0, asset_bytes=ASSET_BYTES).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def moov_last_fake():
+    fake = FakeShotstack(port=0, render_seconds=0.0, jitter=0.0, asset_bytes=ASSET_BYTES, faststart=False).start()
+    yield fake
+    fake.stop()
+
+
+def test_faststart_mp4(fake):
+    prober = AssetProber(session=requests.Session())
+    info = prober.probe(_asset_url(fake), timeout=10)
+
+    assert info.ok and info.error is None
+    assert info.kind == "video"
+    assert info.duration == pytest.approx(12.5)
+    assert (info.width, info.height) == (1280, 720)
+    assert info.size == ASSET_BYTES
+    # the moov box is inside the first range read
+    assert fake.stats["asset"] == 1
+
+
+def test_moov_after_mdat(moov_last_fake):
+    prober = AssetProber(session=requests.Session(), prefix_bytes=64 << 10)
+    info = prober.probe(_asset_url(moov_last_fake, duration=3.0, resolution="sd"), timeout=10)
+
+    assert info.ok and info.error is None
+    assert info.duration == pytest.approx(3.0)
+    assert (info.width, info.height) == (1024, 576)
+    assert info.size == ASSET_BYTES
+    # one read for the prefix, one at the moov box past the media data
+    assert moov_last_fake.stats["asset"] == 2
+
+
+def test_ttl_expiry(fake):
+    prober = AssetProber(session=requests.Session(), ttl=0.2)
+    url = _asset_url(fake)
+
+    info = prober.probe(url, timeout=10)
+    assert prober.peek(url) is info
+    assert prober.probe(url, timeout=10) is info
+    assert prober.stats["hits"] == 1
+
+    time.sleep(0.3)
+    assert prober.peek(url) is None
+    prober.probe(url, timeout=10)
+    assert prober.stats["probes"] == 2
+    assert fake.stats["asset"] == 2
+
+
+def test_lru_eviction(fake):
+    prober = AssetProber(session=requests.Session(), max_items=2)
+    first, second, third = (_asset_url(fake) for _ in range(3))
+
+    prober.probe(first, timeout=10)
+    prober.probe(second, timeout=10)
+    # touching first makes second the least recently used
+    assert prober.peek(first) is not None
+    prober.probe(third, timeout=10)
+
+    assert prober.peek(second) is None
+    assert prober.peek(first) is not None
+    assert prober.peek(third) is not None
+
+
+class _GatedSession:
+    """a requests.Session whose requests wait until the test opens the gate."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self._session = requests.Session()
+
+    def get(self, *args, **kwargs):
+        self.gate.wait(10)
+        return self._session.get(*args, **kwargs)
+
+
+def test_second_caller_joins_in_flight_probe(fake):
+    session = _GatedSession()
+    prober = AssetProber(session=session)
+    url = _asset_url(fake)
+
+    first = prober.probe_async(url)
+    second = prober.probe_async(url)
+    assert second is first
+    assert not first.done()
+
+    session.gate.set()
+    assert first.result(10).duration == pytest.approx(12.5)
+    assert prober.stats["probes"] == 1
+    assert prober.stats["joined"] == 1
+    assert fake.stats["asset"] == 1
+
+
+def test_offline_prober_never_fetches(fake):
+    previous = asset_probe.get_prober()
+    try:
+        prober = asset_probe.set_prober(None)
+        assert asset_probe.get_prober() is prober
+        url = _asset_url(fake)
+        info = prober.probe_async(url).result(0)
+        assert not info.ok and info.duration is None
+        assert prober.peek(url) is None
+        assert fake.stats["asset"] == 0
+    finally:
+        asset_probe.set_prober(previous)
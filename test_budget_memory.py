@@ -0,0 +1,56 @@
+"""EditStateMemory stays within its token budget. Run `python -m pytest test_budget_memory.py`."""
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from budget_memory import EditStateMemory, describe_edit_state
+from edit_model import Clip, TitleAsset
+from session import EditSession
+from tokens import count_tokens
+
+
+def _add_texts(session, count):
+    for i in range(count):
+        session.text_clip_dict[f"caption number {i}"] = Clip(asset=TitleAsset(text=str(i)), start=float(i), length=1.0)
+
+
+def test_old_turns_fold_into_the_edit_state():
+    memory = EditStateMemory(max_tokens=200)
+    with EditSession().activate() as session:
+        _add_texts(session, 1)
+        for i in range(40):
+            memory.save_context({"input": f"request {i}: add something to the video please"},
+                                {"output": f"done with request {i}"})
+            assert memory.token_count() <= memory.max_tokens
+
+        history = memory.load_memory_variables({})["chat_history"]
+
+    assert memory.folded_turns > 0
+    assert memory.folded_turns + len(memory.turns) == 40
+    # the newest turn is kept verbatim, the oldest is only in the summary
+    assert "request 39" in history and "request 0:" not in history
+    assert history.startswith(f"(edit state after {memory.folded_turns} earlier requests)")
+    assert "'caption number 0' 0-1s" in history
+
+
+def test_summary_of_a_large_edit_fits_its_share():
+    session = EditSession()
+    _add_texts(session, 300)
+    session.subtitle_clip_dict["line"] = Clip(asset=TitleAsset(text="line"), start=0.0, length=2.5)
+
+    summary = describe_edit_state(session, 150)
+    assert count_tokens(summary) <= 150
+    assert "more" in summary
+    assert "subtitle: 'line' 0-2.5s" in summary
+    assert summary.splitlines()[0].startswith("output: format mp4, resolution sd")
+
+
+def test_clear_forgets_turns():
+    memory = EditStateMemory(max_tokens=100)
+    with EditSession().activate():
+        for i in range(20):
+            memory.save_context({"input": f"request {i}"}, {"output": "ok"})
+        memory.clear()
+        assert memory.turns == [] and memory.folded_turns == 0
+        assert "Human:" not in memory.load_memory_variables({})["chat_history"]
@@ -0,0 +1,50 @@
+"""ClipIndex against a brute-force dict of spans. Run `python -m pytest test_clip_index.py`."""
+
+import random
+
+from clip_index import ClipIndex
+
+
+def _check(index, spans):
+    assert len(index) == len(spans)
+    assert index.end() == max((end for _, end in spans.values()), default=0.0)
+    for key, span in spans.items():
+        assert key in index
+        assert index.span(*key) == span
+
+
+def test_random_edits_match_brute_force():
+    rng = random.Random(5)
+    index = ClipIndex(seed=1)
+    spans = {}
+
+    for _ in range(2000):
+        key = (rng.choice(("text", "subtitle", "video_and_image")), f"clip{rng.randrange(60)}")
+        if rng.random() < 0.3:
+            index.remove(*key)
+            spans.pop(key, None)
+        else:
+            # integer starts collide often, exercising ties broken by key
+            start = float(rng.randrange(100))
+            span = (start, start + rng.randrange(1, 20))
+            index.add(*key, *span)
+            spans[key] = span
+        _check(index, spans)
+
+
+def test_move_and_remove_last_clip():
+    index = ClipIndex()
+    index.add("text", "a", 0.0, 5.0)
+    index.add("text", "b", 2.0, 9.0)
+    assert index.end() == 9.0
+
+    # moving the last clip earlier pulls the end back
+    index.add("text", "b", 2.0, 4.0)
+    assert index.end() == 5.0
+    assert len(index) == 2
+
+    index.remove("text", "a")
+    index.remove("text", "missing")
+    assert index.end() == 4.0
+    index.remove("text", "b")
+    assert index.end() == 0.0 and len(index) == 0
@@ -0,0 +1,138 @@
+"""downloader.download against fake_shotstack's assets. Run `python -m pytest test_downloader.py`."""
+
+import hashlib
+import json
+import os
+import urllib.request
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from downloader import DownloadError, _write_origin, download
+from fake_shotstack import FakeShotstack
+
+
+ASSET_BYTES = 256 << 10
+
+
+def _asset(fake):
+    """(url, bytes, etag) of a finished render's asset."""
+
+    edit = {"timeline": {"tracks": [{"clips": [{"asset": {"type": "title", "text": "dl"}, "start": 0.0, "length": 4.0}]}]},
+            "output": {"format": "mp4", "resolution": "sd"}}
+    request = urllib.request.Request(f"{fake.url}/render", data=json.dumps(edit).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        render_id = json.load(response)["response"]["id"]
+    body, md5 = fake.asset(render_id)
+    return f"{fake.url}/assets/{render_id}.mp4", body, f'"{md5}"'
+
+
+def _leave_part(path, url, data, etag):
+    # what an interrupted download leaves behind
+    with open(path + ".part", "wb") as f:
+        f.write(data)
+    _write_origin(path + ".part", url, etag)
+
+
+class _RecordingSession:
+    """a requests.Session that remembers the headers and status of every GET."""
+
+    def __init__(self):
+        self.requests = []
+        self._session = requests.Session()
+
+    def get(self, url, headers=None, **kwargs):
+        r = self._session.get(url, headers=headers, **kwargs)
+        self.requests.append((dict(headers or {}), r.status_code))
+        return r
+
+
+@pytest.fixture
+def fake():
+    fake = FakeShotstack(port=0, render_seconds=0.0, jitter=0.0, asset_bytes=ASSET_BYTES).start()
+    yield fake
+    fake.stop()
+
+
+def test_permanent_client_error_is_not_retried(fake, tmp_path):
+    session = _RecordingSession()
+    with pytest.raises(DownloadError):
+        download(f"{fake.url}/assets/missing.mp4", str(tmp_path / "v.mp4"), session=session, retries=3)
+
+    assert [status for _, status in session.requests] == [404]
+    assert not os.path.exists(tmp_path / "v.mp4")
+
+
+def test_whole_download_is_checked_against_the_etag(fake, tmp_path):
+    url, body, _ = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    session = _RecordingSession()
+
+    assert download(url, path, session=session) == path
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert session.requests == [({}, 200)]
+    assert not os.path.exists(path + ".part") and not os.path.exists(path + ".part.origin")
+
+
+def test_resume_asks_for_the_rest(fake, tmp_path):
+    url, body, etag = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    _leave_part(path, url, body[:1000], etag)
+    session = _RecordingSession()
+
+    download(url, path, session=session, sha256=hashlib.sha256(body).hexdigest())
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert session.requests == [({"Range": "bytes=1000-", "If-Range": etag}, 206)]
+
+
+def test_changed_object_restarts_from_zero(fake, tmp_path):
+    url, body, _ = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    # the part came from an older version of the object
+    _leave_part(path, url, b"x" * 1000, '"0123456789abcdef0123456789abcdef"')
+    session = _RecordingSession()
+
+    download(url, path, session=session)
+    with open(path, "rb") as f:
+        assert f.read() == body
+    # If-Range did not match, so the server sent the whole object
+    assert [status for _, status in session.requests] == [200]
+
+
+def test_part_of_another_url_is_discarded(fake, tmp_path):
+    url, body, etag = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    _leave_part(path, url + "?other", body[:1000], etag)
+    session = _RecordingSession()
+
+    download(url, path, session=session)
+    assert session.requests == [({}, 200)]
+
+
+def test_complete_part_is_kept_on_416(fake, tmp_path):
+    url, body, etag = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    # the connection dropped after the last byte but before the rename
+    _leave_part(path, url, body, etag)
+    session = _RecordingSession()
+
+    download(url, path, session=session)
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert [status for _, status in session.requests] == [416]
+
+
+def test_overlong_part_restarts_after_416(fake, tmp_path):
+    url, body, etag = _asset(fake)
+    path = str(tmp_path / "v.mp4")
+    _leave_part(path, url, body + b"junk", etag)
+    session = _RecordingSession()
+
+    download(url, path, session=session, retries=1)
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert [status for _, status in session.requests] == [416, 200]
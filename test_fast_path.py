@@ -0,0 +1,74 @@
+"""FastPath parses of whole requests, and the fallback on partial ones. Run `python -m pytest test_fast_path.py`."""
+
+import threading
+
+from fast_path import FastPath
+from session import EditSession
+
+
+def test_whole_request_runs_every_clause():
+    fast_path = FastPath()
+    query = ("first add a text 'Hello' from 0 to 3 sec, then change the text 'Hello' color to red "
+             "and set the output resolution to hd.")
+
+    assert fast_path.parse(query) == [("add_text", "'Hello, 0.0, 3.0'"), ("change_text_color", "'Hello, #FF0000'"),
+                                      ("change_output_resolution", "'hd'")]
+    with EditSession().activate() as session:
+        observations = fast_path.run(query)
+
+    assert len(observations) == 3
+    assert session.text_clip_dict["Hello"].asset.color == "#FF0000"
+    assert session.output.resolution == "hd"
+    assert fast_path.stats == {"hit": 1}
+    assert fast_path.tool_calls["add_text"] == 1
+
+
+def test_partial_parse_falls_back_without_running_anything():
+    fast_path = FastPath()
+    query = "add a text 'Hello' from 0 to 3 sec and make it sparkle like the sea"
+
+    assert fast_path.parse(query) is None
+    with EditSession().activate() as session:
+        assert fast_path.run(query) is None
+
+    # the clause it did understand was not executed either
+    assert not session.text_clip_dict
+    assert fast_path.stats == {"miss": 1}
+    assert not fast_path.tool_calls
+
+
+def test_names_with_commas_fall_back():
+    # the tools split their input on commas
+    assert FastPath().parse("add a text 'Hello, world' from 0 for 3") is None
+
+
+def test_repeated_render_runs_once():
+    calls = FastPath().parse("render the video then render it using render_video")
+    assert calls == [("render_video", "''")]
+
+
+class _Counting:
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, tool_input):
+        self.calls += 1
+
+
+def test_counters_add_up_across_threads():
+    tool = _Counting()
+    fast_path = FastPath(tools={"change_output_resolution": tool})
+
+    def worker():
+        for _ in range(500):
+            fast_path.run("set the output resolution to hd")
+            fast_path.run("make it pop")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fast_path.stats == {"hit": 4000, "miss": 4000}
+    assert fast_path.tool_calls["change_output_resolution"] == tool.calls == 4000
@@ -0,0 +1,122 @@
+"""Journal undo/redo, restore and torn-record recovery. Run `python -m pytest test_journal.py`."""
+
+import os
+
+import pytest
+
+from journal import Journal, read_session
+from session import EditSession
+from tools import ALL_TOOLS
+
+
+TOOLS = {tool.name: tool for tool in ALL_TOOLS}
+
+
+def _run(session, name, query):
+    with session.activate():
+        return TOOLS[name].run(f"'{query}'")
+
+
+def _texts(session):
+    return {name: (clip.start, clip.length, clip.asset.size) for name, clip in session.text_clip_dict.items()}
+
+
+def _crash(journal):
+    # the process dies: nothing is snapshotted, the segment keeps what was flushed
+    journal._file.close()
+    journal._file = None
+    journal.session.journal = None
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "sessions")
+
+
+def test_undo_and_redo(directory):
+    session = EditSession("s")
+    journal = Journal.open(session, directory)
+    _run(session, "add_text", "Hello, 0.0, 3.0")
+    _run(session, "change_text_size", "Hello, large")
+    _run(session, "change_output_resolution", "hd")
+
+    assert journal.undo() == ("change_output_resolution", "'hd'")
+    assert session.output.resolution == "sd"
+    assert journal.undo() == ("change_text_size", "'Hello, large'")
+    assert _texts(session) == {"Hello": (0.0, 3.0, "x-large")}
+    assert journal.undo() == ("add_text", "'Hello, 0.0, 3.0'")
+    assert _texts(session) == {} and session.duration() == 0.0
+    assert journal.undo() is None
+
+    journal.redo()
+    journal.redo()
+    assert _texts(session) == {"Hello": (0.0, 3.0, "large")}
+    assert session.duration() == 3.0
+
+    # a new edit drops what was left to redo
+    _run(session, "change_text_time", "Hello, 1.0, 2.0")
+    assert journal.redo() is None
+    assert [clip.asset.text for track in session.compile_tracks() for clip in track.clips] == ["Hello"]
+    journal.close()
+
+
+def test_no_op_calls_are_not_journaled(directory):
+    session = EditSession("s")
+    journal = Journal.open(session, directory)
+    _run(session, "add_text", "Hello, 0.0, 3.0")
+    _run(session, "add_text", "Hello, 0.0, 3.0")
+    _run(session, "change_text_size", "Missing, large")
+
+    assert len(journal.undo_stack) == 1
+    journal.close()
+
+
+@pytest.mark.parametrize("snapshot_every", [1000, 2])
+def test_restore_after_a_crash(directory, snapshot_every):
+    session = EditSession("s")
+    journal = Journal.open(session, directory, snapshot_every=snapshot_every)
+    _run(session, "add_text", "Hello, 0.0, 3.0")
+    _run(session, "add_text", "World, 2.0, 4.0")
+    _run(session, "change_text_size", "World, small")
+    journal.undo()
+    _run(session, "change_output_format", "gif")
+    expected, undo = _texts(session), list(journal.undo_stack)
+    _crash(journal)
+
+    restored = EditSession("s")
+    journal = Journal.open(restored, directory, snapshot_every=snapshot_every)
+    assert _texts(restored) == expected
+    assert restored.output.format == "gif"
+    assert restored.duration() == 6.0
+    assert list(journal.undo_stack) == undo
+    assert _texts(read_session("s", directory)) == expected
+
+    journal.undo()
+    assert restored.output.format == "mp4"
+    journal.close()
+
+
+def test_torn_record_is_dropped(directory):
+    session = EditSession("s")
+    journal = Journal.open(session, directory)
+    _run(session, "add_text", "Hello, 0.0, 3.0")
+    segment = journal._file.name
+    whole = os.path.getsize(segment)
+    _run(session, "add_text", "World, 2.0, 4.0")
+    _crash(journal)
+
+    # the crash hit in the middle of writing the second record
+    with open(segment, "r+b") as f:
+        f.truncate(whole + (os.path.getsize(segment) - whole) // 2)
+
+    restored = EditSession("s")
+    journal = Journal.open(restored, directory)
+    assert _texts(restored) == {"Hello": (0.0, 3.0, "x-large")}
+    assert os.path.getsize(segment) == whole
+
+    # records appended after the torn one replay cleanly
+    _run(restored, "add_text", "Again, 5.0, 1.0")
+    _crash(journal)
+    again = EditSession("s")
+    Journal.open(again, directory).close()
+    assert _texts(again) == {"Hello": (0.0, 3.0, "x-large"), "Again": (5.0, 1.0, "x-large")}
@@ -0,0 +1,56 @@
+"""PlanExecutor with a scripted LLM against the real tools. Run `python -m pytest test_planner.py`."""
+
+import json
+
+import pytest
+
+from planner import PlanError, PlanExecutor, is_failure
+from session import EditSession
+
+
+class _ScriptedLLM:
+    """answers each planning prompt with the next plan, keeping the prompts."""
+
+    def __init__(self, *plans):
+        self.plans = list(plans)
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return json.dumps([{"tool": name, "input": tool_input} for name, tool_input in self.plans.pop(0)])
+
+
+def test_failed_step_replans_from_where_it_stopped():
+    llm = _ScriptedLLM([("add_text", "Hello, 0.0, 3.0"), ("change_text_size", "Hi, large")],
+                       [("change_text_size", "Hello, large")])
+    planner = PlanExecutor(llm, verbose=False)
+
+    with EditSession().activate() as session:
+        observations = planner.run("add a large text Hello")
+        assert session.text_clip_dict["Hello"].asset.size == "large"
+
+    assert planner.llm_calls == 2
+    assert is_failure(observations[1][2])
+    assert "add_text: Hello, 0.0, 3.0" in llm.prompts[1]
+    assert [name for name, _, _ in observations] == ["add_text", "change_text_size", "change_text_size"]
+
+
+def test_no_op_answers_are_not_failures():
+    llm = _ScriptedLLM([("add_text", "Hello, 0.0, 3.0"), ("add_text", "Hello, 0.0, 3.0")])
+    planner = PlanExecutor(llm, verbose=False)
+
+    with EditSession().activate():
+        observations = planner.run("add a text Hello")
+
+    # the second add only reports the clip is already there
+    assert observations[1][2] and not is_failure(observations[1][2])
+    assert planner.llm_calls == 1
+
+
+def test_declared_arity_rejects_the_plan_before_anything_runs():
+    planner = PlanExecutor(_ScriptedLLM([("add_text", "Hello, 0.0, 3.0"), ("add_video", "only-a-url, 0.0")]),
+                           verbose=False)
+
+    with EditSession().activate() as session, pytest.raises(PlanError, match="add_video takes 4 parameters"):
+        planner.run("add a text and a video")
+    assert not session.text_clip_dict
@@ -0,0 +1,72 @@
+"""Edit digests and the RenderCache index. Run `python -m pytest test_render_cache.py`."""
+
+import os
+
+from edit_model import Clip, Edit, Output, Timeline, TitleAsset, Track
+from render_cache import RenderCache, edit_digest
+
+
+def _edit(start=3.0, text="Hello", **output):
+    clip = Clip(asset=TitleAsset(text=text, style=None), start=start, length=2.0)
+    return Edit(timeline=Timeline(background="#000000", tracks=[Track(clips=[clip])]),
+                output=Output(**{"format": "mp4", "resolution": "sd", **output}))
+
+
+def test_digest_ignores_spelling_but_not_content():
+    assert edit_digest(_edit(3.0)) == edit_digest(_edit(3))
+    assert edit_digest(_edit()) == edit_digest(_edit(fps=None))
+    # key order does not matter either
+    assert edit_digest(_edit()) == edit_digest(dict(reversed(list(_edit().items()))))
+
+    assert edit_digest(_edit()) != edit_digest(_edit(start=3.5))
+    assert edit_digest(_edit()) != edit_digest(_edit(text="Hi"))
+    assert edit_digest(_edit()) != edit_digest(_edit(resolution="hd"))
+
+
+def test_hit_restores_the_downloaded_file(tmp_path):
+    video = tmp_path / "render" / "video.mp4"
+    video.parent.mkdir()
+    video.write_bytes(b"mp4 bytes")
+    cache = RenderCache(str(tmp_path / "cache"))
+    digest = edit_digest(_edit())
+
+    assert cache.get(digest) is None
+    cache.put(digest, "https://cdn/r1.mp4", str(video))
+    video.unlink()
+
+    entry = cache.get(digest)
+    assert entry["url"] == "https://cdn/r1.mp4"
+    assert cache.restore(entry, str(video))
+    assert video.read_bytes() == b"mp4 bytes"
+    assert cache.stats == {"misses": 1, "hits": 1}
+
+
+def test_index_survives_a_restart(tmp_path):
+    RenderCache(str(tmp_path)).put("d1", "https://cdn/r1.mp4")
+    assert RenderCache(str(tmp_path)).get("d1")["url"] == "https://cdn/r1.mp4"
+
+
+def test_lru_eviction_drops_the_file(tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x")
+    cache = RenderCache(str(tmp_path / "cache"), max_items=2)
+    cache.put("first", "u1", str(video))
+    cache.put("second", "u2")
+    cache.get("first")
+    cache.put("third", "u3")
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None and cache.get("third") is not None
+    assert os.path.exists(cache.get("first")["file"])
+
+    cache.put("fourth", "u4")
+    cache.put("fifth", "u5")
+    assert cache.get("first") is None
+    assert os.listdir(tmp_path / "cache") == ["index.json"]
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = RenderCache(str(tmp_path), ttl=-1)
+    cache.put("d1", "u1")
+    assert cache.get("d1") is None
+    assert cache.stats["expired"] == 1
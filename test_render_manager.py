@@ -0,0 +1,105 @@
+"""RenderManager's 429 handling and poll back-off against a scripted API. Run `python -m pytest test_render_manager.py`."""
+
+import asyncio
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from render_manager import RenderError, RenderManager, retry_after
+
+
+class _ApiError(Exception):
+    """what the SDK raises for an HTTP error: status and headers of the response."""
+
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = headers or {}
+
+
+class _ScriptedApi:
+    """an EditApi whose responses (or exceptions) are taken in order from the script lists."""
+
+    def __init__(self, posts=(), polls=()):
+        self.api_client = SimpleNamespace(configuration=None)
+        self.posts = list(posts)
+        self.polls = list(polls)
+        self.calls = []
+        self.manager = None
+
+    def _next(self, script):
+        item = script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def post_render(self, edit):
+        self.calls.append(("post", time.monotonic(), None))
+        return self._next(self.posts) if self.posts else {"response": {"message": "queued", "id": "r1"}}
+
+    def get_render(self, render_id, data=False, merged=True):
+        job = self.manager._jobs.get(render_id)
+        self.calls.append(("poll", time.monotonic(), job.interval if job is not None else None))
+        status = self._next(self.polls)
+        return {"response": {"id": render_id, "status": status, "url": "http://fake/r1.mp4" if status == "done" else None}}
+
+
+def _render(api, **kwargs):
+    manager = RenderManager(api=api, **kwargs)
+    api.manager = manager
+
+    async def main():
+        return await (await manager.submit(object()))
+
+    return manager, asyncio.run(main())
+
+
+def test_retry_after_parsing():
+    assert retry_after(_ApiError(500)) is None
+    assert retry_after(ValueError("not an API error")) is None
+    assert retry_after(_ApiError(429), default=2.0) == 2.0
+    assert retry_after(_ApiError(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after(_ApiError(429, {"Retry-After": "-1"})) == 0.0
+    assert retry_after(_ApiError(429, {"Retry-After": "soon"}), default=2.0) == 2.0
+
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(_ApiError(429, {"Retry-After": later})) == pytest.approx(30, abs=2)
+    past = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert retry_after(_ApiError(429, {"Retry-After": past})) == 0.0
+
+
+def test_rate_limited_post_waits_for_retry_after():
+    api = _ScriptedApi(posts=[_ApiError(429, {"Retry-After": "0.3"})], polls=["done"])
+    manager, response = _render(api, min_interval=0.01)
+
+    assert response["status"] == "done"
+    assert manager.rate_limited == 1
+    (_, first, _), (_, second, _) = api.calls[:2]
+    assert second - first >= 0.3
+
+
+def test_rate_limited_polls_are_not_errors():
+    # more 429s in a row than max_poll_errors, which would fail the render if they counted
+    api = _ScriptedApi(polls=[_ApiError(429, {"Retry-After": "0"})] * 6 + ["done"])
+    manager, response = _render(api, min_interval=0.01, max_poll_errors=5)
+
+    assert response["status"] == "done"
+    assert manager.rate_limited == 6
+
+
+def test_other_poll_errors_fail_the_render():
+    api = _ScriptedApi(polls=[_ApiError(500)] * 3)
+    with pytest.raises(RenderError, match="unable to resolve API call"):
+        _render(api, min_interval=0.01, max_poll_errors=3)
+
+
+def test_poll_interval_backs_off_and_resets_when_saving():
+    api = _ScriptedApi(polls=["queued", "queued", "rendering", "rendering", "saving", "saving", "done"])
+    manager, response = _render(api, min_interval=0.01, backoff=2.0, max_interval=0.05)
+
+    assert response["status"] == "done"
+    intervals = [interval for kind, _, interval in api.calls if kind == "poll"]
+    assert intervals == pytest.approx([0.01, 0.02, 0.04, 0.05, 0.05, 0.01, 0.02])
+    assert manager.pending() == 0
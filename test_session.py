@@ -0,0 +1,76 @@
+"""EditSession isolation between threads and asyncio tasks. Run `python -m pytest test_session.py`."""
+
+import asyncio
+import threading
+
+from session import EditSession, current_session, default_session
+from tools import ALL_TOOLS
+
+
+TOOLS = {tool.name: tool for tool in ALL_TOOLS}
+
+
+def test_tools_edit_the_active_session_only():
+    first, second = EditSession(), EditSession()
+    with first.activate():
+        TOOLS["add_text"].run("'Hello, 0.0, 3.0'")
+        with second.activate():
+            TOOLS["add_text"].run("'World, 1.0, 2.0'")
+            TOOLS["change_output_resolution"].run("'hd'")
+        assert current_session() is first
+
+    assert list(first.text_clip_dict) == ["Hello"] and list(second.text_clip_dict) == ["World"]
+    assert first.output.resolution == "sd" and second.output.resolution == "hd"
+    assert current_session() is default_session
+    assert not default_session.text_clip_dict
+
+
+def test_threads_do_not_share_sessions():
+    sessions = [EditSession() for _ in range(8)]
+    barrier = threading.Barrier(len(sessions))
+
+    def edit(session, n):
+        with session.activate():
+            barrier.wait()
+            for i in range(50):
+                TOOLS["add_text"].run(f"'t{n}-{i}, {float(i)}, 1.0'")
+
+    threads = [threading.Thread(target=edit, args=(session, n)) for n, session in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n, session in enumerate(sessions):
+        assert list(session.text_clip_dict) == [f"t{n}-{i}" for i in range(50)]
+        assert session.duration() == 50.0
+
+
+def test_tasks_do_not_share_sessions():
+    async def edit(session, name):
+        with session.activate():
+            await asyncio.sleep(0)
+            TOOLS["add_subtitle"].run(f"'{name}, 0.0, 1.0'")
+            await asyncio.sleep(0)
+            return current_session()
+
+    async def main():
+        first, second = EditSession(), EditSession()
+        active = await asyncio.gather(edit(first, "a"), edit(second, "b"))
+        assert active == [first, second]
+        assert list(first.subtitle_clip_dict) == ["a"] and list(second.subtitle_clip_dict) == ["b"]
+
+    asyncio.run(main())
+
+
+def test_close_releases_the_edit():
+    session = EditSession("abc")
+    with session.activate():
+        TOOLS["add_text"].run("'Hello, 0.0, 3.0'")
+    session.compile_tracks()
+    session.close()
+
+    assert not session.text_clip_dict and not session.tracks
+    assert session.duration() == 0.0
+    assert session.render_path == "./render/abc.mp4"
+    assert default_session.render_path == "./render/video.mp4"
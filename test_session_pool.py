@@ -0,0 +1,76 @@
+"""SessionPool eviction of held sessions and the server's 404 for unknown ones. Run `python -m pytest test_session_pool.py`."""
+
+import asyncio
+import json
+
+import pytest
+
+from server import AgentService, Server
+from session import SessionPool, UnknownSession
+
+
+def test_held_session_is_not_evicted():
+    pool = SessionPool(max_sessions=2)
+    first = pool.get()
+    with pool.activate(first.id) as held:
+        first.text_clip_dict["kept"] = object()
+        pool.get()
+        pool.get()
+        assert first.id in pool
+        assert held.text_clip_dict
+    # the least recently used unheld one went instead, and the pool is back at its cap
+    assert len(pool) == 2
+
+
+def test_close_while_held_waits_for_release():
+    pool = SessionPool()
+    session = pool.get()
+    with pool.activate(session.id):
+        session.text_clip_dict["kept"] = object()
+        pool.close(session.id)
+        assert session.id not in pool
+        assert session.text_clip_dict
+    assert not session.text_clip_dict
+
+
+def test_unknown_session_is_not_created():
+    pool = SessionPool()
+    with pytest.raises(UnknownSession):
+        with pool.activate("made-up", create=False):
+            pass
+    assert "made-up" not in pool
+
+
+def test_idle_eviction_skips_held_sessions():
+    pool = SessionPool(idle_timeout=0.0)
+    idle, busy = pool.get(), pool.get()
+    with pool.activate(busy.id):
+        assert pool.evict_idle() == 1
+        assert busy.id in pool and idle.id not in pool
+
+
+async def _request(port, method, path, body=None, headers=""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n{headers}"
+                  f"Content-Length: {len(data)}\r\n\r\n").encode() + data)
+    status = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status.split()[1])
+
+
+def test_server_refuses_unknown_session_ids():
+    async def main():
+        service = AgentService()
+        server = await Server(service, port=0).start()
+        try:
+            objective = {"objective": "add a text 'hi' from 0.0 for 1.0"}
+            assert await _request(server.port, "POST", "/sessions/made-up/objectives", objective) == 404
+            upgrade = "Upgrade: websocket\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n"
+            assert await _request(server.port, "GET", "/sessions/made-up/ws", headers=upgrade) == 404
+            assert "made-up" not in service.pool and len(service.pool) == 0
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
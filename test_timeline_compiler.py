@@ -0,0 +1,75 @@
+"""Lane packing and dirty-kind recompiles in timeline_compiler. Run `python -m pytest test_timeline_compiler.py`."""
+
+import random
+
+from edit_model import Clip, TitleAsset
+from session import EditSession
+from timeline_compiler import pack_lanes
+
+
+def _text(session, name, start, length):
+    session.text_clip_dict[name] = Clip(asset=TitleAsset(text=name), start=start, length=length)
+    session.touch("text", name)
+
+
+def _names(tracks):
+    return [[clip.asset.text for clip in track.clips] for track in tracks]
+
+
+def test_overlapping_text_keeps_z_order():
+    session = EditSession()
+    # added top layer first: "title" over "caption" over "credit"
+    _text(session, "title", 2.0, 4.0)
+    _text(session, "caption", 0.0, 3.0)
+    _text(session, "credit", 5.0, 3.0)
+
+    assert _names(session.compile_tracks()) == [["title"], ["caption", "credit"]]
+
+    # a later clip fills the top lane with room, but goes under every earlier clip it overlaps
+    _text(session, "late", 10.0, 1.0)
+    _text(session, "under", 2.5, 1.0)
+    assert _names(session.compile_tracks()) == [["title", "late"], ["caption", "credit"], ["under"]]
+
+
+def test_disjoint_clips_share_a_lane():
+    session = EditSession()
+    for i in range(5):
+        _text(session, f"t{i}", i * 2.0, 2.0)
+
+    assert _names(session.compile_tracks()) == [[f"t{i}" for i in range(5)]]
+
+
+def test_pack_lanes_never_lifts_a_clip_over_an_earlier_overlap():
+    rng = random.Random(7)
+    clips = [Clip(start=float(rng.randrange(50)), length=float(rng.randrange(1, 10))) for _ in range(200)]
+
+    lanes = pack_lanes(clips)
+    lane_of = {id(clip): i for i, lane in enumerate(lanes) for clip in lane}
+    assert sorted(lane_of) == sorted(map(id, clips))
+
+    for i, upper in enumerate(clips):
+        for lower in clips[i + 1:]:
+            if upper.start < lower.start + lower.length and lower.start < upper.start + upper.length:
+                assert lane_of[id(upper)] < lane_of[id(lower)]
+    for lane in lanes:
+        assert all(a.start + a.length <= b.start for a, b in zip(lane, lane[1:]))
+
+
+def test_clean_kinds_reuse_their_tracks():
+    session = EditSession()
+    _text(session, "title", 0.0, 2.0)
+    session.subtitle_clip_dict["line"] = Clip(asset=TitleAsset(text="line"), start=0.0, length=2.0)
+    session.touch("subtitle", "line")
+    first = list(session.compile_tracks())
+
+    _text(session, "second", 0.0, 2.0)
+    second = session.compile_tracks()
+
+    assert _names(second) == [["title"], ["second"], ["line"]]
+    # only text was dirty: the subtitle track is the very same object
+    assert second[-1] is first[-1]
+    assert second[0] is not first[0]
+
+    # attribute edits show through the cached tracks without a recompile
+    session.text_clip_dict["title"].asset.text = "renamed"
+    assert _names(session.compile_tracks())[0] == ["renamed"]
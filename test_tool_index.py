@@ -0,0 +1,78 @@
+"""The persisted tool index only re-embeds chunks that changed. Run `python -m pytest test_tool_index.py`."""
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.embeddings.base import Embeddings
+from langchain.text_splitter import CharacterTextSplitter
+
+from tool_index import load_tool_index, split_tools
+
+
+TOOLS = '''import os
+
+@tool("add_text")
+def add_text(query: str) -> str:
+    """add a text. For example 'Hello, 0.0, 3.0'."""
+
+@tool("change_text_size", arity=2)
+def change_text_size(query: str) -> str:
+    """change the text size. For example 'Hello, x-small'."""
+
+@tool("change_text_color", arity=2)
+def change_text_color(query: str) -> str:
+    """change the text color. For example 'Hello, #FF0000'."""
+'''
+
+
+class _CountingEmbeddings(Embeddings):
+    """a tiny deterministic embedding that counts the texts it was asked to embed."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        return [float(text.count(c)) + 1.0 for c in "aeiou"]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_split_keeps_each_chunk_inside_its_tool():
+    chunks = list(split_tools(TOOLS, CharacterTextSplitter(chunk_size=60, chunk_overlap=0, separator=" ")))
+
+    assert chunks[0][0] is None
+    assert [name for name, position, _ in chunks if position == 0] == [None, "add_text", "change_text_size",
+                                                                        "change_text_color"]
+    for name, _, chunk in chunks:
+        if name is not None:
+            assert "@tool" not in chunk or f'"{name}"' in chunk
+
+
+def test_only_changed_tools_are_re_embedded(tmp_path):
+    pytest.importorskip("chromadb")
+    path = tmp_path / "tools.txt"
+    path.write_text(TOOLS)
+    persist = str(tmp_path / "index")
+
+    embeddings = _CountingEmbeddings()
+    db = load_tool_index(str(path), persist_directory=persist, embeddings=embeddings)
+    first = len(embeddings.embedded)
+    assert first and len(db._collection.get()["ids"]) == first
+
+    embeddings.embedded.clear()
+    load_tool_index(str(path), persist_directory=persist, embeddings=embeddings)
+    assert embeddings.embedded == []
+
+    path.write_text(TOOLS.replace("change the text color", "recolor the text"))
+    db = load_tool_index(str(path), persist_directory=persist, embeddings=embeddings)
+    assert embeddings.embedded and all("recolor" in text or "change_text_color" in text for text in embeddings.embedded)
+    stored = db._collection.get(include=["documents", "metadatas"])
+    assert len(stored["ids"]) == first
+    assert not any("change the text color" in text for text in stored["documents"])
+    assert {meta["tool"] for meta in stored["metadatas"]} == {"", "add_text", "change_text_size", "change_text_color"}
@@ -0,0 +1,67 @@
+from bisect import bisect_left
+
+from edit_model import Track
+
+
+# track order in the compiled timeline, top layer first
+KINDS = ("text", "subtitle", "video_and_image")
+
+
+def _span(clip):
+    return clip.start, clip.start + clip.length
+
+
+def pack_lanes(clips):
+    """pack clips given top layer first, never putting a clip above an earlier clip it overlaps.
+
+    Each clip goes into the lane just below the lowest lane holding an earlier
+    overlapping clip, which is the highest lane it may occupy without changing
+    the layer order, so overlapping videos keep their stacking while clips
+    that never meet share a track.
+    """
+
+    lanes = []
+    for clip in clips:
+        start, end = _span(clip)
+        lane = 0
+        for i in range(len(lanes) - 1, -1, -1):
+            starts, ends, _ = lanes[i]
+            j = bisect_left(starts, end)
+            if j and ends[j - 1] > start:
+                lane = i + 1
+                break
+
+        if lane == len(lanes):
+            lanes.append(([], [], []))
+        starts, ends, lane_clips = lanes[lane]
+        j = bisect_left(starts, start)
+        starts.insert(j, start)
+        ends.insert(j, end)
+        lane_clips.insert(j, clip)
+    return [lane_clips for _, _, lane_clips in lanes]
+
+
+class TimelineCompiler:
+    """turn a session's clip dicts into timeline tracks, rebuilding only the kinds marked dirty.
+
+    Only adding, removing, retiming or reordering clips changes the packing;
+    edits to a clip's other attributes show up in the cached tracks as they
+    hold the same Clip objects.
+    """
+
+    def __init__(self):
+        self._tracks = dict.fromkeys(KINDS, ())
+        self._dirty = set(KINDS)
+
+    def mark_dirty(self, kind):
+        self._dirty.add(kind)
+
+    def compile(self, session):
+        for kind in KINDS:
+            if kind not in self._dirty:
+                continue
+            lanes = pack_lanes(list(getattr(session, kind + "_clip_dict").values()))
+            self._tracks[kind] = [Track(clips=lane) for lane in lanes]
+        self._dirty.clear()
+
+        return [track for kind in KINDS for track in self._tracks[kind]]
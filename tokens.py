@@ -0,0 +1,18 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+_encoding = None
+
+
+def count_tokens(text):
+    """prompt tokens as the OpenAI models count them; about 4 characters per token without tiktoken."""
+
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("p50k_base")
+    return len(_encoding.encode(text))
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import re
+
+from langchain.embeddings.openai import OpenAIEmbeddings
+from langchain.vectorstores import Chroma
+from langchain.text_splitter import CharacterTextSplitter
+
+
+# bump when what is stored per chunk changes, so persisted indexes get rebuilt
+INDEX_VERSION = 3
+
+TOOL_HEADER = re.compile(r'@tool\("(\w+)"[^)]*\)')
+
+
+def _sha256(text):
+    return hashlib.sha256(f"{INDEX_VERSION}\0{text}".encode()).hexdigest()
+
+
+def split_tools(text, splitter):
+    """(tool, position, chunk) for every chunk of text, split one tool definition at a time.
+
+    No chunk straddles two tools, so each one's tool is known from where it
+    was cut rather than searched for afterwards (descriptions repeat across
+    tools). Text before the first @tool header has tool None.
+    """
+
+    headers = list(TOOL_HEADER.finditer(text))
+    bounds = [0] + [header.start() for header in headers] + [len(text)]
+    names = [None] + [header.group(1) for header in headers]
+    for name, start, end in zip(names, bounds, bounds[1:]):
+        for position, chunk in enumerate(splitter.split_text(text[start:end])):
+            yield name, position, chunk
+
+
+def load_tool_index(path="./tools.txt", persist_directory="./.cache/tool_index", collection_name="tool_test",
+                    embeddings=None):
+    """the Chroma index over the tool descriptions, persisted and only re-embedded where they changed.
+
+    Chunks are stored under their tool, their position within it and the
+    sha256 of their text. A manifest records the hash of the whole tools file:
+    when it matches, the persisted collection is opened as is. Otherwise only
+    new or moved chunks are embedded and chunks that disappeared are deleted.
+    Each chunk's metadata names the tool it describes, for ToolSelector.
+    """
+
+    with open(path) as f:
+        text = f.read()
+    digest = _sha256(text)
+
+    db = Chroma(collection_name=collection_name, embedding_function=embeddings or OpenAIEmbeddings(),
+                persist_directory=persist_directory)
+
+    manifest_path = os.path.join(persist_directory, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f).get(collection_name) == digest:
+                return db
+
+    chunks = {}
+    for tool, position, chunk in split_tools(text, CharacterTextSplitter(chunk_size=200, chunk_overlap=20)):
+        # identical text in two tools stays two chunks, each voting for its own tool
+        chunks[f"{tool or ''}:{position}:{_sha256(chunk)}"] = (tool, chunk)
+
+    existing = set(db._collection.get()["ids"])
+    stale = [chunk_id for chunk_id in existing if chunk_id not in chunks]
+    added = [chunk_id for chunk_id in chunks if chunk_id not in existing]
+
+    if stale:
+        db._collection.delete(ids=stale)
+    if added:
+        db.add_texts([chunks[chunk_id][1] for chunk_id in added],
+                     metadatas=[{"source": path, "tool": chunks[chunk_id][0] or ""} for chunk_id in added],
+                     ids=added)
+    db.persist()
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    manifest[collection_name] = digest
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(f"tool index: {len(added)} chunks embedded, {len(stale)} removed, {len(chunks) - len(added)} reused")
+    return db
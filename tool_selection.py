@@ -0,0 +1,84 @@
+import contextvars
+from contextlib import contextmanager
+
+from tokens import count_tokens
+
+
+# the tool a subagent needs before any of its other tools can apply
+ALWAYS_EXPOSED = {"add_text", "add_subtitle", "add_video", "add_image"}
+
+_selection = contextvars.ContextVar("tool_selection", default=None)
+
+
+class ToolSelector:
+    """turn the tool index's similarity search into the tools each subagent is shown for one request.
+
+    The top k chunks vote for the tools they came from. A subagent whose tools
+    got votes sees only those (plus its add_* tool); a subagent with no votes
+    keeps its full tool set, as does every subagent when the best match is
+    further than max_distance, i.e. retrieval is not confident.
+    """
+
+    def __init__(self, tool_db, subagent_tools=None, k=8, max_distance=0.5):
+        if subagent_tools is None:
+            from tools import SUBAGENT_TOOLS
+            subagent_tools = SUBAGENT_TOOLS
+        self.tool_db = tool_db
+        self.subagent_tools = subagent_tools
+        self.k = k
+        self.max_distance = max_distance
+
+    def select(self, query):
+        """{subagent name: [tools]} for the request, or None to expose every tool."""
+
+        results = self.tool_db.similarity_search_with_score(query, k=self.k)
+        if not results or min(score for _, score in results) > self.max_distance:
+            return None
+
+        voted = {doc.metadata.get("tool") for doc, _ in results}
+        selection = {}
+        for name, tools in self.subagent_tools.items():
+            if any(t.name in voted for t in tools):
+                selection[name] = [t for t in tools if t.name in voted or t.name in ALWAYS_EXPOSED]
+        return selection
+
+    def prompt_tokens(self, selection):
+        """(tokens of every subagent's tool descriptions, tokens with the selection applied)."""
+
+        full = after = 0
+        for name, tools in self.subagent_tools.items():
+            described = [count_tokens(f"{t.name}: {t.description}") for t in tools]
+            full += sum(described)
+            if selection is None or name not in selection:
+                after += sum(described)
+            else:
+                after += sum(count_tokens(f"{t.name}: {t.description}") for t in selection[name])
+        return full, after
+
+    @contextmanager
+    def activate(self, query):
+        """select tools for this request and expose them to current_tools() while it runs."""
+
+        selection = self.select(query)
+        full, after = self.prompt_tokens(selection)
+        if selection is None:
+            print(f"tool selection: low confidence, all tools exposed ({full} description tokens)")
+        else:
+            exposed = sum(len(tools) for tools in selection.values())
+            print(f"tool selection: {exposed} tools across {len(selection)} subagents, "
+                  f"description tokens {full} -> {after} ({1 - after / full:.0%} saved)")
+
+        token = _selection.set(selection)
+        try:
+            yield selection
+        finally:
+            _selection.reset(token)
+
+
+def current_tools(subagent):
+    """the tools selected for this subagent in the running request, None for its full set."""
+
+    selection = _selection.get()
+    if selection is None:
+        return None
+    return selection.get(subagent)
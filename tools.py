@@ -1,41 +1,15 @@
-from langchain.agents import tool
-from langchain.agents import initialize_agent
-from langchain.llms import PromptLayerOpenAI
-
-import shotstack_sdk as shotstack
 import os, sys
-import requests
-import time
-
-import pickle
-from collections import OrderedDict
-
-from shotstack_sdk.model.soundtrack  import Soundtrack
-from shotstack_sdk.model.image_asset import ImageAsset
-from shotstack_sdk.model.video_asset import VideoAsset
-from shotstack_sdk.api               import edit_api
-from shotstack_sdk.model.clip        import Clip
-from shotstack_sdk.model.crop        import Crop
-from shotstack_sdk.model.track       import Track
-from shotstack_sdk.model.timeline    import Timeline
-from shotstack_sdk.model.output      import Output
-from shotstack_sdk.model.edit        import Edit
-from shotstack_sdk.model.title_asset import TitleAsset
-from shotstack_sdk.model.transition import Transition
+import threading
 
-video_and_image_clip_dict = OrderedDict()
-subtitle_clip_dict = OrderedDict()
-text_clip_dict = OrderedDict()
-tracks = []
+import tracing
+from edit_model import Clip, Crop, Edit, ImageAsset, Poster, Soundtrack, Thumbnail, TitleAsset, Transition, VideoAsset
+from lazy_tools import Failure, tool
+from session import current_session
 
-timeline = Timeline(background="#000000", tracks=tracks)
-output = Output(format="mp4", resolution="sd")
-
-
-# with open('./render/clips.pkl', 'rb') as f:
-#     video_and_image_clip_dict, subtitle_clip_dict, text_clip_dict = pickle.load(f)
-# with open('./render/tracks.pkl', 'rb') as f:
-#     saved_tracks = pickle.load(f)
+# langchain and the render/download machinery are imported where they are first needed, and the
+# edit is built from edit_model's plain dicts, which only become shotstack SDK models when they are
+# posted for rendering, so `import tools` stays cheap and works offline without any API keys.
+# edits are persisted, and can be undone, through journal.Journal rather than pickled here.
 
 
 @tool("change_timeline_background_color")
@@ -43,8 +17,9 @@ def change_timeline_background_color(query: str) -> str:
     """change the timeline's background color. For example, to change the timeline background color to Silver, the query should be '#C0C0C0'.
     Always remember to set the color using hexadecimal color notation, for example 'white' is '#FFFFFF'. """
 
+    session = current_session()
     color = query[1:-1]
-    timeline.background = color
+    session.timeline.background = color
     return None
 
 
@@ -53,8 +28,12 @@ def add_timeline_soundtrack(query: str) -> str:
     """add a music or audio soundtrack mp3 file for the timeline. For example, to add a music with url 'https://s3-ap-northeast-1.amazonaws.com/my-bucket/music.mp3', 
     the query should be 'https://s3-ap-northeast-1.amazonaws.com/my-bucket/music.mp3'."""
 
+    session = current_session()
     url = query[1:-1]
-    timeline.soundtrack.src = url
+    if getattr(session.timeline, "soundtrack", None) is None:
+        session.timeline.soundtrack = Soundtrack(src=url)
+    else:
+        session.timeline.soundtrack.src = url
     return None
 
 
@@ -63,13 +42,14 @@ def change_timeline_soundtrack_effect(query: str) -> str:
     """change the timeline's soundtrack effect. For example, to change effect to 'fadeInFadeOut', 
     the query should be 'fadeInFadeOut', which means fade volume in and out."""
 
+    session = current_session()
     effect = query[1:-1]
 
-    if timeline.soundtrack != None:
-        timeline.soundtrack.effect = effect
+    if getattr(session.timeline, "soundtrack", None) is not None:
+        session.timeline.soundtrack.effect = effect
         return None
     else:
-        return "The timeline soundtrack not exists, skip and continue to the next step."
+        return Failure("The timeline soundtrack not exists, skip and continue to the next step.")
 
 
 @tool("change_timeline_soundtrack_volume")
@@ -78,13 +58,14 @@ def change_timeline_soundtrack_volume(query: str) -> str:
     Set the volume for the soundtrack between 0 and 1 where 0 is muted and 1 is full volume (defaults to 1).
     For example, to change soundtrack's volume to 0.3, the query should be '0.3'."""
 
+    session = current_session()
     vol = query[1:-1]
 
-    if timeline.soundtrack != None:
-        timeline.soundtrack.volume = float(vol)
+    if getattr(session.timeline, "soundtrack", None) is not None:
+        session.timeline.soundtrack.volume = float(vol)
         return None
     else:
-        return "The timeline soundtrack not exists, skip and continue to the next step."
+        return Failure("The timeline soundtrack not exists, skip and continue to the next step.")
 
 
 @tool("change_output_format")
@@ -92,8 +73,9 @@ def change_output_format(query: str) -> str:
     """change the output format. For example, to change output format to 'mp4', 
     the query should be 'mp4'."""
 
+    session = current_session()
     format = query[1:-1]
-    output.format = format
+    session.output.format = format
     return None
 
 
@@ -102,8 +84,9 @@ def change_output_resolution(query: str) -> str:
     """change the output resolution. For example, to change output resolution to 'hd', 
     the query should be 'hd'. The resolution can be 'preview', 'mobile', 'sd', 'hd', '1080'."""
 
+    session = current_session()
     reso = query[1:-1]
-    output.resolution = reso
+    session.output.resolution = reso
     return None
 
 
@@ -112,8 +95,9 @@ def change_output_aspectRatio(query: str) -> str:
     """change the output aspect ratio (shape) of the video. For example, to change output aspect ratio to '4:5', 
     the query should be '4:5'."""
 
+    session = current_session()
     ratio = query[1:-1]
-    output.aspectRatio = ratio
+    session.output.aspectRatio = ratio
     return None
 
 
@@ -123,8 +107,9 @@ def change_output_fps(query: str) -> str:
     For example, to change output fps to '23.976', 
     the query should be '23.976'."""
 
+    session = current_session()
     fps = query[1:-1]
-    output.fps = float(fps)
+    session.output.fps = float(fps)
     return None
 
 
@@ -133,16 +118,18 @@ def change_output_quality(query: str) -> str:
     """change the output quality. For example, to change output quality to 'low', 
     the query should be 'low'."""
 
+    session = current_session()
     qua = query[1:-1]
-    output.quality = qua
+    session.output.quality = qua
     return None
 
 @tool("set_output_repeat")
 def set_output_repeat(query: str) -> str:
     """Loop settings for gif files. query is 'True' to loop and repeat, 'False' to play only once."""
 
+    session = current_session()
     repeat = query[1:-1]
-    output.repeat = bool(repeat)
+    session.output.repeat = repeat == 'True'
     return None
 
 
@@ -150,8 +137,9 @@ def set_output_repeat(query: str) -> str:
 def set_output_mute(query: str) -> str:
     """Mute the audio of the output video. query equals 'True' to mute, 'False' to un-mute."""
 
+    session = current_session()
     mute = query[1:-1]
-    output.mute = bool(mute)
+    session.output.mute = mute == 'True'
     return None
 
 
@@ -162,8 +150,10 @@ def choose_poster_from_timeline(query: str) -> str:
     Always remember to set the time using float, for example 8 seconds should be 8.0.
     """
 
+    session = current_session()
     frame = query[1:-1]
-    output.poster.capture = float(frame)
+
+    session.output.poster = Poster(capture=float(frame))
     return None
 
 
@@ -174,131 +164,141 @@ def choose_thumbnail_from_timeline(query: str) -> str:
     Always remember to set the time using float, for example 8 seconds should be 8.0.
     """
 
+    session = current_session()
     frame = query[1:-1]
-    output.thumbnail.capture = float(frame)
-    output.thumbnail.scale = 1.0
+
+    session.output.thumbnail = Thumbnail(capture=float(frame), scale=1.0)
     return None
 
 
-@tool("add_text")
+@tool("add_text", arity=3)
 def add_text(query: str) -> str:
     """add text. For example, to add a text with content 'Tim's Vlog', starting from 2.5s and lasting for 4.5s,
     the query should be 'Tim's Vlog, 2.5, 4.5'. Always remember to set the time to 'start time(sec), last length(sec)' format,
     for example starting from 4.7s and ending at 5.2s should be transformed to '4.7, 0.5' because 0.5s = 5.2s - 4.7s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     content, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        if text_clip_dict[content].start == float(st) and text_clip_dict[content].length == float(lt):
+    if content in session.text_clip_dict.keys():
+        if session.text_clip_dict[content].start == float(st) and session.text_clip_dict[content].length == float(lt):
             return "The text has already been added in the project, skip and continue to the next step."
     else:
         text_asset = TitleAsset(style="minimal", text=content, size="x-large")
         text_clip = Clip(asset=text_asset, start=float(st), length=float(lt))
-        text_clip_dict[content] = text_clip
+        session.text_clip_dict[content] = text_clip
+        session.touch("text", content)
         return None
 
 
-@tool("change_text_color")
+@tool("change_text_color", arity=2)
 def change_text_color(query: str) -> str:
     """change the text color. For example, to change the 'how are you' text's color to yellow, the query should be 'how are you, #FFCA28'.
     Always remember to set the text color using hexadecimal color notation, for example 'white' is '#FFFFFF'. """
 
+    session = current_session()
     content, color = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.color = color
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.color = color
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_size")
+@tool("change_text_size", arity=2)
 def change_text_size(query: str) -> str:
     """change the text size. For example, to change the 'how are you' text's size to x-small, the query should be 'how are you, x-small'."""
 
+    session = current_session()
     content, size = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.size = size
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.size = size
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_background_color")
+@tool("change_text_background_color", arity=2)
 def change_text_background_color(query: str) -> str:
     """change the text's background color. For example, to change the 'max-o-man' text's color to Cyan, the query should be 'max-o-man, #00FFFF'.
     Always remember to set the background color using hexadecimal color notation, for example 'white' is '#FFFFFF'."""
 
+    session = current_session()
     content, color = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.background = color
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.background = color
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_style")
+@tool("change_text_style", arity=2)
 def change_text_style(query: str) -> str:
     """change the text's style. For example, to change the text 'take me to oblivion' style to 'sketchy', 
     the query should be 'take me to oblivion, sketchy'."""
     
+    session = current_session()
     content, style = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.style = style
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.style = style
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_effect")
+@tool("change_text_effect", arity=2)
 def change_text_effect(query: str) -> str:
     """change the text's effect. For example, to change the text 'take me to oblivion' effect to 'zoomOut', 
     the query should be 'take me to oblivion, zoomOut'."""
     
+    session = current_session()
     content, effect = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].effect = effect
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].effect = effect
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_opacity")
+@tool("change_text_opacity", arity=2)
 def change_text_opacity(query: str) -> str:
     """change the text's opacity. For example, to change the text 'take me to oblivion' opacity to 0.4, 
     the query should be 'take me to oblivion, 0.4'. Sets the opacity of the Clip where 1 is opaque and 0 is transparent."""
     
+    session = current_session()
     content, opa = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].opacity = float(opa) 
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].opacity = float(opa) 
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("rotate_text")
+@tool("rotate_text", arity=2)
 def rotate_text(query: str) -> str:
     """rotate the text by the specified angle in degrees. The angle to rotate the text can be 0 to 360, or 0 to -360. 
     Using a positive number rotates the clip clockwise, negative numbers counter-clockwise.
     For example, to rotate the text 'macos windows' 45 degrees clockwise, 
     the query should be 'macos windows, 45'."""
     
+    session = current_session()
     content, deg = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].transform.rotate.angle = int(deg)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].transform.rotate.angle = int(deg)
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("skew_text")
+@tool("skew_text", arity=3)
 def skew_text(query: str) -> str:
     """Skew a text so its edges are sheared at an angle. Use values between 0 and 3. 
     Over 3 the clip will be skewed almost flat.
@@ -306,17 +306,18 @@ def skew_text(query: str) -> str:
     the query should be 'macos windows, 0.5, 1.5'.
     If only one axis chonsen, then set the other axis number to 0 for no skewing."""
     
+    session = current_session()
     content, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].transform.skew.x = float(x)
-        text_clip_dict[content].transform.skew.y = float(y)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].transform.skew.x = float(x)
+        session.text_clip_dict[content].transform.skew.y = float(y)
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("flip_text")
+@tool("flip_text", arity=3)
 def flip_text(query: str) -> str:
     """Flip a text vertically or horizontally.
     For example, to flip the text 'macos windows' horizontally, 
@@ -324,45 +325,48 @@ def flip_text(query: str) -> str:
     Always set the query format to 'text_content, is_vertically_flip, is_horizontally_flip'.
     If flip for both vertically and horizontally, 'True, True' is good."""
     
+    session = current_session()
     content, hor, ver = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].transform.flip.horizontal = bool(hor)
-        text_clip_dict[content].transform.flip.vertical = bool(ver)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].transform.flip.horizontal = bool(hor)
+        session.text_clip_dict[content].transform.flip.vertical = bool(ver)
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_position")
+@tool("change_text_position", arity=2)
 def change_text_position(query: str) -> str:
     """change the text's position. For example, to change the text 'take me to oblivion' position to 'topRight', 
     the query should be 'take me to oblivion, topRight'."""
     
+    session = current_session()
     content, pos = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.position = pos
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.position = pos
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text")
+@tool("change_text", arity=2)
 def change_text(query: str) -> str:
     """change the text content to 'query'. For example, to change the 'helloWorld' text's content to 'CoffeeTime',
     the query should be 'helloWorld, CoffeeTime'."""
 
+    session = current_session()
     content_old, content_new = query[1:-1].replace(", ", ",").split(",")
 
-    if content_old in text_clip_dict.keys():
-        text_clip_dict[content_old].asset.text = content_new
+    if content_old in session.text_clip_dict.keys():
+        session.text_clip_dict[content_old].asset.text = content_new
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_time")
+@tool("change_text_time", arity=3)
 def change_text_time(query: str) -> str:
     """change the text's start time and length. For example, to change the text 'Take Five' start time to 2 sec, with length 3 sec, 
     the query should be "Take Five, 2.0, 3.0".
@@ -370,104 +374,112 @@ def change_text_time(query: str) -> str:
     start at 1s and end at 5s should be transformed to '1.0, 4.0', because 4s = 5s - 1s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     content, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].start = float(st)
-        text_clip_dict[content].length = float(lt)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].start = float(st)
+        session.text_clip_dict[content].length = float(lt)
+        session.touch("text", content)
         return None
     else:
-        return "The text not exist, skip and continue to the next step."\
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("change_text_offset")
+@tool("change_text_offset", arity=3)
 def change_text_offset(query: str) -> str:
     """change the text's offset. Offset the location of the title relative to its position on the screen.
     For example, to change the text 'Take Five' offset to x = 0.1 and y = -0.2, 
     the query should be 'Take Five, 0.1, -0.2'.
     Always remember to set the offset to 'x_offset, y_offset'. Always remember to set the offset using float."""
 
+    session = current_session()
     content, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.offset.x = float(x)
-        text_clip_dict[content].asset.offset.y = float(y)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.offset.x = float(x)
+        session.text_clip_dict[content].asset.offset.y = float(y)
         return None
     else:
-        return "The text not exist, skip and continue to the next step."
+        return Failure("The text not exist, skip and continue to the next step.")
 
 
-@tool("add_text_transition")
+@tool("add_text_transition", arity=3)
 def add_text_transition(query: str) -> str:
     """add a transition for text. For example to add a 'shuffleLeftBottom' transition in the end of the text 'call on me',
     the query should be 'call on me, shuffleLeftBottom, out', and to add a 'zoom' transition in the start of the text 'holy grail',
     the query should be 'holy grail, zoom, in'. There are only 'in' and 'out' transitions."""
 
+    session = current_session()
     content, trans, io = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
+    if content in session.text_clip_dict.keys():
         if io == 'in':
             text_transition = Transition(_in=trans)
-            text_clip_dict[content].transition = text_transition
+            session.text_clip_dict[content].transition = text_transition
             return None
         elif io == 'out':
             text_transition = Transition(out=trans)
-            text_clip_dict[content].transition = text_transition
+            session.text_clip_dict[content].transition = text_transition
             return None
         else:
-            return "The transition type not 'in' or 'out', skip and continue to the next step."
+            return Failure("The transition type not 'in' or 'out', skip and continue to the next step.")
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("add_subtitle")
+@tool("add_subtitle", arity=3)
 def add_subtitle(query: str) -> str:
     """add subtitle. For example, to add a subtitle with content 'without a second glance', starting from 2.5s and lasting for 0.5s,
     the query should be 'Tim's Vlog, 2.5, 0.5'. Always remember to set the time to 'start time(sec), last length(sec)' format,
     for example starting from 4.7s and ending at 5.2s should be transformed to '4.7, 0.5' because 0.5s = 5.2s - 4.7s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     content, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        if subtitle_clip_dict[content].start == float(st) and subtitle_clip_dict[content].length == float(lt):
+    if content in session.subtitle_clip_dict.keys():
+        if session.subtitle_clip_dict[content].start == float(st) and session.subtitle_clip_dict[content].length == float(lt):
             return "The subtitle has already been added in the project, skip and continue to the next step."
     else:
         subtitle_asset = TitleAsset(style="subtitle", text=content, size="medium", position="bottom")
         subtitle_clip = Clip(asset=subtitle_asset, start=float(st), length=float(lt))
-        subtitle_clip_dict[content] = subtitle_clip
+        session.subtitle_clip_dict[content] = subtitle_clip
+        session.touch("subtitle", content)
         return None
 
 
-@tool("change_subtitle_style")
+@tool("change_subtitle_style", arity=2)
 def change_subtitle_style(query: str) -> str:
     """change the subtitle's style. For example, to change the subtitle 'the splitting of our species' style to 'sketchy', 
     the query should be 'the splitting of our species, sketchy'."""
     
+    session = current_session()
     content, style = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].asset.style = style
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].asset.style = style
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle")
+@tool("change_subtitle", arity=2)
 def change_subtitle(query: str) -> str:
     """change the subtitle content to 'query'. For example, to change the 'started from the bottom' subtitle's content to 'now we here',
     the query should be 'started from the bottom, now we here'."""
 
+    session = current_session()
     content_old, content_new = query[1:-1].replace(", ", ",").split(",")
 
-    if content_old in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content_old].asset.text = content_new
+    if content_old in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content_old].asset.text = content_new
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_time")
+@tool("change_subtitle_time", arity=3)
 def change_subtitle_time(query: str) -> str:
     """change the subtitle's start time and length. For example, to change the caption 'Take Five' start time to 2 sec, with length 3 sec, 
     the query should be "Take Five, 2.0, 3.0".
@@ -475,194 +487,226 @@ def change_subtitle_time(query: str) -> str:
     start at 1s and end at 5s should be transformed to '1.0, 4.0', because 4s = 5s - 1s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     content, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].start = float(st)
-        subtitle_clip_dict[content].length = float(lt)
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].start = float(st)
+        session.subtitle_clip_dict[content].length = float(lt)
+        session.touch("subtitle", content)
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_position")
+@tool("change_subtitle_position", arity=2)
 def change_subtitle_position(query: str) -> str:
     """change the subtitle's position. For example, to change the subtitle 'take me to oblivion' position to 'topRight', 
     the query should be 'take me to oblivion, topRight'."""
     
+    session = current_session()
     content, pos = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].asset.position = pos
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].asset.position = pos
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_color")
+@tool("change_subtitle_color", arity=2)
 def change_subtitle_color(query: str) -> str:
     """change the subtitle color. For example, to change the 'give me reason' subtitle's color to orange, the query should be 'give me reason, #FFA500'.
     Always remember to set the text color using hexadecimal color notation, for example 'white' is '#FFFFFF'. """
 
+    session = current_session()
     content, color = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].asset.color = color
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].asset.color = color
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_size")
+@tool("change_subtitle_size", arity=2)
 def change_subtitle_size(query: str) -> str:
     """change the subtitle size. For example, to change the 'in a worse case before' subtitle's size to x-small, the query should be 'in a worse case before, x-small'."""
 
+    session = current_session()
     content, size = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].asset.size = size
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].asset.size = size
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_background_color")
+@tool("change_subtitle_background_color", arity=2)
 def change_subtitle_background_color(query: str) -> str:
     """change the subtitle's background color. For example, to change the 'time machine' subtitle's color to Maroon, the query should be 'time machine, #800000'.
     Always remember to set the background color using hexadecimal color notation, for example 'white' is '#FFFFFF'."""
 
+    session = current_session()
     content, color = query[1:-1].replace(", ", ",").split(",")
 
-    if content in subtitle_clip_dict.keys():
-        subtitle_clip_dict[content].asset.background = color
+    if content in session.subtitle_clip_dict.keys():
+        session.subtitle_clip_dict[content].asset.background = color
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("change_subtitle_offset")
+@tool("change_subtitle_offset", arity=3)
 def change_subtitle_offset(query: str) -> str:
     """change the subtitle's offset. Offset the location of the subtitle relative to its position on the screen.
     For example, to change the subtitle 'a strange animal' offset to x = 0.1 and y = -0.2, 
     the query should be 'a strange animal, 0.1, -0.2'.
     Always remember to set the offset to 'x_offset, y_offset'. Always remember to set the offset using float."""
 
+    session = current_session()
     content, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if content in text_clip_dict.keys():
-        text_clip_dict[content].asset.offset.x = float(x)
-        text_clip_dict[content].asset.offset.y = float(y)
+    if content in session.text_clip_dict.keys():
+        session.text_clip_dict[content].asset.offset.x = float(x)
+        session.text_clip_dict[content].asset.offset.y = float(y)
         return None
     else:
-        return "The subtitle not exist, skip and continue to the next step."
+        return Failure("The subtitle not exist, skip and continue to the next step.")
 
 
-@tool("add_video")
+@tool("add_video", arity=4)
 def add_video(query: str) -> str:
     """add a video. For example, to add a video from url 'https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/footage/skater.hd.mp4', 
     starting from 45.7s and lasting for 66.3s, and the user wants to give it a name 'skater', then the query should be 'https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/footage/skater.hd.mp4, skater, 45.7, 66.3'. 
     Always remember to set the time to 'start time(sec), last length(sec)' format,
     for example starting from 4.7s and ending at 5.2s should be transformed to '4.7, 0.5' because 0.5s = 5.2s - 4.7s.
     Always remember to set the time using float, for example 8 seconds should be 8.0.
+    If the user wants the whole video and does not give its length, set the length to 'auto'.
     Use add_video only if video url and video name are given."""
 
+    from asset_probe import get_prober
+
+    session = current_session()
     url, video_name, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        if video_and_image_clip_dict[video_name].start == float(st) and video_and_image_clip_dict[video_name].length == float(lt):
+    # start reading the source's headers now, so trim_video and 'auto' lengths need not wait on the network
+    probe = get_prober().probe_async(url)
+    if lt == "auto":
+        try:
+            lt = probe.result(get_prober().timeout).duration
+        except Exception:
+            lt = None
+        if lt is None:
+            return Failure("The video length could not be read, ask the user for the length.")
+
+    if video_name in session.video_and_image_clip_dict.keys():
+        if session.video_and_image_clip_dict[video_name].start == float(st) and session.video_and_image_clip_dict[video_name].length == float(lt):
             return "The video has already been added in the project, skip and continue to the next step."
     else:
         video_asset = VideoAsset(src=url)
         video_clip = Clip(asset=video_asset, start=float(st), length=float(lt))
-        video_and_image_clip_dict[video_name] = video_clip
+        session.video_and_image_clip_dict[video_name] = video_clip
+        session.touch("video_and_image", video_name)
         return None
 
 
-@tool("change_video_volume")
+@tool("change_video_volume", arity=2)
 def change_video_volume(query: str) -> str:
     """change the video's volume.
     Set the volume for the video between 0 and 1 where 0 is muted and 1 is full volume (defaults to 1).
     For example, to change the video with name 'dancing_disco' volume to 0.3, the query should be 'dancing_disco, 0.3'."""
 
+    session = current_session()
     video_name, vol = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].asset.volume = float(vol)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].asset.volume = float(vol)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("change_video_volume_effect")
+@tool("change_video_volume_effect", arity=2)
 def change_video_volume_effect(query: str) -> str:
     """change the video's volume effect.
     For example, to change the video with name 'minecraft' volume effect to 'fadeOut', the query should be 'minecraft, fadeOut'."""
 
+    session = current_session()
     video_name, effect = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].asset.volumeEffect = effect
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].asset.volumeEffect = effect
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("trim_video")
+@tool("trim_video", arity=2)
 def trim_video(query: str) -> str:
     """trim the video starting from 'query' seconds. Videos will start from the in trim point.
     The video will play until the file ends or the Clip length is reached. For example, to trim the video named 'skater' starting from 12 seconds,
     the query should be 'skater, 12.0'.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
     
+    from asset_probe import get_prober
+
+    session = current_session()
     video_name, st = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].asset.trim = float(st)
+    if video_name in session.video_and_image_clip_dict.keys():
+        info = get_prober().peek(session.video_and_image_clip_dict[video_name].asset.src)
+        if info is not None and info.duration is not None and float(st) >= info.duration:
+            return f"The video is only {info.duration:.1f}s long, the trim point must be before that, skip and continue to the next step."
+        session.video_and_image_clip_dict[video_name].asset.trim = float(st)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("crop_video")
+@tool("crop_video", arity=5)
 def crop_video(query: str) -> str:
     """crop the video. Crop the sides of video asset by a relative amount. The size of the crop is specified using a scale between 0 and 1, relative to the screen width.
        For example, to crop 0.15 of the right and half of the bottom for video 'assasin creed', the query should be 'assasin creed, 0, 0.5, 0, 0.15'.
        Always remember the format of query is 'video_name, top_crop_ratio, bottom_crop_ratio, left_crop_ratio, right_crop_ratio'."""
     
+    session = current_session()
     video_name, top, bottom, left, right = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
+    if video_name in session.video_and_image_clip_dict.keys():
         video_crop = Crop(top=float(top), bottom=float(bottom), left=float(left), right=float(right))
-        video_and_image_clip_dict[video_name].asset.crop = video_crop
+        session.video_and_image_clip_dict[video_name].asset.crop = video_crop
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("add_video_transition")
+@tool("add_video_transition", arity=3)
 def add_video_transition(query: str) -> str:
     """add a transition for video. For example to add a 'shuffleLeftBottom' transition in the end of the video named 'skater',
     the query should be 'skater, shuffleLeftBottom, out', and to add a 'zoom' transition in the start of the video named 'flower',
     the query should be 'flower, zoom, in'. There are only 'in' and 'out' transitions."""
 
+    session = current_session()
     video_name, trans, io = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
+    if video_name in session.video_and_image_clip_dict.keys():
         if io == 'in':
             video_transition = Transition(_in=trans)
-            video_and_image_clip_dict[video_name].transition = video_transition
+            session.video_and_image_clip_dict[video_name].transition = video_transition
             return None
         elif io == 'out':
             video_transition = Transition(out=trans)
-            video_and_image_clip_dict[video_name].transition = video_transition
+            session.video_and_image_clip_dict[video_name].transition = video_transition
             return None
         else:
-            return "The transition type not 'in' or 'out', skip and continue to the next step."
+            return Failure("The transition type not 'in' or 'out', skip and continue to the next step.")
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("change_video_time")
+@tool("change_video_time", arity=3)
 def change_video_time(query: str) -> str:
     """change the video's start time and length. For example, to change the video named 'sky' start time to 7 sec, with length 20 sec, 
     the query should be "sky, 7.0, 20.0".
@@ -670,122 +714,131 @@ def change_video_time(query: str) -> str:
     start at 1s and end at 5s should be transformed to '1.0, 4.0', because 4s = 5s - 1s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     video_name, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].start = float(st)
-        video_and_image_clip_dict[video_name].length = float(lt)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].start = float(st)
+        session.video_and_image_clip_dict[video_name].length = float(lt)
+        session.touch("video_and_image", video_name)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("scale_video")
+@tool("scale_video", arity=2)
 def scale_video(query: str) -> str:
     """Scale the video to a fraction of the viewport size, i.e. setting the scale to 0.5 will scale video to half the size of the viewport. 
     This is useful for picture-in-picture video. For example, to scale the video to 0.7 with name as 'blue planet',
     the query should be 'blue planet, 0.7'."""
 
+    session = current_session()
     video_name, scale = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].scale = float(scale)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].scale = float(scale)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("set_video_position")
+@tool("set_video_position", arity=2)
 def set_video_position(query: str) -> str:
     """Place the video in one of nine predefined positions of the viewport.
     For example, to set the video 'blue planet' position at 'bottomLeft',
     the query should be 'blue planet, bottomLeft'."""
 
+    session = current_session()
     video_name, pos = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].position = pos
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].position = pos
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("change_video_offset")
+@tool("change_video_offset", arity=3)
 def change_video_offset(query: str) -> str:
     """change the video's offset. Offset the location of the video relative to its position on the screen.
     For example, to change the video 'ark game' offset to x = 0.1 and y = -0.2, 
     the query should be 'ark game, 0.1, -0.2'.
     Always remember to set the offset to 'x_offset, y_offset'. Always remember to set the offset using float."""
 
+    session = current_session()
     video_name, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].offset.x = float(x)
-        video_and_image_clip_dict[video_name].offset.y = float(y)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].offset.x = float(x)
+        session.video_and_image_clip_dict[video_name].offset.y = float(y)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("change_video_effect")
+@tool("change_video_effect", arity=2)
 def change_video_effect(query: str) -> str:
     """change the video's effect. For example, to change the video 'kitty' effect to 'zoomOut', 
     the query should be 'kitty, zoomOut'."""
     
+    session = current_session()
     video_name, effect = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].effect = effect
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].effect = effect
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("add_video_filter")
+@tool("add_video_filter", arity=2)
 def add_video_filter(query: str) -> str:
     """add a filter to the video. For example, to add a 'greyscale' filter to the video 'space bebop',
     the query should be 'space bebop, greyscale'."""
     
+    session = current_session()
     video_name, filter = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].filter = filter
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].filter = filter
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("set_video_opacity")
+@tool("set_video_opacity", arity=2)
 def set_video_opacity(query: str) -> str:
     """Sets the opacity of the video where 1 is opaque and 0 is transparent. For example, to set the video 'space bebop' opacity to 0.35,
     the query should be 'space bebop, 0.35'. Always remember to set the opacity using float."""
     
+    session = current_session()
     video_name, opa = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].opacity = float(opa)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].opacity = float(opa)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("rotate_video")
+@tool("rotate_video", arity=2)
 def rotate_video(query: str) -> str:
     """rotate the video by the specified angle in degrees. The angle to rotate the video can be 0 to 360, or 0 to -360. 
     Using a positive number rotates the clip clockwise, negative numbers counter-clockwise.
     For example, to rotate the video 'bigbang theory' 60 degrees clockwise, 
     the query should be 'bigbang theory, 60'."""
     
+    session = current_session()
     video_name, deg = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].transform.rotate.angle = int(deg)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].transform.rotate.angle = int(deg)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("skew_video")
+@tool("skew_video", arity=3)
 def skew_video(query: str) -> str:
     """Skew a video so its edges are sheared at an angle. Use values between 0 and 3. 
     Over 3 the clip will be skewed almost flat.
@@ -793,17 +846,18 @@ def skew_video(query: str) -> str:
     the query should be 'bigbang theory, 0.5, 1.5'.
     If only one axis chonsen, then set the other axis number to 0 for no skewing."""
     
+    session = current_session()
     video_name, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].transform.skew.x = float(x)
-        video_and_image_clip_dict[video_name].transform.skew.y = float(y)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].transform.skew.x = float(x)
+        session.video_and_image_clip_dict[video_name].transform.skew.y = float(y)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("flip_video")
+@tool("flip_video", arity=3)
 def flip_video(query: str) -> str:
     """Flip a video vertically or horizontally.
     For example, to flip the video 'friends' horizontally, 
@@ -811,55 +865,64 @@ def flip_video(query: str) -> str:
     Always set the query format to 'video_name, is_vertically_flip, is_horizontally_flip'.
     If flip for both vertically and horizontally, 'True, True' is good."""
     
+    session = current_session()
     video_name, hor, ver = query[1:-1].replace(", ", ",").split(",")
 
-    if video_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[video_name].transform.flip.horizontal = bool(hor)
-        video_and_image_clip_dict[video_name].transform.flip.vertical = bool(ver)
+    if video_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[video_name].transform.flip.horizontal = bool(hor)
+        session.video_and_image_clip_dict[video_name].transform.flip.vertical = bool(ver)
         return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
 @tool("video_move_foward")
 def video_move_foward(query: str) -> str:
     """Move the video one layer forward in the Layer. The query should be video name."""
     
+    session = current_session()
     video_name = query[1:-1]
-    video_list = list(video_and_image_clip_dict.items())
+    video_list = list(session.video_and_image_clip_dict.keys())
 
-    if video_name in video_and_image_clip_dict.keys():
+    if video_name in session.video_and_image_clip_dict.keys():
         video_index = video_list.index(video_name)
 
         if video_index == 0:
             return "The video is already in the first layer, skip and continue to the next step."
         else:
             video_list[video_index], video_list[video_index-1] = video_list[video_index-1], video_list[video_index]
+            for name in video_list:
+                session.video_and_image_clip_dict.move_to_end(name)
+            session.touch("video_and_image")
             return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
 @tool("video_move_backward")
 def video_move_backward(query: str) -> str:
     """Move the video one layer backward in the Layer. The query should be video name."""
     
+    session = current_session()
     video_name = query[1:-1]
-    video_list = list(video_and_image_clip_dict.items())
+    video_list = list(session.video_and_image_clip_dict.keys())
 
-    if video_name in video_and_image_clip_dict.keys():
+    if video_name in session.video_and_image_clip_dict.keys():
         video_index = video_list.index(video_name)
 
         if video_index == len(video_list)-1:
             return "The video is already in the first layer, skip and continue to the next step."
         else:
             video_list[video_index], video_list[video_index+1] = video_list[video_index+1], video_list[video_index]
+            for name in video_list:
+                session.video_and_image_clip_dict.move_to_end(name)
+            session.touch("video_and_image")
             return None
     else:
-        return "The video not exist, skip and continue to the next step."
+        return Failure("The video not exist, skip and continue to the next step.")
 
 
-@tool("add_image")
+@tool("add_image", arity=4)
 def add_image(query: str) -> str:
     """add a image. For example, to add an image from url 'https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/examples/images/pexels/pexels-photo-712850.jpeg', 
     starting from 45.7s and lasting for 66.3s, and the user gives it a name 'green_sea', the query should be 'https://s3-ap-southeast-2.amazonaws.com/shotstack-assets/examples/images/pexels/pexels-photo-712850.jpeg, green_sea, 45.7, 66.3'. 
@@ -868,59 +931,66 @@ def add_image(query: str) -> str:
     Always remember to set the time using float, for example 8 seconds should be 8.0.
     Use add_image only if image url and image name is given."""
 
+    from asset_probe import get_prober
+
+    session = current_session()
     url, image_name, st, lt = query[1:-1].replace(", ", ",").split(",")
+    get_prober().probe_async(url)
 
-    if image_name in video_and_image_clip_dict.keys():
-        if video_and_image_clip_dict[image_name].start == float(st) and video_and_image_clip_dict[image_name].length == float(lt):
+    if image_name in session.video_and_image_clip_dict.keys():
+        if session.video_and_image_clip_dict[image_name].start == float(st) and session.video_and_image_clip_dict[image_name].length == float(lt):
             return "The image has already been added in the project, skip and continue to the next step."
     else:
         image_asset = ImageAsset(src=url)
         image_clip = Clip(asset=image_asset, start=float(st), length=float(lt))
-        video_and_image_clip_dict[image_name] = image_clip
+        session.video_and_image_clip_dict[image_name] = image_clip
+        session.touch("video_and_image", image_name)
         return None
 
 
-@tool("crop_image")
+@tool("crop_image", arity=5)
 def crop_image(query: str) -> str:
     """crop the image. Crop the sides of an image asset by a relative amount. The size of the crop is specified using a scale between 0 and 1, relative to the screen width.
        For example, to crop 0.15 of the right and half of the bottom for image 'pen case', the query should be 'pen case, 0, 0.5, 0, 0.15'.
        Always remember the format of query is 'image_name, top_crop_ratio, bottom_crop_ratio, left_crop_ratio, right_crop_ratio'."""
     
+    session = current_session()
     image_name, top, bottom, left, right = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
+    if image_name in session.video_and_image_clip_dict.keys():
         image_crop = Crop(top=float(top), bottom=float(bottom), left=float(left), right=float(right))
-        video_and_image_clip_dict[image_name].asset.crop = image_crop
+        session.video_and_image_clip_dict[image_name].asset.crop = image_crop
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("add_image_transition")
+@tool("add_image_transition", arity=3)
 def add_image_transition(query: str) -> str:
     """add a transition for image. For example to add a 'shuffleLeftBottom' transition in the end of the image named 'tea',
     the query should be 'tea, shuffleLeftBottom, out', and to add a 'zoom' transition in the start of the image named 'flower',
     the query should be 'flower, zoom, in'. There are only 'in' and 'out' transitions."""
     
+    session = current_session()
     image_name, trans, io = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
+    if image_name in session.video_and_image_clip_dict.keys():
         if io == 'in':
             image_transition = Transition(_in=trans)
-            video_and_image_clip_dict[image_name].transition = image_transition
+            session.video_and_image_clip_dict[image_name].transition = image_transition
             return None
         elif io == 'out':
             image_transition = Transition(out=trans)
-            video_and_image_clip_dict[image_name].transition = image_transition
+            session.video_and_image_clip_dict[image_name].transition = image_transition
             return None
         else:
-            return "The transition type not 'in' or 'out', skip and continue to the next step."
+            return Failure("The transition type not 'in' or 'out', skip and continue to the next step.")
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
 
-@tool("change_image_time")
+@tool("change_image_time", arity=3)
 def change_image_time(query: str) -> str:
     """change the image's start time and length. For example, to change the image named 'aa' start time to 7 sec, with length 20 sec, 
     the query should be "aa, 7.0, 20.0".
@@ -928,122 +998,131 @@ def change_image_time(query: str) -> str:
     start at 1s and end at 5s should be transformed to '1.0, 4.0', because 4s = 5s - 1s.
     Always remember to set the time using float, for example 8 seconds should be 8.0."""
 
+    session = current_session()
     image_name, st, lt = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].start = float(st)
-        video_and_image_clip_dict[image_name].length = float(lt)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].start = float(st)
+        session.video_and_image_clip_dict[image_name].length = float(lt)
+        session.touch("video_and_image", image_name)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("scale_image")
+@tool("scale_image", arity=2)
 def scale_image(query: str) -> str:
     """Scale the image to a fraction of the viewport size, i.e. setting the scale to 0.5 will scale image to half the size of the viewport. 
     This is useful for scaling images such as logos and watermarks. For example, to scale the image to 0.7 with name as 'blue planet',
     the query should be 'blue planet, 0.7'."""
 
+    session = current_session()
     image_name, scale = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].scale = float(scale)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].scale = float(scale)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("set_image_position")
+@tool("set_image_position", arity=2)
 def set_image_position(query: str) -> str:
     """Place the image in one of nine predefined positions of the viewport.
     For example, to set the image 'blue planet' position at 'bottomLeft',
     the query should be 'blue planet, bottomLeft'."""
 
+    session = current_session()
     image_name, pos = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].position = pos
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].position = pos
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("change_image_offset")
+@tool("change_image_offset", arity=3)
 def change_image_offset(query: str) -> str:
     """change the image's offset. Offset the location of the image relative to its position on the screen.
     For example, to change the image 'capture' offset to x = 0.1 and y = -0.2, 
     the query should be 'capture, 0.1, -0.2'.
     Always remember to set the offset to 'x_offset, y_offset'. Always remember to set the offset using float."""
 
+    session = current_session()
     image_name, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].offset.x = float(x)
-        video_and_image_clip_dict[image_name].offset.y = float(y)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].offset.x = float(x)
+        session.video_and_image_clip_dict[image_name].offset.y = float(y)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("change_image_effect")
+@tool("change_image_effect", arity=2)
 def change_image_effect(query: str) -> str:
     """change the image's effect. For example, to change the image 'pepper' effect to 'zoomOut', 
     the query should be 'pepper, zoomOut'."""
     
+    session = current_session()
     image_name, effect = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].effect = effect
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].effect = effect
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("add_image_filter")
+@tool("add_image_filter", arity=2)
 def add_image_filter(query: str) -> str:
     """add a filter to the image. For example, to add a 'greyscale' filter to the image 'phonechat',
     the query should be 'phonechat, greyscale'."""
     
+    session = current_session()
     image_name, filter = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].filter = filter
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].filter = filter
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("set_image_opacity")
+@tool("set_image_opacity", arity=2)
 def set_image_opacity(query: str) -> str:
     """Sets the opacity of the image where 1 is opaque and 0 is transparent. For example, to set the image 'space bebop' opacity to 0.35,
     the query should be 'space bebop, 0.35'. Always remember to set the opacity using float."""
     
+    session = current_session()
     image_name, opa = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].opacity = float(opa)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].opacity = float(opa)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("rotate_image")
+@tool("rotate_image", arity=2)
 def rotate_image(query: str) -> str:
     """rotate the image by the specified angle in degrees. The angle to rotate the image can be 0 to 360, or 0 to -360. 
     Using a positive number rotates the clip clockwise, negative numbers counter-clockwise.
     For example, to rotate the image 'birds' 60 degrees clockwise, 
     the query should be 'birds, 60'."""
     
+    session = current_session()
     image_name, deg = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].transform.rotate.angle = int(deg)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].transform.rotate.angle = int(deg)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("skew_image")
+@tool("skew_image", arity=3)
 def skew_image(query: str) -> str:
     """Skew a image so its edges are sheared at an angle. Use values between 0 and 3. 
     Over 3 the clip will be skewed almost flat.
@@ -1051,17 +1130,18 @@ def skew_image(query: str) -> str:
     the query should be 'bigbang theory, 0.5, 1.5'.
     If only one axis chonsen, then set the other axis number to 0 for no skewing."""
     
+    session = current_session()
     image_name, x, y = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].transform.skew.x = float(x)
-        video_and_image_clip_dict[image_name].transform.skew.y = float(y)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].transform.skew.x = float(x)
+        session.video_and_image_clip_dict[image_name].transform.skew.y = float(y)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("flip_image")
+@tool("flip_image", arity=3)
 def flip_image(query: str) -> str:
     """Flip a image vertically or horizontally.
     For example, to flip the image 'banana' horizontally, 
@@ -1069,143 +1149,208 @@ def flip_image(query: str) -> str:
     Always set the query format to 'image_name, is_vertically_flip, is_horizontally_flip'.
     If flip for both vertically and horizontally, 'True, True' is good."""
     
+    session = current_session()
     image_name, hor, ver = query[1:-1].replace(", ", ",").split(",")
 
-    if image_name in video_and_image_clip_dict.keys():
-        video_and_image_clip_dict[image_name].transform.flip.horizontal = bool(hor)
-        video_and_image_clip_dict[image_name].transform.flip.vertical = bool(ver)
+    if image_name in session.video_and_image_clip_dict.keys():
+        session.video_and_image_clip_dict[image_name].transform.flip.horizontal = bool(hor)
+        session.video_and_image_clip_dict[image_name].transform.flip.vertical = bool(ver)
         return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
 @tool("image_move_foward")
 def image_move_foward(query: str) -> str:
     """Move the image one layer forward in the Layer. The query should be image name."""
     
+    session = current_session()
     image_name = query[1:-1]
-    image_list = list(video_and_image_clip_dict.items())
+    image_list = list(session.video_and_image_clip_dict.keys())
 
-    if image_name in video_and_image_clip_dict.keys():
+    if image_name in session.video_and_image_clip_dict.keys():
         image_index = image_list.index(image_name)
 
         if image_index == 0:
             return "The image is already in the first layer, skip and continue to the next step."
         else:
             image_list[image_index], image_list[image_index-1] = image_list[image_index-1], image_list[image_index]
+            for name in image_list:
+                session.video_and_image_clip_dict.move_to_end(name)
+            session.touch("video_and_image")
             return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
 @tool("image_move_backward")
 def image_move_backward(query: str) -> str:
     """Move the image one layer backward in the Layer. The query should be image name."""
     
+    session = current_session()
     image_name = query[1:-1]
-    image_list = list(video_and_image_clip_dict.items())
+    image_list = list(session.video_and_image_clip_dict.keys())
 
-    if image_name in video_and_image_clip_dict.keys():
+    if image_name in session.video_and_image_clip_dict.keys():
         image_index = image_list.index(image_name)
 
         if image_index == len(image_list)-1:
             return "The image is already in the last layer, skip and continue to the next step."
         else:
             image_list[image_index], image_list[image_index+1] = image_list[image_index+1], image_list[image_index]
+            for name in image_list:
+                session.video_and_image_clip_dict.move_to_end(name)
+            session.touch("video_and_image")
             return None
     else:
-        return "The image not exist, skip and continue to the next step."
+        return Failure("The image not exist, skip and continue to the next step.")
 
 
-@tool("render_video")
+@tool("render_video", mutates=False, arity=None)
 def render_video(query: str) -> str:
     """rendering the video. query is not important."""
 
-    host = "https://api.shotstack.io/stage"
+    from render_manager import get_render_manager, RenderError
+    from downloader import download, DownloadError
+    from render_cache import get_render_cache, edit_digest
+    from asset_probe import get_prober
+    from validate import validate_edit
+    from preview import get_preview_pipeline
+    from segments import get_segment_renderer
+
+    session = current_session()
+    with tracing.span("render", phase="compile"):
+        session.compile_tracks()
+        edit = Edit(timeline=session.timeline, output=session.output)
+
+    # catch what Shotstack would reject or render wrong before paying for the round trip
+    with tracing.span("render", phase="validate"):
+        issues = validate_edit(session.timeline, session.output, get_prober())
+    if issues:
+        print("Edit is invalid:\n" + "\n".join(f"  {issue}" for issue in issues))
+        return Failure("The video cannot be rendered: " + "; ".join(map(str, issues[:5])) + ". Fix these and render again.")
+
+    # an unchanged edit is not rendered again
+    cache = get_render_cache()
+    digest = edit_digest(edit) if cache is not None else None
+    entry = cache.get(digest) if cache is not None else None
+    if entry is not None:
+        print(f"Asset URL: {entry['url']} (edit unchanged, reusing render {digest[:12]})")
+        if cache.restore(entry, session.render_path):
+            return "video rendered successfully."
+        try:
+            download(entry['url'], session.render_path)
+            return "video rendered successfully."
+        except DownloadError as e:
+            print(f"{e}, rendering again")
+
+    # the user sees a preview as soon as possible while the requested output renders behind it
+    pipeline = get_preview_pipeline()
+    if pipeline is not None:
+        try:
+            response = pipeline.start(session, edit, digest)
+        except RenderError as e:
+            print(f"{e}")
+            return "video render failed."
+        except Exception as e:
+            print(f"Unable to resolve API call: {e}")
+            return "video render failed."
+        print(f"Preview URL: {response['url']}")
+        return f"video preview rendered at {response['url']}, the final video is rendering in the background."
+
+    try:
+        response = (get_segment_renderer() or get_render_manager()).render(edit)
+    except RenderError as e:
+        print(f"{e}")
+        return "video render failed."
+    except Exception as e:
+        print(f"Unable to resolve API call: {e}")
+        return "video render failed."
+
+    url = response['url']
+    print(f"Asset URL: {url}")
+
+    try:
+        with tracing.span("render", phase="download"):
+            download(url, session.render_path)
+    except DownloadError as e:
+        print(f"{e}")
+        return "video rendered, but downloading it failed."
+
+    if cache is not None:
+        cache.put(digest, url, session.render_path)
 
-    if os.getenv("SHOTSTACK_HOST") is not None:
-        host = os.getenv("SHOTSTACK_HOST")
-    if os.getenv("SHOTSTACK_KEY") is None:
-        sys.exit("API Key is required. Set using: export SHOTSTACK_KEY=your_key_here") 
+    return "video rendered successfully."
 
-    configuration = shotstack.Configuration(host=host)
-    configuration.api_key['DeveloperKey'] = os.getenv("SHOTSTACK_KEY")
 
-    with shotstack.ApiClient(configuration) as api_client:
-        api_instance = edit_api.EditApi(api_client)
-        
-        for text_clip in text_clip_dict.values():
-            text_track = Track(clips=[text_clip])
-            tracks.append(text_track)
-        for subtitle_clip in subtitle_clip_dict.values():
-            subtitle_track = Track(clips=[subtitle_clip])
-            tracks.append(subtitle_track)
-        for video_and_image_clip in video_and_image_clip_dict.values():
-            video_and_image_track = Track(clips=[video_and_image_clip])
-            tracks.append(video_and_image_track)
+TEXT_TOOLS = [add_text, change_text_color, change_text_background_color, change_text_style, change_text, change_text_size, change_text_effect, change_text_opacity, rotate_text, skew_text, flip_text, change_text_position, change_text_time, change_text_offset, add_text_transition]
+SUBTITLE_TOOLS = [add_subtitle, change_subtitle, change_subtitle_time, change_subtitle_color, change_subtitle_style, change_subtitle_position, change_subtitle_size, change_subtitle_background_color, change_subtitle_offset]
+VIDEO_TOOLS = [add_video, change_video_volume, change_video_volume_effect, trim_video, add_video_transition, crop_video, change_video_time, scale_video, set_video_position, change_video_offset, change_video_effect, add_video_filter, set_video_opacity, rotate_video, skew_video, flip_video, video_move_foward, video_move_backward]
+IMAGE_TOOLS = [add_image, crop_image, add_image_transition, change_image_time, scale_image, set_image_position, change_image_offset, change_image_effect, add_image_filter, set_image_opacity, rotate_image, skew_image, flip_image, image_move_foward, image_move_backward]
+TIMELINE_CONFIG_TOOLS = [change_timeline_background_color, add_timeline_soundtrack, change_timeline_soundtrack_effect, change_timeline_soundtrack_volume, choose_poster_from_timeline, choose_thumbnail_from_timeline]
+OUTPUT_CONFIG_TOOLS = [change_output_format, change_output_resolution, change_output_aspectRatio, change_output_fps, change_output_quality, set_output_repeat, set_output_mute]
 
-        timeline.tracks = tracks
-        edit = Edit(timeline=timeline, output=output)
+ALL_TOOLS = TEXT_TOOLS + SUBTITLE_TOOLS + VIDEO_TOOLS + IMAGE_TOOLS + TIMELINE_CONFIG_TOOLS + OUTPUT_CONFIG_TOOLS + [render_video]
 
-        try:
-            api_response = api_instance.post_render(edit)
-            message = api_response['response']['message']
-            id = api_response['response']['id']
-
-        
-            print('\n' + f"{message}" + '\n')
-
-            if id is None:
-                sys.exit("Please provide the UUID of the render task.")  
-            try:
-                while True:
-                    api_response = api_instance.get_render(id, data=False, merged=True)
-                    status = api_response['response']['status']
-                    print('Status: ' + status.upper() + '\n')
-
-                    if status == "done":
-                        url = api_response['response']['url']
-                        print(f"Asset URL: {url}")
-
-                        r = requests.get(url)
-                        with open('./render/video.mp4', 'wb') as f:
-                            f.write(r.content)
-                            
-                        # with open('./render/tracks.pkl', 'wb') as f:
-                        #     pickle.dump(tracks, f)
-                        # with open('./render/clips.pkl', 'wb') as f:
-                        #     pickle.dump((video_and_image_clip_dict, subtitle_clip_dict, text_clip_dict), f)
-
-                        break
-
-                    elif status == 'failed':
-                        break
-                    else:
-                        time.sleep(10)
-
-            except Exception as e:
-                print(f"Unable to resolve API call: {e}") 
 
-        except Exception as e:
-            print(f"Unable to resolve API call: {e}")
+SUBAGENT_TOOLS = {
+    "text_agent": TEXT_TOOLS,
+    "subtitle_agent": SUBTITLE_TOOLS,
+    "video_agent": VIDEO_TOOLS,
+    "image_agent": IMAGE_TOOLS,
+    "timeline_config_agent": TIMELINE_CONFIG_TOOLS,
+    "output_config_agent": OUTPUT_CONFIG_TOOLS,
+}
 
-    return "video rendered successfully."
+_subagents = {}
+_subagent_llms = {}
+_subagents_lock = threading.Lock()
+_llm_factory = None
 
 
-llm1 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-text_agent = initialize_agent([add_text, change_text_color, change_text_background_color, change_text_style, change_text, change_text_size, change_text_effect, change_text_opacity, rotate_text, skew_text, flip_text, change_text_position, change_text_time, change_text_offset, add_text_transition], llm1, agent="zero-shot-react-description", verbose=True)
+def set_llm_factory(factory):
+    """build subagent LLMs with factory(subagent name) instead of PromptLayerOpenAI, e.g. bench.py's scripted LLM.
 
-llm2 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-subtitle_agent = initialize_agent([add_subtitle, change_subtitle, change_subtitle_time, change_subtitle_color, change_subtitle_style, change_subtitle_position, change_subtitle_size, change_subtitle_background_color, change_subtitle_offset], llm2, agent="zero-shot-react-description", verbose=True)
+    Subagents built so far are dropped; None restores the default.
+    """
+
+    global _llm_factory
+    with _subagents_lock:
+        _llm_factory = factory
+        _subagents.clear()
+        _subagent_llms.clear()
 
-llm3 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-video_agent = initialize_agent([add_video, change_video_volume, change_video_volume_effect, trim_video, add_video_transition, crop_video, change_video_time, scale_video, set_video_position, change_video_offset, change_video_effect, add_video_filter, set_video_opacity, rotate_video, skew_video, flip_video, video_move_foward, video_move_backward], llm3, agent="zero-shot-react-description", verbose=True)
 
-llm4 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-image_agent = initialize_agent([add_image, crop_image, add_image_transition, change_image_time, scale_image, set_image_position, change_image_offset, change_image_effect, add_image_filter, set_image_opacity, rotate_image, skew_image, flip_image, image_move_foward, image_move_backward], llm4, agent="zero-shot-react-description", verbose=True)
+def get_subagent(name, tools=None):
+    """the ReAct subagent over one tool group, built with its own LLM client on first use.
 
-llm5 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-timeline_config_agent = initialize_agent([change_timeline_background_color, add_timeline_soundtrack, change_timeline_soundtrack_effect, change_timeline_soundtrack_volume, choose_poster_from_timeline, choose_thumbnail_from_timeline], llm5, agent="zero-shot-react-description", verbose=True)
+    Passing a subset of the group's tools gives a subagent that only sees those;
+    it reuses the group's LLM client and is cached per subset.
+    """
 
-llm6 = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
-output_config_agent = initialize_agent([change_output_format, change_output_resolution, change_output_aspectRatio, change_output_fps, change_output_quality, set_output_repeat, set_output_mute], llm6, agent="zero-shot-react-description", verbose=True)
+    tool_names = tuple(t.name for t in tools) if tools is not None else None
+    if tool_names is not None and len(tool_names) == len(SUBAGENT_TOOLS[name]):
+        tool_names = None
+
+    with _subagents_lock:
+        if (name, tool_names) not in _subagents:
+            from langchain.agents import initialize_agent
+            from langchain.llms import PromptLayerOpenAI
+
+            if name not in _subagent_llms:
+                if _llm_factory is not None:
+                    _subagent_llms[name] = _llm_factory(name)
+                else:
+                    _subagent_llms[name] = PromptLayerOpenAI(temperature=0, pl_tags=["shotstack_subagent"])
+            if len(_subagents) > 256:
+                _subagents.clear()
+            tools = [t.as_langchain() for t in (tools if tool_names is not None else SUBAGENT_TOOLS[name])]
+            _subagents[(name, tool_names)] = initialize_agent(tools, _subagent_llms[name], agent="zero-shot-react-description", verbose=True)
+        return _subagents[(name, tool_names)]
+
+
+def __getattr__(name):
+    # keeps `from tools import text_agent` working, building only the subagent asked for
+    if name in SUBAGENT_TOOLS:
+        return get_subagent(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,298 @@
+import bisect
+import contextvars
+import itertools
+import json
+import threading
+import time
+import warnings
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+# span attributes that become metric labels; everything else only goes to the trace
+LABELS = ("tool", "agent", "phase")
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_tracer = None
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "start", "end", "thread")
+
+    def __init__(self, span_id, parent, name, attrs, start):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = start
+        self.end = None
+        self.thread = threading.get_ident()
+
+    def find(self, name):
+        """this span or its nearest ancestor called name, or None."""
+
+        span = self
+        while span is not None and span.name != name:
+            span = span.parent
+        return span
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+
+class Tracer:
+    """spans over the request, the agents, each tool call and each render phase, plus the metrics they feed.
+
+    Every finished span is kept (the last max_spans of them) for the JSON
+    trace, which loads in chrome://tracing or Perfetto, and is observed into
+    the shotstack_span_seconds histogram labelled by its name and its
+    tool/agent/phase attribute. Counters hold LLM calls and tokens and render
+    polls. metrics_text() renders both in the Prometheus text format.
+    """
+
+    def __init__(self, max_spans=100000):
+        self.spans = deque(maxlen=max_spans)
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+        self.epoch = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start_span(self, name, parent=None, **attrs):
+        return Span(next(self._ids), parent if parent is not None else _current.get(), name, attrs, time.perf_counter())
+
+    def end_span(self, span, end=None):
+        span.end = end if end is not None else time.perf_counter()
+        labels = (("span", span.name),) + tuple((k, span.attrs[k]) for k in LABELS if k in span.attrs)
+        with self._lock:
+            self.spans.append(span)
+            self.histograms[("shotstack_span_seconds", labels)].observe(span.end - span.start)
+
+    def record(self, name, start, end, parent=None, **attrs):
+        """add a span that was measured elsewhere, e.g. a render phase seen by the poller."""
+
+        span = self.start_span(name, parent, **attrs)
+        span.start = start
+        self.end_span(span, end)
+        return span
+
+    def count(self, metric, value=1, **labels):
+        with self._lock:
+            self.counters[(metric, tuple(sorted(labels.items())))] += value
+
+    def trace_events(self):
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for span in spans:
+            args = dict(span.attrs, id=span.id, parent=span.parent.id if span.parent is not None else None)
+            events.append({"name": span.attrs.get("tool") or span.attrs.get("agent") or span.attrs.get("phase") or span.name,
+                           "cat": span.name, "ph": "X", "pid": 1, "tid": span.thread,
+                           "ts": round((span.start - self.epoch) * 1e6), "dur": round((span.end - span.start) * 1e6),
+                           "args": {k: str(v) for k, v in args.items()}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.trace_events(), f)
+
+    def metrics_text(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        typed = set()
+        for (metric, labels), histogram in histograms:
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for le, n in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+
+        for (metric, labels), value in counters:
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """serve /metrics (Prometheus text) and /trace (the JSON trace) from a daemon thread."""
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body, kind = tracer.metrics_text().encode(), "text/plain; version=0.0.4"
+                elif self.path.startswith("/trace"):
+                    body, kind = json.dumps(tracer.trace_events()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+def install(**kwargs):
+    """start tracing this process. Until then span() and friends cost one global lookup."""
+
+    global _tracer
+    _tracer = Tracer(**kwargs)
+    _install_llm_handler()
+    return _tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def current_span():
+    return _current.get()
+
+
+def attach(span):
+    """make span the parent of spans opened in this context, e.g. in a task on another thread's loop."""
+
+    _current.set(span)
+
+
+@contextmanager
+def span(name, **attrs):
+    if _tracer is None:
+        yield None
+        return
+    s = _tracer.start_span(name, **attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _tracer.end_span(s)
+
+
+def record(name, start, end, parent=None, **attrs):
+    if _tracer is not None:
+        _tracer.record(name, start, end, parent, **attrs)
+
+
+def count(metric, value=1, **labels):
+    if _tracer is not None:
+        _tracer.count(metric, value, **labels)
+
+
+def _install_llm_handler():
+    # LLM calls are seen through langchain's callback manager, so every agent's LLM is covered
+    from tokens import count_tokens
+
+    try:
+        from langchain.callbacks import get_callback_manager
+        from langchain.callbacks.base import BaseCallbackHandler
+    except ImportError as e:
+        warnings.warn(f"tracing: LLM call and token metrics are off, langchain's callback manager is unavailable ({e}); "
+                      "see requirements.txt for the supported langchain", RuntimeWarning, stacklevel=3)
+        return
+
+    class LLMTokenHandler(BaseCallbackHandler):
+        """count LLM calls and tokens per agent and time each call as an 'llm' span."""
+
+        _span = contextvars.ContextVar("llm_span", default=None)
+
+        @property
+        def always_verbose(self):
+            return True
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            s = _tracer.start_span("llm")
+            agent = s.find("agent")
+            s.attrs["agent"] = agent.attrs.get("agent") if agent is not None else "unknown"
+            _tracer.count("shotstack_llm_calls_total", agent=s.attrs["agent"])
+            _tracer.count("shotstack_llm_tokens_total", sum(count_tokens(p) for p in prompts),
+                          agent=s.attrs["agent"], kind="prompt")
+            self._span.set(s)
+
+        def on_llm_end(self, response, **kwargs):
+            s = self._span.get()
+            if s is None:
+                return
+            completion = sum(count_tokens(g.text) for gens in response.generations for g in gens)
+            _tracer.count("shotstack_llm_tokens_total", completion, agent=s.attrs["agent"], kind="completion")
+            _tracer.end_span(s)
+            self._span.set(None)
+
+        def on_llm_error(self, error, **kwargs):
+            s = self._span.get()
+            if s is not None:
+                s.attrs["error"] = type(error).__name__
+                _tracer.end_span(s)
+                self._span.set(None)
+
+        def on_llm_new_token(self, token, **kwargs):
+            pass
+
+        def on_chain_start(self, serialized, inputs, **kwargs):
+            pass
+
+        def on_chain_end(self, outputs, **kwargs):
+            pass
+
+        def on_chain_error(self, error, **kwargs):
+            pass
+
+        def on_tool_start(self, serialized, input_str, **kwargs):
+            pass
+
+        def on_tool_end(self, output, **kwargs):
+            pass
+
+        def on_tool_error(self, error, **kwargs):
+            pass
+
+        def on_text(self, text, **kwargs):
+            pass
+
+        def on_agent_action(self, action, **kwargs):
+            pass
+
+        def on_agent_finish(self, finish, **kwargs):
+            pass
+
+    get_callback_manager().add_handler(LLMTokenHandler())
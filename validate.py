@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+
+RESOLUTIONS = {"preview", "mobile", "sd", "hd", "1080"}
+FORMATS = {"mp4", "gif", "jpg", "png", "bmp", "mp3"}
+QUALITIES = {"low", "medium", "high"}
+ASPECT_RATIOS = {"16:9", "9:16", "1:1", "4:5", "4:3"}
+FPS = {12, 15, 23.976, 24, 25, 29.97, 30}
+
+_SPEEDS = ("", "Slow", "Fast")
+TRANSITIONS = {name + speed for speed in _SPEEDS for name in (
+    "fade", "reveal", "wipeLeft", "wipeRight", "slideLeft", "slideRight", "slideUp", "slideDown",
+    "carouselLeft", "carouselRight", "carouselUp", "carouselDown", "shuffleTopRight", "shuffleRightTop",
+    "shuffleRightBottom", "shuffleBottomRight", "shuffleBottomLeft", "shuffleLeftBottom", "shuffleLeftTop",
+    "shuffleTopLeft", "zoom")}
+EFFECTS = {name + speed for speed in _SPEEDS for name in (
+    "zoomIn", "zoomOut", "slideLeft", "slideRight", "slideUp", "slideDown")}
+FILTERS = {"blur", "boost", "contrast", "darken", "greyscale", "lighten", "muted", "negative"}
+SOUNDTRACK_EFFECTS = {"fadeIn", "fadeOut", "fadeInFadeOut"}
+
+
+class Issue(namedtuple("Issue", ["path", "code", "message"])):
+    """one problem with an edit: where it is (e.g. 'tracks[1].clips[0].opacity'), a short code and what is wrong."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.path}: {self.message}"
+
+
+def _get(model, attr):
+    return getattr(model, attr, None) if model is not None else None
+
+
+class _Checker:
+    def __init__(self):
+        self.issues = []
+
+    def add(self, path, code, message):
+        self.issues.append(Issue(path, code, message))
+
+    def range(self, path, value, low, high):
+        if value is not None and not low <= value <= high:
+            self.add(path, "out_of_range", f"{value} is outside {low} to {high}")
+
+    def choice(self, path, value, allowed):
+        if value is not None and value not in allowed:
+            self.add(path, "unknown_value", f"{value!r} is not one of the allowed values")
+
+    def url(self, path, value):
+        if not value:
+            self.add(path, "missing", "no source URL")
+        elif not str(value).startswith(("http://", "https://")):
+            self.add(path, "bad_url", f"{value!r} is not an http(s) URL")
+
+
+def _check_clip(check, path, clip, source_duration):
+    start, length = _get(clip, "start"), _get(clip, "length")
+    if start is None or start < 0:
+        check.add(f"{path}.start", "out_of_range", f"start {start} must be 0 or later")
+    if length is None or length <= 0:
+        check.add(f"{path}.length", "out_of_range", f"length {length} must be positive")
+
+    check.range(f"{path}.opacity", _get(clip, "opacity"), 0, 1)
+    scale = _get(clip, "scale")
+    if scale is not None and scale <= 0:
+        check.add(f"{path}.scale", "out_of_range", f"scale {scale} must be positive")
+
+    offset = _get(clip, "offset")
+    check.range(f"{path}.offset.x", _get(offset, "x"), -10, 10)
+    check.range(f"{path}.offset.y", _get(offset, "y"), -10, 10)
+
+    transform = _get(clip, "transform")
+    check.range(f"{path}.transform.rotate.angle", _get(_get(transform, "rotate"), "angle"), -360, 360)
+    skew = _get(transform, "skew")
+    check.range(f"{path}.transform.skew.x", _get(skew, "x"), -3, 3)
+    check.range(f"{path}.transform.skew.y", _get(skew, "y"), -3, 3)
+
+    transition = _get(clip, "transition")
+    check.choice(f"{path}.transition.in", _get(transition, "_in"), TRANSITIONS)
+    check.choice(f"{path}.transition.out", _get(transition, "out"), TRANSITIONS)
+    check.choice(f"{path}.effect", _get(clip, "effect"), EFFECTS)
+    check.choice(f"{path}.filter", _get(clip, "filter"), FILTERS)
+
+    asset = _get(clip, "asset")
+    if asset is None:
+        check.add(f"{path}.asset", "missing", "clip has no asset")
+        return
+    kind = type(asset).__name__
+    if kind in ("VideoAsset", "ImageAsset", "AudioAsset"):
+        check.url(f"{path}.asset.src", _get(asset, "src"))
+    elif kind in ("TitleAsset", "HtmlAsset") and not (_get(asset, "text") or _get(asset, "html")):
+        check.add(f"{path}.asset", "missing", "title has no text")
+
+    check.range(f"{path}.asset.volume", _get(asset, "volume"), 0, 1)
+    trim = _get(asset, "trim")
+    if trim is not None:
+        if trim < 0:
+            check.add(f"{path}.asset.trim", "out_of_range", f"trim {trim} must be 0 or later")
+        elif source_duration is not None and trim >= source_duration:
+            check.add(f"{path}.asset.trim", "past_end", f"trim {trim} is past the end of the {source_duration:.1f}s source")
+
+    crop = _get(asset, "crop")
+    if crop is not None:
+        sides = {side: _get(crop, side) for side in ("top", "bottom", "left", "right")}
+        for side, value in sides.items():
+            check.range(f"{path}.asset.crop.{side}", value, 0, 1)
+        if (sides["top"] or 0) + (sides["bottom"] or 0) >= 1 or (sides["left"] or 0) + (sides["right"] or 0) >= 1:
+            check.add(f"{path}.asset.crop", "out_of_range", "the crop leaves nothing of the frame")
+
+
+def validate_edit(timeline, output, prober=None):
+    """every problem that would make Shotstack reject or botch this edit, in one pass over its clips.
+
+    Checks value ranges (opacity, skew, rotation, offsets, crop, volume,
+    trim), names of transitions, effects and filters, that sources are URLs,
+    the soundtrack, and poster and thumbnail times against the timeline's
+    end. When a prober (asset_probe.AssetProber) is given, trims are checked
+    against source durations it already knows; it never waits on the network.
+    Returns a list of Issue, empty when the edit looks renderable.
+    """
+
+    check = _Checker()
+    end = 0.0
+    clips = 0
+
+    for t, track in enumerate(_get(timeline, "tracks") or []):
+        for c, clip in enumerate(_get(track, "clips") or []):
+            clips += 1
+            src = _get(_get(clip, "asset"), "src")
+            info = prober.peek(src) if prober is not None and src else None
+            _check_clip(check, f"tracks[{t}].clips[{c}]", clip, info.duration if info is not None else None)
+            start, length = _get(clip, "start"), _get(clip, "length")
+            if start is not None and length is not None:
+                end = max(end, start + length)
+    if not clips:
+        check.add("tracks", "empty", "the timeline has no clips")
+
+    soundtrack = _get(timeline, "soundtrack")
+    if soundtrack is not None:
+        check.url("soundtrack.src", _get(soundtrack, "src"))
+        check.range("soundtrack.volume", _get(soundtrack, "volume"), 0, 1)
+        check.choice("soundtrack.effect", _get(soundtrack, "effect"), SOUNDTRACK_EFFECTS)
+
+    check.choice("output.format", _get(output, "format"), FORMATS)
+    check.choice("output.resolution", _get(output, "resolution"), RESOLUTIONS)
+    check.choice("output.quality", _get(output, "quality"), QUALITIES)
+    check.choice("output.aspectRatio", _get(output, "aspectRatio"), ASPECT_RATIOS)
+    check.choice("output.fps", _get(output, "fps"), FPS)
+    for image in ("poster", "thumbnail"):
+        capture = _get(_get(output, image), "capture")
+        if capture is not None and clips and not 0 <= capture < end:
+            check.add(f"output.{image}.capture", "past_end", f"{capture}s is outside the {end:.1f}s timeline")
+    scale = _get(_get(output, "thumbnail"), "scale")
+    if scale is not None and not 0 < scale <= 1:
+        check.add("output.thumbnail.scale", "out_of_range", f"{scale} is outside 0 to 1")
+
+    return check.issues